@@ -0,0 +1,157 @@
+"""add_conversation_direct_pair
+
+Revision ID: add_conversation_direct_pair
+Revises: add_conversation_last_message
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_conversation_direct_pair'
+down_revision: Union[str, Sequence[str], None] = 'add_conversation_last_message'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_into(bind, duplicate_id: int, survivor_id: int) -> None:
+    """重複側の会話のメッセージ・参加者の状態を残す側に移し、重複側を削除する"""
+    params = {"duplicate_id": duplicate_id, "survivor_id": survivor_id}
+    members = bind.execute(
+        sa.text(
+            'SELECT user_id, last_read_message_id, last_activity_at FROM conversation_members '
+            'WHERE conversation_id = :duplicate_id'
+        ),
+        params,
+    ).all()
+    for user_id, last_read_message_id, last_activity_at in members:
+        survivor_last_read = bind.execute(
+            sa.text(
+                'SELECT last_read_message_id FROM conversation_members '
+                'WHERE conversation_id = :survivor_id AND user_id = :user_id'
+            ),
+            {**params, "user_id": user_id},
+        ).scalar()
+        if survivor_last_read is None:
+            # 残す側にいない参加者は行ごと移す
+            bind.execute(
+                sa.text(
+                    'UPDATE conversation_members SET conversation_id = :survivor_id '
+                    'WHERE conversation_id = :duplicate_id AND user_id = :user_id'
+                ),
+                {**params, "user_id": user_id},
+            )
+            continue
+        # 重複側で未読だったメッセージは統合後も未読のまま残す（既読位置は下げる方向にだけ動かす）
+        first_unread_id = bind.execute(
+            sa.text(
+                'SELECT min(id) FROM messages WHERE conversation_id = :duplicate_id '
+                'AND id > :last_read_message_id AND sender_id != :user_id'
+            ),
+            {**params, "user_id": user_id, "last_read_message_id": last_read_message_id},
+        ).scalar()
+        if first_unread_id is not None:
+            survivor_last_read = min(survivor_last_read, first_unread_id - 1)
+        bind.execute(
+            sa.text(
+                'UPDATE conversation_members SET last_read_message_id = :last_read_message_id, '
+                'last_activity_at = CASE WHEN last_activity_at < :last_activity_at '
+                'THEN :last_activity_at ELSE last_activity_at END '
+                'WHERE conversation_id = :survivor_id AND user_id = :user_id'
+            ),
+            {
+                **params,
+                "user_id": user_id,
+                "last_read_message_id": survivor_last_read,
+                "last_activity_at": last_activity_at,
+            },
+        )
+
+    bind.execute(
+        sa.text('UPDATE messages SET conversation_id = :survivor_id WHERE conversation_id = :duplicate_id'),
+        params,
+    )
+    bind.execute(sa.text('DELETE FROM conversation_members WHERE conversation_id = :duplicate_id'), params)
+    bind.execute(sa.text('DELETE FROM conversations WHERE id = :duplicate_id'), params)
+
+    # 最後のメッセージを移したメッセージを含めて記録し直す
+    bind.execute(
+        sa.text(
+            'UPDATE conversations SET last_message_id = ('
+            'SELECT max(messages.id) FROM messages WHERE messages.conversation_id = conversations.id'
+            ') WHERE id = :survivor_id'
+        ),
+        params,
+    )
+    bind.execute(
+        sa.text(
+            'UPDATE conversations SET '
+            'last_message_sender_id = (SELECT messages.sender_id FROM messages WHERE messages.id = conversations.last_message_id), '
+            'last_message_at = (SELECT messages.created_at FROM messages WHERE messages.id = conversations.last_message_id), '
+            'last_message_preview = (SELECT substr(messages.content, 1, 100) FROM messages WHERE messages.id = conversations.last_message_id) '
+            'WHERE id = :survivor_id'
+        ),
+        params,
+    )
+
+
+def merge_duplicate_direct_conversations(bind) -> int:
+    """
+    同時作成で重複した1対1会話を、同じ2人の最も古い会話に統合し、統合した会話数を返す
+
+    参加者が2人の direct 会話を参加者の組で突き合わせる（組キーの有無によらない）
+    """
+    rows = bind.execute(
+        sa.text(
+            'SELECT conversations.id, min(conversation_members.user_id), max(conversation_members.user_id) '
+            'FROM conversations JOIN conversation_members '
+            'ON conversation_members.conversation_id = conversations.id '
+            "WHERE conversations.type = 'direct' "
+            'GROUP BY conversations.id HAVING count(*) = 2 '
+            'ORDER BY conversations.id'
+        )
+    ).all()
+    survivors = {}
+    merged = 0
+    for conversation_id, min_user_id, max_user_id in rows:
+        survivor_id = survivors.setdefault((min_user_id, max_user_id), conversation_id)
+        if survivor_id != conversation_id:
+            _merge_into(bind, conversation_id, survivor_id)
+            merged += 1
+    return merged
+
+
+def upgrade() -> None:
+    """Add the canonical (min_user_id, max_user_id) pair key to direct conversations."""
+    op.add_column('conversations', sa.Column('min_user_id', sa.Integer(), nullable=True))
+    op.add_column('conversations', sa.Column('max_user_id', sa.Integer(), nullable=True))
+
+    # 同時作成で重複していた会話は、組キーを付ける前に最も古い会話へ統合する
+    merge_duplicate_direct_conversations(op.get_bind())
+
+    # 参加者が2人の1対1会話に組を記録
+    op.execute(
+        sa.text(
+            'UPDATE conversations SET '
+            'min_user_id = (SELECT min(conversation_members.user_id) FROM conversation_members '
+            'WHERE conversation_members.conversation_id = conversations.id), '
+            'max_user_id = (SELECT max(conversation_members.user_id) FROM conversation_members '
+            'WHERE conversation_members.conversation_id = conversations.id) '
+            "WHERE type = 'direct' AND ("
+            'SELECT count(*) FROM conversation_members '
+            'WHERE conversation_members.conversation_id = conversations.id'
+            ') = 2'
+        )
+    )
+    op.create_unique_constraint('uq_conversation_direct_pair', 'conversations', ['min_user_id', 'max_user_id'])
+
+
+def downgrade() -> None:
+    """Drop the direct conversation pair key (merged duplicate conversations are not restored)."""
+    op.drop_constraint('uq_conversation_direct_pair', 'conversations', type_='unique')
+    op.drop_column('conversations', 'max_user_id')
+    op.drop_column('conversations', 'min_user_id')
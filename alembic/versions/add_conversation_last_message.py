@@ -0,0 +1,73 @@
+"""add_conversation_last_message
+
+Revision ID: add_conversation_last_message
+Revises: add_conversation_member_read_watermark
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_conversation_last_message'
+down_revision: Union[str, Sequence[str], None] = 'add_conversation_member_read_watermark'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Denormalize the last message onto conversations and add the per-member inbox sort key."""
+    op.add_column('conversations', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    op.add_column('conversations', sa.Column('last_message_sender_id', sa.Integer(), nullable=True))
+    op.add_column('conversations', sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('conversations', sa.Column('last_message_preview', sa.String(length=100), nullable=True))
+    op.add_column(
+        'conversation_members',
+        sa.Column('last_activity_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+    # 会話ごとの最新メッセージを最後のメッセージとして記録
+    op.execute(
+        sa.text(
+            'UPDATE conversations SET last_message_id = ('
+            'SELECT max(messages.id) FROM messages WHERE messages.conversation_id = conversations.id'
+            ')'
+        )
+    )
+    op.execute(
+        sa.text(
+            'UPDATE conversations SET '
+            'last_message_sender_id = (SELECT messages.sender_id FROM messages WHERE messages.id = conversations.last_message_id), '
+            'last_message_at = (SELECT messages.created_at FROM messages WHERE messages.id = conversations.last_message_id), '
+            'last_message_preview = (SELECT substr(messages.content, 1, 100) FROM messages WHERE messages.id = conversations.last_message_id) '
+            'WHERE last_message_id IS NOT NULL'
+        )
+    )
+    # 並び順キー: 最後のメッセージの日時（メッセージがなければ会話の作成日時）
+    op.execute(
+        sa.text(
+            'UPDATE conversation_members SET last_activity_at = ('
+            'SELECT COALESCE(conversations.last_message_at, conversations.created_at) FROM conversations '
+            'WHERE conversations.id = conversation_members.conversation_id'
+            ')'
+        )
+    )
+    op.create_index(
+        'ix_conversation_members_user_activity',
+        'conversation_members',
+        ['user_id', 'last_activity_at', 'conversation_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Drop the denormalized last message columns and the inbox index."""
+    op.drop_index('ix_conversation_members_user_activity', table_name='conversation_members')
+    op.drop_column('conversation_members', 'last_activity_at')
+    op.drop_column('conversations', 'last_message_preview')
+    op.drop_column('conversations', 'last_message_at')
+    op.drop_column('conversations', 'last_message_sender_id')
+    op.drop_column('conversations', 'last_message_id')
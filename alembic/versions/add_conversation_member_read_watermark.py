@@ -0,0 +1,42 @@
+"""add_conversation_member_read_watermark
+
+Revision ID: add_conversation_member_read_watermark
+Revises: add_messages_conversation_id_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_conversation_member_read_watermark'
+down_revision: Union[str, Sequence[str], None] = 'add_messages_conversation_id_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add conversation_members.last_read_message_id and backfill it from messages.is_read."""
+    op.add_column(
+        'conversation_members',
+        sa.Column('last_read_message_id', sa.Integer(), server_default='0', nullable=False),
+    )
+    # 相手から受け取った既読済みメッセージの最大IDを既読位置とする
+    op.execute(
+        sa.text(
+            'UPDATE conversation_members SET last_read_message_id = COALESCE(('
+            'SELECT max(messages.id) FROM messages '
+            'WHERE messages.conversation_id = conversation_members.conversation_id '
+            'AND messages.sender_id <> conversation_members.user_id '
+            'AND messages.is_read = true'
+            '), 0)'
+        )
+    )
+
+
+def downgrade() -> None:
+    """Drop conversation_members.last_read_message_id."""
+    op.drop_column('conversation_members', 'last_read_message_id')
@@ -0,0 +1,57 @@
+"""add_matches_table
+
+Revision ID: add_matches_table
+Revises: add_tag_user_count
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_matches_table'
+down_revision: Union[str, Sequence[str], None] = 'add_tag_user_count'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create matches (one row per direction) and backfill it from mutual likes."""
+    op.create_table('matches',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('matched_user_id', sa.Integer(), nullable=False),
+    sa.Column('matched_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('user_id <> matched_user_id', name='ck_match_not_self'),
+    sa.ForeignKeyConstraint(['matched_user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'matched_user_id', name='uq_match_pair')
+    )
+    op.create_index('ix_matches_user_matched_at', 'matches', ['user_id', 'matched_at'], unique=False)
+    op.create_index(op.f('ix_matches_matched_user_id'), 'matches', ['matched_user_id'], unique=False)
+    # 相互いいね（ブロック中の組を除く）から両方向の行を作成。成立日時は後にいいねした方の日時
+    op.execute(
+        sa.text(
+            'INSERT INTO matches (user_id, matched_user_id, matched_at) '
+            'SELECT mine.liker_id, mine.liked_id, '
+            'CASE WHEN mine.created_at > theirs.created_at THEN mine.created_at ELSE theirs.created_at END '
+            'FROM likes AS mine '
+            'JOIN likes AS theirs ON theirs.liker_id = mine.liked_id AND theirs.liked_id = mine.liker_id '
+            'WHERE NOT EXISTS ('
+            'SELECT 1 FROM blocks WHERE '
+            '(blocks.blocker_id = mine.liker_id AND blocks.blocked_id = mine.liked_id) '
+            'OR (blocks.blocker_id = mine.liked_id AND blocks.blocked_id = mine.liker_id)'
+            ')'
+        )
+    )
+
+
+def downgrade() -> None:
+    """Drop matches."""
+    op.drop_index(op.f('ix_matches_matched_user_id'), table_name='matches')
+    op.drop_index('ix_matches_user_matched_at', table_name='matches')
+    op.drop_table('matches')
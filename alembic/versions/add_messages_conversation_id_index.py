@@ -0,0 +1,28 @@
+"""add_messages_conversation_id_index
+
+Revision ID: add_messages_conversation_id_index
+Revises: add_matches_table
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_messages_conversation_id_index'
+down_revision: Union[str, Sequence[str], None] = 'add_matches_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add (conversation_id, id) index for keyset message pagination."""
+    op.create_index('ix_messages_conversation_id_id', 'messages', ['conversation_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop (conversation_id, id) index."""
+    op.drop_index('ix_messages_conversation_id_id', table_name='messages')
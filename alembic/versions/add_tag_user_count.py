@@ -0,0 +1,36 @@
+"""add_tag_user_count
+
+Revision ID: add_tag_user_count
+Revises: add_user_text_search_indexes
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_tag_user_count'
+down_revision: Union[str, Sequence[str], None] = 'add_user_text_search_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add denormalized tags.user_count, backfill it and index it for popular tags."""
+    op.add_column('tags', sa.Column('user_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        sa.text(
+            'UPDATE tags SET user_count = '
+            '(SELECT count(*) FROM user_tags WHERE user_tags.tag_id = tags.id)'
+        )
+    )
+    op.create_index('ix_tags_user_count', 'tags', ['user_count', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop tags.user_count."""
+    op.drop_index('ix_tags_user_count', table_name='tags')
+    op.drop_column('tags', 'user_count')
@@ -0,0 +1,51 @@
+"""add_user_looking_for
+
+Revision ID: add_user_looking_for
+Revises: add_users_active_birthday_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_looking_for'
+down_revision: Union[str, Sequence[str], None] = 'add_users_active_birthday_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Normalize users.looking_for into user_looking_for and backfill existing rows."""
+    user_looking_for = op.create_table('user_looking_for',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('goal', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'goal')
+    )
+    op.create_index('ix_user_looking_for_goal_user', 'user_looking_for', ['goal', 'user_id'], unique=False)
+
+    # 既存ユーザーの looking_for（カンマ区切り）を分解して投入
+    connection = op.get_bind()
+    users = connection.execute(
+        sa.text("SELECT id, looking_for FROM users WHERE looking_for IS NOT NULL AND looking_for <> ''")
+    ).all()
+    rows = []
+    for user_id, looking_for in users:
+        goals = []
+        for goal in looking_for.split(','):
+            goal = goal.strip()
+            if goal and goal not in goals:
+                goals.append(goal)
+        rows.extend({'user_id': user_id, 'goal': goal} for goal in goals)
+    if rows:
+        op.bulk_insert(user_looking_for, rows)
+
+
+def downgrade() -> None:
+    """Drop user_looking_for."""
+    op.drop_index('ix_user_looking_for_goal_user', table_name='user_looking_for')
+    op.drop_table('user_looking_for')
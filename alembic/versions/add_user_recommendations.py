@@ -0,0 +1,54 @@
+"""add_user_recommendations
+
+Revision ID: add_user_recommendations
+Revises: 4bb0e825622d
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_recommendations'
+down_revision: Union[str, Sequence[str], None] = '4bb0e825622d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add precomputed recommendation tables."""
+    op.create_table('user_recommendations',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_user_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['candidate_user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'candidate_user_id', name='uq_user_recommendation_pair')
+    )
+    op.create_index('ix_user_recommendations_user_rank', 'user_recommendations', ['user_id', 'rank'], unique=False)
+    op.create_index(op.f('ix_user_recommendations_candidate_user_id'), 'user_recommendations', ['candidate_user_id'], unique=False)
+
+    op.create_table('recommendation_states',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('is_dirty', sa.Boolean(), server_default='true', nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_recommendation_states_is_dirty'), 'recommendation_states', ['is_dirty'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop precomputed recommendation tables."""
+    op.drop_index(op.f('ix_recommendation_states_is_dirty'), table_name='recommendation_states')
+    op.drop_table('recommendation_states')
+    op.drop_index(op.f('ix_user_recommendations_candidate_user_id'), table_name='user_recommendations')
+    op.drop_index('ix_user_recommendations_user_rank', table_name='user_recommendations')
+    op.drop_table('user_recommendations')
@@ -0,0 +1,37 @@
+"""add_user_suggestion_sessions
+
+Revision ID: add_user_suggestion_sessions
+Revises: add_conversation_direct_pair
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_suggestion_sessions'
+down_revision: Union[str, Sequence[str], None] = 'add_conversation_direct_pair'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Store suggestion sessions in the database so any worker can serve the next page."""
+    op.create_table('user_suggestion_sessions',
+    sa.Column('viewer_id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.String(length=32), nullable=False),
+    sa.Column('filter_signature', sa.Text(), nullable=False),
+    sa.Column('candidate_ids', sa.JSON(), nullable=False),
+    sa.Column('scores', sa.JSON(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['viewer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('viewer_id')
+    )
+
+
+def downgrade() -> None:
+    """Drop user_suggestion_sessions."""
+    op.drop_table('user_suggestion_sessions')
@@ -0,0 +1,72 @@
+"""add_user_text_search_indexes
+
+Revision ID: add_user_text_search_indexes
+Revises: add_users_active_created_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_text_search_indexes'
+down_revision: Union[str, Sequence[str], None] = 'add_users_active_created_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_display_name_trgm ON users USING gin (display_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_bio_trgm ON users USING gin (bio gin_trgm_ops)",
+]
+
+# users を外部コンテンツとする FTS5 仮想テーブルと同期用トリガー
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "display_name, bio, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, display_name, bio) VALUES (new.id, new.display_name, new.bio); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, display_name, bio) VALUES ('delete', old.id, old.display_name, old.bio); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF display_name, bio ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, display_name, bio) VALUES ('delete', old.id, old.display_name, old.bio); "
+    "INSERT INTO users_fts(rowid, display_name, bio) VALUES (new.id, new.display_name, new.bio); "
+    "END",
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS users_fts_au",
+    "DROP TRIGGER IF EXISTS users_fts_ad",
+    "DROP TRIGGER IF EXISTS users_fts_ai",
+    "DROP TABLE IF EXISTS users_fts",
+]
+
+
+def upgrade() -> None:
+    """Add trigram (PostgreSQL) / FTS5 (SQLite) indexes for display_name and bio search."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statements = POSTGRES_DDL
+    elif dialect == 'sqlite':
+        statements = SQLITE_DDL
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def downgrade() -> None:
+    """Drop text search indexes."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(sa.text('DROP INDEX IF EXISTS ix_users_bio_trgm'))
+        op.execute(sa.text('DROP INDEX IF EXISTS ix_users_display_name_trgm'))
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DROP_DDL:
+            op.execute(sa.text(statement))
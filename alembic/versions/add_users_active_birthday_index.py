@@ -0,0 +1,28 @@
+"""add_users_active_birthday_index
+
+Revision ID: add_users_active_birthday_index
+Revises: add_user_recommendations
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_users_active_birthday_index'
+down_revision: Union[str, Sequence[str], None] = 'add_user_recommendations'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add index for birthday range (age) filters."""
+    op.create_index('ix_users_active_birthday', 'users', ['is_active', 'birthday'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop birthday range index."""
+    op.drop_index('ix_users_active_birthday', table_name='users')
@@ -0,0 +1,28 @@
+"""add_users_active_created_index
+
+Revision ID: add_users_active_created_index
+Revises: add_user_looking_for
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_users_active_created_index'
+down_revision: Union[str, Sequence[str], None] = 'add_user_looking_for'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add index for keyset pagination by (created_at, id)."""
+    op.create_index('ix_users_active_created', 'users', ['is_active', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop keyset pagination index."""
+    op.drop_index('ix_users_active_created', table_name='users')
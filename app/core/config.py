@@ -29,6 +29,26 @@ class Settings(BaseSettings):
     # レート制限設定
     EMAIL_RATE_LIMIT_PER_HOUR: int = 10  # 1時間あたりの最大メール送信数
     API_RATE_LIMIT_PER_MINUTE: int = 100  # 1分あたりの最大APIリクエスト数
+
+    # おすすめ・検索用インメモリインデックス設定
+    TAG_INDEX_MAX_AGE_SECONDS: int = 300  # タグ転置インデックスの再構築間隔（ワーカー間の差分を吸収）
+    SUGGESTION_SIMILARITY_METRIC: str = "cosine"  # おすすめの類似度指標（"cosine": IDF重み付き / "jaccard"）
+    EXCLUSION_CACHE_MAX_USERS: int = 5000  # 除外集合を保持する最大ユーザー数（LRU）
+    EXCLUSION_CACHE_TTL_SECONDS: int = 60  # 除外集合の有効期限（秒）
+    SUGGESTION_SESSION_TTL_SECONDS: int = 1800  # おすすめセッション（カーソル）の有効期限（秒）
+    SUGGESTION_SESSION_MAX_CANDIDATES: int = 1000  # 1セッションに保持する最大候補数
+    RECOMMENDATION_JOB_ENABLED: bool = True  # 事前計算おすすめのバックグラウンドジョブを起動するか
+    RECOMMENDATION_TOP_N: int = 50  # ユーザーごとに保存するおすすめ件数
+    RECOMMENDATION_BATCH_SIZE: int = 200  # 1回のジョブで再計算する最大ユーザー数
+    RECOMMENDATION_REFRESH_INTERVAL_SECONDS: int = 60  # ジョブの実行間隔（秒）
+    RECOMMENDATION_MAX_AGE_SECONDS: int = 86400  # 変更がなくても再計算するまでの期間（秒）
+    SEARCH_FACET_CACHE_MAX_ENTRIES: int = 1000  # 検索ファセット件数を保持する最大フィルター組み合わせ数（LRU）
+    SEARCH_FACET_CACHE_TTL_SECONDS: int = 30  # 検索ファセット件数の有効期限（秒）
+    SEARCH_RESULT_CACHE_MAX_ENTRIES: int = 500  # 検索結果IDを保持する最大検索条件数（LRU）
+    SEARCH_RESULT_CACHE_TTL_SECONDS: int = 30  # 検索結果IDの有効期限（秒）
+    SEARCH_RESULT_CACHE_MAX_IDS: int = 5000  # 1検索条件あたりにキャッシュする最大ID数（超える場合はキャッシュしない）
+    PROFILE_CARD_CACHE_MAX_ENTRIES: int = 5000  # プロフィールカードを保持する最大ユーザー数（LRU）
+    PROFILE_CARD_CACHE_TTL_SECONDS: int = 30  # プロフィールカードの有効期限（秒、0でキャッシュしない）
     
     # Sentry設定（エラー監視）
     SENTRY_DSN: str = ""  # 本番環境で設定
@@ -0,0 +1,24 @@
+# app/core/cursor.py
+# ページング用の不透明カーソル（JSONをURLセーフBase64で包む）
+
+import base64
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """カーソル用の辞書をURLセーフな文字列に変換"""
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """encode_cursor の逆変換（不正な値の場合は ValueError）"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor payload")
+    return payload
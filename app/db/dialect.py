@@ -0,0 +1,19 @@
+# app/db/dialect.py
+# DBの種類（PostgreSQL / SQLite）ごとに異なる構文のヘルパー
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def insert_for(dialect_name: str, table):
+    """
+    ON CONFLICT 句（on_conflict_do_nothing / on_conflict_do_update）を使える INSERT
+
+    Args:
+        dialect_name: DBの種類（db.bind.dialect.name）
+        table: 対象のテーブルまたはモデル
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"ON CONFLICT is not supported for dialect: {dialect_name}")
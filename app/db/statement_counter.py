@@ -0,0 +1,41 @@
+# app/db/statement_counter.py
+# リクエスト単位の発行SQL数の計測
+
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 計測中のカウンタ（タスクごと。同じエンジンを使う他のリクエストやバックグラウンドジョブのSQLは数えない）
+_current_counter: ContextVar[Optional["StatementCounter"]] = ContextVar("statement_counter", default=None)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+class StatementCounter:
+    """
+    start() から stop() までにDBへ発行されたSQL数を数える
+
+    エンジンの before_cursor_execute で数えるため、ORM・コアのどちらの経路で発行されたSQLも含む
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.engine = db.bind.sync_engine
+        self.count = 0
+        self._token: Optional[Token] = None
+
+    def start(self) -> "StatementCounter":
+        if not event.contains(self.engine, "before_cursor_execute", _count_statement):
+            event.listen(self.engine, "before_cursor_execute", _count_statement)
+        self._token = _current_counter.set(self)
+        return self
+
+    def stop(self) -> None:
+        if self._token is not None:
+            _current_counter.reset(self._token)
+            self._token = None
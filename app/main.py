@@ -6,6 +6,7 @@ from app.routers import health, users, auth, tags, chat, files, email_auth, ws,
 from app.routers.likes import router as likes_router, matches_router
 from app.routers.safety import reports_router, blocks_router, admin_router
 from app.routers.skips import router as skips_router
+from app.routers.swipes import router as swipes_router
 from pathlib import Path
 
 # Sentry統合 (本番環境のみ)
@@ -125,6 +126,7 @@ app.include_router(reports_router)
 app.include_router(blocks_router)
 app.include_router(admin_router)
 app.include_router(skips_router)
+app.include_router(swipes_router)
 app.include_router(ws.router)
 
 # 静的ファイル提供（画像など）
@@ -143,6 +145,38 @@ from app.db.base import Base
 from app.models.user import User  # noqa: F401
 from app.models.tag import Tag, UserTag  # noqa: F401
 
+# タグ転置インデックス・オートコンプリートを起動時に構築（失敗しても初回利用時に再試行される）
+from app.db.session import Sessionlocal
+from app.services.tag_index_service import tag_index
+from app.services.tag_autocomplete import tag_autocomplete
+
+@app.on_event("startup")
+async def build_tag_index():
+    try:
+        async with Sessionlocal() as session:
+            await tag_index.ensure_loaded(session)
+            await tag_autocomplete.ensure_loaded(session)
+    except Exception as e:
+        print(f"⚠️ Tag index build skipped at startup: {e}", file=sys.stderr)
+
+# 事前計算おすすめのバックグラウンドジョブ（PostgreSQLではアドバイザリロックで1ワーカーのみ実行）
+import asyncio
+from app.services.recommendation_service import recommendations
+
+@app.on_event("startup")
+async def start_recommendation_job():
+    if not settings.RECOMMENDATION_JOB_ENABLED:
+        return
+    app.state.recommendation_job = asyncio.create_task(
+        recommendations.run_forever(Sessionlocal, settings.RECOMMENDATION_REFRESH_INTERVAL_SECONDS)
+    )
+
+@app.on_event("shutdown")
+async def stop_recommendation_job():
+    job = getattr(app.state, "recommendation_job", None)
+    if job is not None:
+        job.cancel()
+
 # Temporarily disabled for testing
 # @app.on_event("startup")
 # async def on_startup():
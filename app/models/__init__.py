@@ -1,6 +1,7 @@
 from .user import User
 from .tag import Tag, UserTag
 from .like import Like
+from .match import Match
 from .conversation import Conversation, ConversationMember
 from .message import Message
 from .report import Report
@@ -8,12 +9,17 @@ from .block import Block
 from .skip import Skip
 from .email_verification import EmailVerification
 from .student_id_verification import StudentIdVerification
+from .recommendation import UserRecommendation, RecommendationState, UserSuggestionSession
+from .looking_for import UserLookingFor
+# フリーテキスト検索用インデックス（users 作成時のDDLを登録する）
+from .user_text_search import users_fts
 
 __all__ = [
     "User",
     "Tag",
     "UserTag",
     "Like",
+    "Match",
     "Conversation",
     "ConversationMember",
     "Message",
@@ -22,4 +28,8 @@ __all__ = [
     "Skip",
     "EmailVerification",
     "StudentIdVerification",
+    "UserRecommendation",
+    "RecommendationState",
+    "UserSuggestionSession",
+    "UserLookingFor",
 ]
@@ -1,15 +1,32 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, ForeignKey, UniqueConstraint
+from datetime import datetime
+from sqlalchemy import String, ForeignKey, UniqueConstraint, Integer, DateTime, Index, func
 from app.db.base import Base
-from app.models.common import TimestampMixin
+from app.models.common import TimestampMixin, get_current_timestamp
 from app.models.enums import ConversationType
 
+# 会話一覧に表示する最後のメッセージの先頭文字数
+LAST_MESSAGE_PREVIEW_LENGTH = 100
+
+
 class Conversation(Base, TimestampMixin):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # 1対1会話は2人の組につき1件（group は NULL のため対象外）
+        UniqueConstraint("min_user_id", "max_user_id", name="uq_conversation_direct_pair"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     type: Mapped[ConversationType] = mapped_column(default=ConversationType.direct, nullable=False)
     title: Mapped[str | None] = mapped_column(String(100))  # group用
+    # 1対1会話の2人のユーザーID（小さい方・大きい方の正規化した組。検索と重複作成の防止に使う）
+    min_user_id: Mapped[int | None] = mapped_column(Integer)
+    max_user_id: Mapped[int | None] = mapped_column(Integer)
+    # 最後のメッセージ（会話一覧表示用の非正規化。メッセージ送信と同じトランザクションで更新）
+    last_message_id: Mapped[int | None] = mapped_column(Integer)
+    last_message_sender_id: Mapped[int | None] = mapped_column(Integer)
+    last_message_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_message_preview: Mapped[str | None] = mapped_column(String(LAST_MESSAGE_PREVIEW_LENGTH))
 
     members = relationship("ConversationMember", back_populates="conversation", cascade="all, delete-orphan")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
@@ -18,11 +35,19 @@ class ConversationMember(Base, TimestampMixin):
     __tablename__ = "conversation_members"
     __table_args__ = (
         UniqueConstraint("conversation_id", "user_id", name="uq_conversation_member_unique"),
+        # 会話一覧: 自分の会話を最終アクティビティの新しい順にキーセットで読む
+        Index("ix_conversation_members_user_activity", "user_id", "last_activity_at", "conversation_id"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id", ondelete="CASCADE"), index=True, nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    # 既読位置（このID以下のメッセージは既読。未読数は messages の (conversation_id, id) の範囲で数える）
+    last_read_message_id: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # 会話一覧の並び順キー（最後のメッセージの日時。メッセージがなければ会話の作成日時）
+    last_activity_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=get_current_timestamp, server_default=func.now(), nullable=False
+    )
 
     conversation = relationship("Conversation", back_populates="members")
     user = relationship("User")
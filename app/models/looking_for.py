@@ -0,0 +1,55 @@
+from typing import List, Optional
+from sqlalchemy.orm import Mapped, mapped_column, Session
+from sqlalchemy import String, ForeignKey, Index, delete, event, insert, inspect
+from app.db.base import Base
+from app.models.user import User
+
+class UserLookingFor(Base):
+    """
+    users.looking_for（カンマ区切り）を正規化した検索用テーブル
+
+    users.looking_for が唯一の正で、このテーブルはフラッシュ時に自動で同期される
+    """
+    __tablename__ = "user_looking_for"
+    __table_args__ = (
+        # 関係性目標フィルター（goal IN (...)）用
+        Index("ix_user_looking_for_goal_user", "goal", "user_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    goal: Mapped[str] = mapped_column(String(50), primary_key=True)
+
+
+def parse_looking_for(value: Optional[str]) -> List[str]:
+    """カンマ区切りの looking_for を重複なしの目標リストに変換"""
+    if not value:
+        return []
+    goals: List[str] = []
+    for goal in value.split(","):
+        goal = goal.strip()
+        if goal and goal not in goals:
+            goals.append(goal)
+    return goals
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_user_looking_for(session: Session, flush_context) -> None:
+    """looking_for が追加・変更されたユーザーの user_looking_for を書き換える"""
+    changed_users = [
+        obj for obj in session.new if isinstance(obj, User) and obj.looking_for
+    ] + [
+        obj for obj in session.dirty
+        if isinstance(obj, User) and inspect(obj).attrs.looking_for.history.has_changes()
+    ]
+    if not changed_users:
+        return
+    connection = session.connection()
+    user_ids = [user.id for user in changed_users]
+    connection.execute(delete(UserLookingFor.__table__).where(UserLookingFor.__table__.c.user_id.in_(user_ids)))
+    rows = [
+        {"user_id": user.id, "goal": goal}
+        for user in changed_users
+        for goal in parse_looking_for(user.looking_for)
+    ]
+    if rows:
+        connection.execute(insert(UserLookingFor.__table__), rows)
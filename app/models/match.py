@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import ForeignKey, UniqueConstraint, CheckConstraint, Index, DateTime
+from app.db.base import Base
+from app.models.common import get_current_timestamp
+
+class Match(Base):
+    """
+    成立したマッチング（相互いいね）
+
+    一覧を user_id の範囲スキャン1回で取得できるよう、1組のマッチにつき両方向の2行を持つ
+    いいね送信時に相手からのいいねがあれば作成し、いいね取り消し・ブロックで削除する
+    """
+    __tablename__ = "matches"
+    __table_args__ = (
+        UniqueConstraint("user_id", "matched_user_id", name="uq_match_pair"),
+        CheckConstraint("user_id <> matched_user_id", name="ck_match_not_self"),
+        Index("ix_matches_user_matched_at", "user_id", "matched_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    matched_user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    # 後にいいねした方の日時
+    matched_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=get_current_timestamp, nullable=False
+    )
+
+    matched_user = relationship("User", foreign_keys=[matched_user_id])
@@ -1,16 +1,21 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, ForeignKey, Boolean, Integer
+from sqlalchemy import String, ForeignKey, Boolean, Integer, Index
 from app.db.base import Base
 from app.models.common import TimestampMixin
 from app.models.enums import MessageType
 
 class Message(Base, TimestampMixin):
     __tablename__ = "messages"
+    __table_args__ = (
+        # 会話内のメッセージをID順に範囲スキャンする（before_id / after_id のキーセットページング）
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id", ondelete="CASCADE"), index=True, nullable=False)
     sender_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     content: Mapped[str] = mapped_column(String(4000), nullable=False)
+    # 旧方式の既読フラグ（現在は更新しない。既読は ConversationMember.last_read_message_id で管理）
     is_read: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     
     # メッセージタイプとファイル関連
@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, UniqueConstraint, Index, Integer, Float, Boolean, DateTime, String, Text, JSON
+from app.db.base import Base
+from app.models.common import get_current_timestamp
+
+class UserRecommendation(Base):
+    """バックグラウンドジョブで事前計算した「今日のおすすめ」（ユーザーごとの上位N件）"""
+    __tablename__ = "user_recommendations"
+    __table_args__ = (
+        UniqueConstraint("user_id", "candidate_user_id", name="uq_user_recommendation_pair"),
+        Index("ix_user_recommendations_user_rank", "user_id", "rank"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    candidate_user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    rank: Mapped[int] = mapped_column(Integer, nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=get_current_timestamp, nullable=False
+    )
+
+
+class RecommendationState(Base):
+    """ユーザーごとのおすすめ再計算状態（タグ・プロフィール・除外集合の変更で is_dirty を立てる）"""
+    __tablename__ = "recommendation_states"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    is_dirty: Mapped[bool] = mapped_column(Boolean, default=True, index=True, nullable=False)
+    computed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class UserSuggestionSession(Base):
+    """
+    おすすめセッション（閲覧者ごとの順位付け済み候補ID列。/users/suggestions のカーソルで続きを返す）
+
+    どのワーカーでも続きのページを返せるようにDBに保持する（閲覧者1人につき1行、最初のページで上書き）
+    """
+    __tablename__ = "user_suggestion_sessions"
+
+    viewer_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    session_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    filter_signature: Mapped[str] = mapped_column(Text, nullable=False)
+    # 順位順の候補ユーザーIDとスコア（同じ長さの配列）
+    candidate_ids: Mapped[list] = mapped_column(JSON, nullable=False)
+    scores: Mapped[list] = mapped_column(JSON, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -1,14 +1,23 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, ForeignKey, UniqueConstraint
+from collections import Counter
+from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import String, ForeignKey, UniqueConstraint, Index, Integer, event, func, select, update
 from app.db.base import Base
 from app.models.common import TimestampMixin
 
 class Tag(Base, TimestampMixin):
     __tablename__ = "tags"
+    __table_args__ = (
+        # 人気タグ（user_count の降順）用
+        Index("ix_tags_user_count", "user_count", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(64), unique=True, index=True, nullable=False)
     description: Mapped[str | None] = mapped_column(String(255))
+    # このタグを付けているユーザー数（user_tags の追加・削除と同じトランザクションで更新される。
+    # ユーザー削除の ON DELETE CASCADE などで生じたずれはバックグラウンドジョブが数え直す）
+    user_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     users = relationship("UserTag", back_populates="tag", cascade="all, delete-orphan")
 
@@ -24,3 +33,55 @@ class UserTag(Base, TimestampMixin):
 
     user = relationship("User", back_populates="tags")
     tag = relationship("Tag", back_populates="users")
+
+
+def tag_user_count_updates(deltas: dict) -> list:
+    """
+    tags.user_count を増減するUPDATE文（{tag_id: 増減数}、同じ増減数のタグはまとめて1文）
+
+    ORMを経由しない一括INSERT/DELETEで user_tags を変更した場合は、呼び出し側で同じトランザクション内に実行する
+    """
+    tags = Tag.__table__
+    by_delta: dict = {}
+    for tag_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(tag_id)
+    return [
+        update(tags).where(tags.c.id.in_(tag_ids)).values(user_count=tags.c.user_count + delta)
+        for delta, tag_ids in by_delta.items()
+    ]
+
+
+def tag_user_count_recount():
+    """
+    tags.user_count を user_tags から数え直すUPDATE文（ずれているタグのみ更新）
+
+    ユーザー削除時の ON DELETE CASCADE など、ORMのイベントも tag_user_count_updates も通らない
+    user_tags の削除で生じたずれを修復する
+    """
+    tags = Tag.__table__
+    user_tags = UserTag.__table__
+    actual = select(func.count()).select_from(user_tags).where(user_tags.c.tag_id == tags.c.id).scalar_subquery()
+    return update(tags).where(tags.c.user_count != actual).values(user_count=actual)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_tag_user_counts(session: Session, flush_context) -> None:
+    """ORMで追加・削除された user_tags を tags.user_count に反映する"""
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, UserTag):
+            deltas[obj.tag_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, UserTag):
+            deltas[obj.tag_id] -= 1
+    if not deltas:
+        return
+    connection = session.connection()
+    for statement in tag_user_count_updates(deltas):
+        connection.execute(statement)
+    # セッション内に読み込み済みのタグは、次回アクセス時に user_count を読み直す
+    for tag_id in deltas:
+        tag = session.identity_map.get(identity_key(Tag, tag_id))
+        if tag is not None:
+            session.expire(tag, ["user_count"])
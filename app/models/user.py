@@ -59,3 +59,7 @@ class User(Base, TimestampMixin):
     email_verifications = relationship("EmailVerification", back_populates="user", cascade="all, delete-orphan")
 
 Index("ix_users_active_name", User.is_active, User.display_name)
+# 新着順のキーセットページング用
+Index("ix_users_active_created", User.is_active, User.created_at)
+# 年齢フィルター（誕生日の範囲条件）用
+Index("ix_users_active_birthday", User.is_active, User.birthday)
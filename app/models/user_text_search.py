@@ -0,0 +1,61 @@
+"""
+ユーザーのフリーテキスト検索（display_name, bio）用インデックス
+
+- PostgreSQL: pg_trgm の GIN インデックス（ILIKE '%語%' を索引で検索できる）
+- SQLite: users を外部コンテンツとする FTS5（trigram トークナイザー）の仮想テーブル users_fts
+  （users への追加・更新・削除はトリガーで同期される）
+
+テーブル作成時（metadata.create_all）に users の作成に続けて作られる。
+既存DBにはマイグレーション add_user_text_search_indexes で作成する
+"""
+
+from sqlalchemy import DDL, Column, Integer, MetaData, Table, Text, event
+
+from app.models.user import User
+
+# users_fts は Base.metadata に含めない（create_all で通常テーブルとして作らせないため）
+users_fts = Table(
+    "users_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("display_name", Text),
+    Column("bio", Text),
+)
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_display_name_trgm ON users USING gin (display_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_bio_trgm ON users USING gin (bio gin_trgm_ops)",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "display_name, bio, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, display_name, bio) VALUES (new.id, new.display_name, new.bio); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, display_name, bio) VALUES ('delete', old.id, old.display_name, old.bio); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF display_name, bio ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, display_name, bio) VALUES ('delete', old.id, old.display_name, old.bio); "
+    "INSERT INTO users_fts(rowid, display_name, bio) VALUES (new.id, new.display_name, new.bio); "
+    "END",
+    # 既存行の取り込み
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS users_fts_au",
+    "DROP TRIGGER IF EXISTS users_fts_ad",
+    "DROP TRIGGER IF EXISTS users_fts_ai",
+    "DROP TABLE IF EXISTS users_fts",
+]
+
+for _statement in POSTGRES_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _statement in SQLITE_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+# drop_all で users より先に仮想テーブルとトリガーを消す
+for _statement in SQLITE_DROP_DDL:
+    event.listen(User.__table__, "before_drop", DDL(_statement).execute_if(dialect="sqlite"))
@@ -2,13 +2,12 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, or_, func, desc, update, case, exists
+from sqlalchemy.orm import aliased, selectinload
 from app.db.session import get_db
 from app.models.user import User
-from app.models.conversation import Conversation, ConversationMember
+from app.models.conversation import Conversation, ConversationMember, LAST_MESSAGE_PREVIEW_LENGTH
 from app.models.message import Message
-from app.models.like import Like
 from app.models.block import Block
 from app.models.enums import ConversationType
 from app.schemas.chat import (
@@ -21,13 +20,25 @@ from app.schemas.chat import (
     MessageListResponse,
     UnreadCountResponse,
     MessageReadResponse,
+    ConversationReadUpdate,
+    ConversationReadStateResponse,
     UserInfo,
     LastMessage,
+    BlockState,
+    InboxItem,
+    InboxResponse,
 )
+from app.core.cursor import decode_cursor, encode_cursor
 from app.core.security import get_current_user
-from typing import Optional
+from app.db.dialect import insert_for
+from app.services.exclusion_service import BLOCK_KINDS, not_excluded
+from app.services.match_service import match_store
+from app.services.profile_cards import profile_cards
+from typing import Dict, Optional, Tuple
 from datetime import datetime, timezone
+import logging
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/conversations", tags=["chat"])
 
 
@@ -51,6 +62,102 @@ async def check_conversation_member(
     return member is not None
 
 
+async def get_read_watermarks(conversation_id: int, db: AsyncSession) -> Dict[int, int]:
+    """会話の参加者ごとの既読位置（ユーザーID → last_read_message_id）。参加者チェックにも使う"""
+    query = await db.execute(
+        select(ConversationMember.user_id, ConversationMember.last_read_message_id).where(
+            ConversationMember.conversation_id == conversation_id
+        )
+    )
+    return dict(query.all())
+
+
+def is_read_by_recipient(message_id: int, sender_id: int, watermarks: Dict[int, int]) -> bool:
+    """送信者以外の参加者がそのメッセージまで既読にしているか"""
+    return any(
+        last_read >= message_id
+        for user_id, last_read in watermarks.items()
+        if user_id != sender_id
+    )
+
+
+async def advance_read_watermark(
+    conversation_id: int,
+    user_id: int,
+    db: AsyncSession,
+    up_to_message_id: Optional[int] = None,
+) -> Optional[int]:
+    """
+    既読位置を進める（1本のUPDATE。コミットは呼び出し側）
+
+    - up_to_message_id 以下の最新メッセージまで（未指定なら会話の最新メッセージまで）を既読にする
+    - 既読位置は戻さない
+    - 更新後の既読位置を返す（参加者でない場合はNone）
+    """
+    latest_id = select(func.max(Message.id)).where(Message.conversation_id == conversation_id)
+    if up_to_message_id is not None:
+        latest_id = latest_id.where(Message.id <= up_to_message_id)
+    target = func.coalesce(latest_id.scalar_subquery(), 0)
+    result = await db.execute(
+        update(ConversationMember)
+        .where(
+            ConversationMember.conversation_id == conversation_id,
+            ConversationMember.user_id == user_id,
+        )
+        .values(
+            last_read_message_id=case(
+                (target > ConversationMember.last_read_message_id, target),
+                else_=ConversationMember.last_read_message_id,
+            )
+        )
+        .returning(ConversationMember.last_read_message_id)
+        .execution_options(synchronize_session="fetch")
+    )
+    return result.scalar_one_or_none()
+
+
+async def record_last_message(message: Message, db: AsyncSession) -> None:
+    """
+    会話の最後のメッセージ（一覧表示用の非正規化列）と参加者ごとの並び順キーを更新（コミットは呼び出し側）
+
+    - メッセージ作成と同じトランザクションで呼ぶ（message は flush 済みでIDと作成日時があること）
+    - 同時送信で古いメッセージが後から書き込まれても、最後のメッセージは戻さない
+    """
+    await db.execute(
+        update(Conversation)
+        .where(
+            Conversation.id == message.conversation_id,
+            func.coalesce(Conversation.last_message_id, 0) < message.id,
+        )
+        .values(
+            last_message_id=message.id,
+            last_message_sender_id=message.sender_id,
+            last_message_at=message.created_at,
+            last_message_preview=message.content[:LAST_MESSAGE_PREVIEW_LENGTH],
+            updated_at=message.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(ConversationMember)
+        .where(
+            ConversationMember.conversation_id == message.conversation_id,
+            ConversationMember.last_activity_at < message.created_at,
+        )
+        .values(last_activity_at=message.created_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def unread_messages_condition(member):
+    """member（ConversationMember またはその別名）にとって未読のメッセージの条件"""
+    return and_(
+        Message.conversation_id == member.conversation_id,
+        Message.id > member.last_read_message_id,
+        Message.sender_id != member.user_id,
+    )
+
+
 async def get_other_user_in_conversation(
     conversation_id: int,
     current_user_id: int,
@@ -73,28 +180,8 @@ async def get_other_user_in_conversation(
 
 async def check_users_matched(user1_id: int, user2_id: int, db: AsyncSession) -> bool:
     """2人のユーザーがマッチしているかチェック"""
-    # 両方向のいいねが存在するかチェック
-    my_like_query = await db.execute(
-        select(Like).where(
-            and_(
-                Like.liker_id == user1_id,
-                Like.liked_id == user2_id,
-            )
-        )
-    )
-    my_like = my_like_query.scalar_one_or_none()
-    
-    their_like_query = await db.execute(
-        select(Like).where(
-            and_(
-                Like.liker_id == user2_id,
-                Like.liked_id == user1_id,
-            )
-        )
-    )
-    their_like = their_like_query.scalar_one_or_none()
-    
-    return my_like is not None and their_like is not None
+    # いいね送信時に記録した matches の1行を参照
+    return await match_store.get_matched_at(db, user1_id, user2_id) is not None
 
 
 async def check_users_blocked(user1_id: int, user2_id: int, db: AsyncSession) -> bool:
@@ -111,29 +198,20 @@ async def check_users_blocked(user1_id: int, user2_id: int, db: AsyncSession) ->
     return block is not None
 
 
+def direct_pair(user1_id: int, user2_id: int) -> Tuple[int, int]:
+    """1対1会話の組キー（小さい方のID, 大きい方のID）"""
+    return min(user1_id, user2_id), max(user1_id, user2_id)
+
+
 async def get_existing_conversation(user1_id: int, user2_id: int, db: AsyncSession) -> Optional[Conversation]:
-    """2人のユーザー間の既存の会話を取得"""
-    # user1が参加している会話
-    user1_conversations_query = select(ConversationMember.conversation_id).where(
-        ConversationMember.user_id == user1_id
-    )
-    
-    # user2が参加している会話
-    user2_conversations_query = select(ConversationMember.conversation_id).where(
-        ConversationMember.user_id == user2_id
-    )
-    
-    # 両方が参加している会話を取得
+    """2人のユーザー間の既存の会話を取得（組キーの一意インデックスを1回引くだけ）"""
+    min_user_id, max_user_id = direct_pair(user1_id, user2_id)
     query = await db.execute(
         select(Conversation).where(
-            and_(
-                Conversation.id.in_(user1_conversations_query),
-                Conversation.id.in_(user2_conversations_query),
-                Conversation.type == ConversationType.direct,
-            )
+            Conversation.min_user_id == min_user_id,
+            Conversation.max_user_id == max_user_id,
         )
     )
-    
     return query.scalar_one_or_none()
 
 
@@ -142,7 +220,8 @@ async def create_or_get_conversation(user1_id: int, user2_id: int, db: AsyncSess
     2人のユーザー間の会話を作成または取得
     
     - 既存の会話がある場合はそれを返す
-    - 既存の会話がない場合は新規作成
+    - 既存の会話がない場合は組キーへの INSERT ... ON CONFLICT DO NOTHING で作成する
+      （同時に作成しようとした場合も一意インデックスで1件にまとまり、負けた側は勝った側の会話を返す）
     - マッチしたユーザー間のみ作成可能（呼び出し側でチェック済みと仮定）
     """
     # 既存の会話をチェック
@@ -150,216 +229,173 @@ async def create_or_get_conversation(user1_id: int, user2_id: int, db: AsyncSess
     if existing_conv:
         return existing_conv
     
-    # 新しい会話を作成
-    new_conversation = Conversation(
-        type=ConversationType.direct,
+    # 新しい会話を作成（作成できた場合のみ RETURNING で返る）
+    min_user_id, max_user_id = direct_pair(user1_id, user2_id)
+    dialect_name = db.bind.dialect.name
+    result = await db.execute(
+        insert_for(dialect_name, Conversation)
+        .values(type=ConversationType.direct, min_user_id=min_user_id, max_user_id=max_user_id)
+        .on_conflict_do_nothing(index_elements=["min_user_id", "max_user_id"])
+        .returning(Conversation.id)
     )
-    db.add(new_conversation)
-    await db.flush()  # IDを取得するためにflush
+    conversation_id = result.scalar_one_or_none()
+    if conversation_id is None:
+        # 他のリクエストが先に作成した
+        return await get_existing_conversation(user1_id, user2_id, db)
     
     # メンバーを追加
-    member1 = ConversationMember(
-        conversation_id=new_conversation.id,
-        user_id=user1_id,
+    await db.execute(
+        insert_for(dialect_name, ConversationMember)
+        .values([
+            {"conversation_id": conversation_id, "user_id": user1_id},
+            {"conversation_id": conversation_id, "user_id": user2_id},
+        ])
+        .on_conflict_do_nothing(index_elements=["conversation_id", "user_id"])
     )
-    member2 = ConversationMember(
-        conversation_id=new_conversation.id,
-        user_id=user2_id,
-    )
-    db.add(member1)
-    db.add(member2)
     
     await db.commit()
-    await db.refresh(new_conversation)
     
-    return new_conversation
+    return await db.get(Conversation, conversation_id)
 
 
 # ==================== 会話一覧取得エンドポイント ====================
 
+# 会話一覧の土台: 自分の参加行（並び順キーとインデックスを持つ）と相手の参加行
+_mine = aliased(ConversationMember, name="mine")
+_other = aliased(ConversationMember, name="other")
+
+
+def _member_conversations(user_id: int, *columns):
+    """自分が参加している会話を相手の参加行と結合したクエリ（1対1会話の場合）"""
+    return (
+        select(*columns)
+        .select_from(_mine)
+        .join(_other, and_(_other.conversation_id == _mine.conversation_id, _other.user_id != _mine.user_id))
+        .where(_mine.user_id == user_id)
+    )
+
+
+def _page_columns():
+    """会話・相手ユーザー・双方の既読位置・未読数（自分の既読位置より後のメッセージの範囲カウント）"""
+    unread_count = (
+        select(func.count(Message.id))
+        .where(unread_messages_condition(_mine))
+        .correlate(_mine)
+        .scalar_subquery()
+    )
+    return (
+        _mine.last_activity_at,
+        Conversation,
+        User,
+        _mine.last_read_message_id,
+        _other.last_read_message_id,
+        unread_count.label("unread_count"),
+    )
+
+
+def _decode_activity_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """next_cursor → (last_activity_at, conversation_id)"""
+    if not cursor:
+        return None
+    try:
+        cursor_payload = decode_cursor(cursor)
+        return datetime.fromisoformat(cursor_payload["t"]), int(cursor_payload["i"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def _activity_page(query, after: Optional[Tuple[datetime, int]], limit: int):
+    """最後のメッセージ日時の新しい順に並べ、カーソルより後ろを1件多く取得する"""
+    if after is not None:
+        query = query.where(
+            or_(
+                _mine.last_activity_at < after[0],
+                and_(_mine.last_activity_at == after[0], _mine.conversation_id < after[1]),
+            )
+        )
+    return query.order_by(_mine.last_activity_at.desc(), _mine.conversation_id.desc()).limit(limit + 1)
+
+
+def _split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """1件多く取得した結果をページと next_cursor に分ける"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last_activity_at, conversation = rows[-1][0], rows[-1][1]
+    return rows, encode_cursor({"t": last_activity_at.isoformat(), "i": conversation.id})
+
+
+def _last_message(
+    conversation: Conversation,
+    user_id: int,
+    my_last_read: int,
+    other_user_id: int,
+    other_last_read: int,
+) -> Optional[LastMessage]:
+    """会話に記録した最後のメッセージ（既読は送信相手の既読位置で判定）"""
+    if conversation.last_message_id is None:
+        return None
+    return LastMessage(
+        id=conversation.last_message_id,
+        content=conversation.last_message_preview or "",
+        sender_id=conversation.last_message_sender_id,
+        created_at=conversation.last_message_at,
+        is_read=is_read_by_recipient(
+            conversation.last_message_id,
+            conversation.last_message_sender_id,
+            {user_id: my_last_read, other_user_id: other_last_read},
+        ),
+    )
+
+
 @router.get("", response_model=ConversationListResponse)
 async def get_conversations(
     limit: int = Query(20, ge=1, le=100, description="取得件数"),
-    offset: int = Query(0, ge=0, description="オフセット"),
+    offset: int = Query(0, ge=0, description="オフセット（cursor 指定時は無視）"),
+    cursor: Optional[str] = Query(None, description="次ページ取得用カーソル（前回レスポンスの next_cursor）"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
     会話一覧を取得
     
-    - 自分が参加している会話の一覧
-    - 最後のメッセージ情報を含む
+    - 自分が参加している会話の一覧（ブロック関係にあるユーザーとの会話は除外）
+    - 最後のメッセージ情報を含む（会話に非正規化した last_message_* 列を読む）
     - 未読メッセージ数を含む
-    - 最後のメッセージ日時順に並び替え
+    - 最後のメッセージ日時順に並び替え（自分の参加行の (user_id, last_activity_at, conversation_id) のインデックス順）
+    - cursor 指定時はキーセットページング（総数は数えない）。指定しない場合は offset によるページング
     """
-    
-    # 自分が参加している会話IDを取得
-    my_conversations_query = select(ConversationMember.conversation_id).where(
-        ConversationMember.user_id == current_user.id
-    )
-    
-    # 総数取得（ブロックされたユーザーとの会話を除外するため、後で再計算）
-    # まずは全件数を取得（後でフィルタリング）
-    count_query = select(func.count()).select_from(
-        select(Conversation.id).where(
-            Conversation.id.in_(my_conversations_query)
-        ).subquery()
-    )
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-    
-    # 会話取得
-    conversations_query = await db.execute(
-        select(Conversation)
-        .where(Conversation.id.in_(my_conversations_query))
-        .order_by(Conversation.updated_at.desc())
-        .limit(limit)
-        .offset(offset)
-    )
-    conversations = conversations_query.scalars().all()
-    
-    if not conversations:
-        return ConversationListResponse(
-            conversations=[],
-            total=total,
-            limit=limit,
-            offset=offset,
-        )
-    
-    conversation_ids = [conv.id for conv in conversations]
-    
-    # パフォーマンス最適化: 全会話のメンバーを一括取得
-    members_query = await db.execute(
-        select(ConversationMember)
-        .where(ConversationMember.conversation_id.in_(conversation_ids))
-        .options(selectinload(ConversationMember.user))
-    )
-    all_members = members_query.scalars().all()
-    
-    # 会話IDごとにメンバーを整理
-    members_dict = {}
-    for member in all_members:
-        if member.conversation_id not in members_dict:
-            members_dict[member.conversation_id] = []
-        members_dict[member.conversation_id].append(member)
-    
-    # パフォーマンス最適化: 全会話の最後のメッセージを一括取得
-    # 各会話の最新メッセージIDを取得するサブクエリ
-    latest_message_subquery = (
-        select(
-            Message.conversation_id,
-            func.max(Message.id).label("max_id")
-        )
-        .where(Message.conversation_id.in_(conversation_ids))
-        .group_by(Message.conversation_id)
-        .subquery()
-    )
-    
-    # 最新メッセージを取得
-    latest_messages_query = await db.execute(
-        select(Message)
-        .join(
-            latest_message_subquery,
-            and_(
-                Message.conversation_id == latest_message_subquery.c.conversation_id,
-                Message.id == latest_message_subquery.c.max_id
-            )
-        )
-        .options(selectinload(Message.sender))
+    after = _decode_activity_cursor(cursor)
+    not_blocked = not_excluded(_other.user_id, current_user.id, kinds=BLOCK_KINDS)
+    
+    total = None
+    if after is None:
+        count_query = select(func.count()).select_from(
+            _member_conversations(current_user.id, _mine.id).where(not_blocked).subquery()
+        )
+        total = (await db.execute(count_query)).scalar() or 0
+    
+    # 会話・相手ユーザー・既読位置・未読数を1本で取得
+    page_query = _activity_page(
+        _member_conversations(current_user.id, *_page_columns())
+        .join(Conversation, Conversation.id == _mine.conversation_id)
+        .join(User, User.id == _other.user_id)
+        .where(not_blocked),
+        after,
+        limit,
     )
-    latest_messages = latest_messages_query.scalars().all()
-    
-    # 会話IDごとに最新メッセージを整理
-    latest_message_dict = {msg.conversation_id: msg for msg in latest_messages}
-    
-    # パフォーマンス最適化: 全会話の未読メッセージ数を一括取得
-    unread_counts_query = await db.execute(
-        select(
-            Message.conversation_id,
-            func.count(Message.id).label("unread_count")
-        )
-        .where(
-            and_(
-                Message.conversation_id.in_(conversation_ids),
-                Message.sender_id != current_user.id,
-                Message.is_read == False
-            )
-        )
-        .group_by(Message.conversation_id)
-    )
-    unread_counts = unread_counts_query.all()
-    
-    # 会話IDごとに未読数を整理
-    unread_count_dict = {row[0]: row[1] for row in unread_counts}
-    
-    # パフォーマンス最適化: ブロック状態を一括取得
-    all_other_user_ids = []
-    for conv in conversations:
-        members = members_dict.get(conv.id, [])
-        for member in members:
-            if member.user_id != current_user.id:
-                all_other_user_ids.append(member.user_id)
-                break
-    
-    # ブロック状態を一括取得
-    blocked_user_ids = set()
-    blocking_user_ids = set()
-    if all_other_user_ids:
-        # 自分がブロックしたユーザー
-        blocked_query = await db.execute(
-            select(Block.blocked_id).where(
-                and_(
-                    Block.blocker_id == current_user.id,
-                    Block.blocked_id.in_(all_other_user_ids)
-                )
-            )
-        )
-        blocked_user_ids = {row[0] for row in blocked_query.all()}
-        
-        # 自分をブロックしたユーザー
-        blocking_query = await db.execute(
-            select(Block.blocker_id).where(
-                and_(
-                    Block.blocked_id == current_user.id,
-                    Block.blocker_id.in_(all_other_user_ids)
-                )
-            )
-        )
-        blocking_user_ids = {row[0] for row in blocking_query.all()}
+    if after is None:
+        page_query = page_query.offset(offset)
+    else:
+        offset = 0
+    rows, next_cursor = _split_page((await db.execute(page_query)).all(), limit)
     
     # レスポンス整形
     conversation_reads = []
-    for conv in conversations:
-        # 相手ユーザーを取得（1対1会話の場合）
-        members = members_dict.get(conv.id, [])
-        other_user = None
-        for member in members:
-            if member.user_id != current_user.id:
-                other_user = member.user
-                break
-        
-        if not other_user:
-            continue  # 相手ユーザーがいない場合はスキップ
-        
-        # ブロック状態をチェック（ブロックされている場合はスキップ）
-        if other_user.id in blocked_user_ids or other_user.id in blocking_user_ids:
-            continue  # ブロックされている場合は会話を表示しない
-        
-        # 最後のメッセージ
-        last_msg = latest_message_dict.get(conv.id)
-        last_message = None
-        if last_msg:
-            last_message = LastMessage(
-                id=last_msg.id,
-                content=last_msg.content,
-                sender_id=last_msg.sender_id,
-                created_at=last_msg.created_at,
-                is_read=last_msg.is_read,
-            )
-        
-        # 未読数
-        unread_count = unread_count_dict.get(conv.id, 0)
-        
+    for _, conv, other_user, my_last_read, other_last_read, unread_count in rows:
         conversation_reads.append(
             ConversationRead(
                 id=conv.id,
@@ -373,24 +409,90 @@ async def get_conversations(
                     is_online=other_user.is_online,
                     last_seen_at=other_user.last_seen_at,
                 ),
-                last_message=last_message,
+                last_message=_last_message(conv, current_user.id, my_last_read, other_user.id, other_last_read),
                 unread_count=unread_count,
                 created_at=conv.created_at,
                 updated_at=conv.updated_at,
             )
         )
     
-    # 実際に表示される会話数に合わせてtotalを更新
-    actual_total = len(conversation_reads)
-    
     return ConversationListResponse(
         conversations=conversation_reads,
-        total=actual_total,
+        total=total,
         limit=limit,
         offset=offset,
+        next_cursor=next_cursor,
     )
 
 
+@router.get("/inbox", response_model=InboxResponse)
+async def get_inbox(
+    limit: int = Query(20, ge=1, le=100, description="取得件数"),
+    cursor: Optional[str] = Query(None, description="次ページ取得用カーソル（前回レスポンスの next_cursor）"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    受信箱（アプリ起動時の会話一覧）を取得
+    
+    - 会話ごとに相手のプロフィールカード・最後のメッセージ・未読数・ブロック関係を返す
+    - 会話・相手ユーザー・既読位置・未読数・ブロック関係は1本のクエリで取得し、
+      カードのタグはキャッシュにない相手の分だけもう1本で読み込む（計2本まで）
+    - (last_activity_at, conversation_id) のキーセットページング（総数は数えない）
+    - ブロック関係にある相手との会話も除外せず、block_state で返す
+    """
+    after = _decode_activity_cursor(cursor)
+    
+    try:
+        blocked = exists().where(Block.blocker_id == current_user.id, Block.blocked_id == _other.user_id)
+        blocked_by = exists().where(Block.blocker_id == _other.user_id, Block.blocked_id == current_user.id)
+        page_query = _activity_page(
+            _member_conversations(
+                current_user.id,
+                *_page_columns(),
+                blocked.label("blocked"),
+                blocked_by.label("blocked_by"),
+            )
+            .join(Conversation, Conversation.id == _mine.conversation_id)
+            .join(User, User.id == _other.user_id),
+            after,
+            limit,
+        )
+        rows, next_cursor = _split_page((await db.execute(page_query)).all(), limit)
+        cards = await profile_cards.build_cards(db, [row[2] for row in rows])
+    except Exception as e:
+        logger.error(f"[Chat Debug] Inbox failed: user_id={current_user.id}, error={e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="受信箱の取得に失敗しました",
+        )
+    
+    items = []
+    for activity_at, conv, other_user, my_last_read, other_last_read, unread_count, is_blocked, is_blocked_by in rows:
+        block_state = BlockState.none
+        if is_blocked:
+            block_state = BlockState.blocked
+        elif is_blocked_by:
+            block_state = BlockState.blocked_by
+        items.append(
+            InboxItem(
+                id=conv.id,
+                type=conv.type,
+                title=conv.title,
+                other_user=cards[other_user.id],
+                is_online=other_user.is_online,
+                last_message=_last_message(conv, current_user.id, my_last_read, other_user.id, other_last_read),
+                unread_count=unread_count,
+                block_state=block_state,
+                last_activity_at=activity_at,
+                created_at=conv.created_at,
+            )
+        )
+    
+    logger.info(f"[Chat Debug] Inbox: user_id={current_user.id}, items={len(items)}, has_next={next_cursor is not None}")
+    return InboxResponse(conversations=items, limit=limit, next_cursor=next_cursor)
+
+
 # ==================== 会話作成エンドポイント ====================
 
 @router.post("", response_model=ConversationDetail, status_code=status.HTTP_201_CREATED)
@@ -522,7 +624,10 @@ async def get_conversation_detail(
 async def get_messages(
     conversation_id: int,
     limit: int = Query(50, ge=1, le=100, description="取得件数"),
-    offset: int = Query(0, ge=0, description="オフセット"),
+    offset: int = Query(0, ge=0, description="オフセット（before_id / after_id / latest 指定時は無視）"),
+    before_id: Optional[int] = Query(None, gt=0, description="このIDより古いメッセージを新しい順に取得"),
+    after_id: Optional[int] = Query(None, gt=0, description="このIDより新しいメッセージを古い順に取得（差分同期用）"),
+    latest: bool = Query(False, description="最新のメッセージから新しい順に取得"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -530,9 +635,17 @@ async def get_messages(
     メッセージ履歴を取得
     
     - 会話の参加者のみ取得可能
-    - 古い順に並び替え
-    - ページネーション対応
+    - before_id / after_id / latest 指定時は (conversation_id, id) のインデックスでキーセットページングする
+      （総数は数えず、続きがあるかを has_more で返す）
+      - latest, before_id: 新しい順。続きは最後のメッセージのIDを before_id に指定する
+      - after_id: 古い順。続きは最後のメッセージのIDを after_id に指定する
+    - いずれも指定しない場合は従来どおり古い順のオフセットページング
     """
+    if before_id is not None and after_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="before_id and after_id cannot be used together",
+        )
     
     # 会話の存在確認
     conversation = await db.get(Conversation, conversation_id)
@@ -542,31 +655,51 @@ async def get_messages(
             detail="Conversation not found",
         )
     
-    # 参加者チェック
-    is_member = await check_conversation_member(conversation_id, current_user.id, db)
-    if not is_member:
+    # 参加者チェック（既読表示に使う参加者ごとの既読位置も同時に取得）
+    watermarks = await get_read_watermarks(conversation_id, db)
+    if current_user.id not in watermarks:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not a member of this conversation",
         )
     
-    # 総数取得
-    count_query = select(func.count()).select_from(Message).where(
-        Message.conversation_id == conversation_id
-    )
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-    
-    # メッセージ取得（古い順）
-    messages_query = await db.execute(
+    messages_query = (
         select(Message)
         .where(Message.conversation_id == conversation_id)
         .options(selectinload(Message.sender))
-        .order_by(Message.created_at.asc())
-        .limit(limit)
-        .offset(offset)
     )
-    messages = messages_query.scalars().all()
+    total = None
+    has_more = False
+    if before_id is not None or after_id is not None or latest:
+        # キーセットページング（1件多く取得して続きの有無を判定）
+        if after_id is not None:
+            messages_query = messages_query.where(Message.id > after_id).order_by(Message.id.asc())
+        else:
+            if before_id is not None:
+                messages_query = messages_query.where(Message.id < before_id)
+            messages_query = messages_query.order_by(Message.id.desc())
+        result = await db.execute(messages_query.limit(limit + 1))
+        messages = result.scalars().all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        offset = 0
+    else:
+        # 総数取得
+        count_query = select(func.count()).select_from(Message).where(
+            Message.conversation_id == conversation_id
+        )
+        total_result = await db.execute(count_query)
+        total = total_result.scalar() or 0
+        
+        # メッセージ取得（古い順）
+        result = await db.execute(
+            messages_query
+            .order_by(Message.created_at.asc())
+            .limit(limit)
+            .offset(offset)
+        )
+        messages = result.scalars().all()
+        has_more = offset + len(messages) < total
     
     # レスポンス整形
     message_reads = [
@@ -575,7 +708,7 @@ async def get_messages(
             content=msg.content,
             sender_id=msg.sender_id,
             sender_name=msg.sender.display_name,
-            is_read=msg.is_read,
+            is_read=is_read_by_recipient(msg.id, msg.sender_id, watermarks),
             created_at=msg.created_at,
             message_type=msg.message_type,
             file_path=msg.file_path,
@@ -590,6 +723,7 @@ async def get_messages(
         total=total,
         limit=limit,
         offset=offset,
+        has_more=has_more,
     )
 
 
@@ -606,7 +740,7 @@ async def send_message(
     メッセージを送信
     
     - 会話の参加者のみ送信可能
-    - 会話のupdated_atを更新
+    - 同じトランザクションで会話の最後のメッセージ・updated_at と参加者の並び順キーを更新
     """
     
     # 会話の存在確認
@@ -630,16 +764,16 @@ async def send_message(
         conversation_id=conversation_id,
         sender_id=current_user.id,
         content=payload.content,
-        is_read=False,
         message_type=payload.message_type,
         file_path=payload.file_path,
         file_size=payload.file_size,
         duration_seconds=payload.duration_seconds,
     )
     db.add(new_message)
+    await db.flush()  # IDと作成日時を取得するためにflush
     
-    # 会話のupdated_atを更新
-    conversation.updated_at = datetime.now(timezone.utc)
+    # 会話一覧用の最後のメッセージを更新
+    await record_last_message(new_message, db)
     
     await db.commit()
     await db.refresh(new_message)
@@ -652,7 +786,7 @@ async def send_message(
         content=new_message.content,
         sender_id=new_message.sender_id,
         sender_name=new_message.sender.display_name,
-        is_read=new_message.is_read,
+        is_read=False,
         created_at=new_message.created_at,
         message_type=new_message.message_type,
         file_path=new_message.file_path,
@@ -663,6 +797,36 @@ async def send_message(
 
 # ==================== 既読マークエンドポイント ====================
 
+@router.put("/{conversation_id}/read", response_model=ConversationReadStateResponse)
+async def mark_conversation_as_read(
+    conversation_id: int,
+    payload: ConversationReadUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    指定したメッセージまで（未指定なら最新まで）をまとめて既読にする
+    
+    - 会話の参加者のみ可能
+    - 既読位置を1本のUPDATEで進めるだけで、未読件数によらず書き込みは1回
+    - 既読位置は戻らない（古いメッセージIDを指定しても変わらない）
+    """
+    last_read_message_id = await advance_read_watermark(
+        conversation_id, current_user.id, db, payload.up_to_message_id
+    )
+    if last_read_message_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this conversation",
+        )
+    await db.commit()
+    
+    return ConversationReadStateResponse(
+        conversation_id=conversation_id,
+        last_read_message_id=last_read_message_id,
+    )
+
+
 @router.put("/{conversation_id}/messages/{message_id}/read", response_model=MessageReadResponse)
 async def mark_message_as_read(
     conversation_id: int,
@@ -675,6 +839,7 @@ async def mark_message_as_read(
     
     - 会話の参加者のみ可能
     - 自分が送信したメッセージ以外のみ
+    - 既読位置をこのメッセージまで進める（それ以前のメッセージもまとめて既読になる）
     """
     
     # メッセージの存在確認
@@ -685,14 +850,6 @@ async def mark_message_as_read(
             detail="Message not found",
         )
     
-    # 参加者チェック
-    is_member = await check_conversation_member(conversation_id, current_user.id, db)
-    if not is_member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this conversation",
-        )
-    
     # 自分が送信したメッセージは既読マークできない
     if message.sender_id == current_user.id:
         raise HTTPException(
@@ -700,8 +857,13 @@ async def mark_message_as_read(
             detail="Cannot mark your own message as read",
         )
     
-    # 既読マーク
-    message.is_read = True
+    # 既読マーク（参加者でなければ更新されない）
+    last_read_message_id = await advance_read_watermark(conversation_id, current_user.id, db, message_id)
+    if last_read_message_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this conversation",
+        )
     await db.commit()
     
     return MessageReadResponse(
@@ -722,7 +884,7 @@ async def get_unread_count(
     未読メッセージ数を取得
     
     - 会話の参加者のみ取得可能
-    - 自分以外が送信した未読メッセージの数
+    - 自分の既読位置より後に、自分以外が送信したメッセージの数
     """
     
     # 会話の存在確認
@@ -733,26 +895,27 @@ async def get_unread_count(
             detail="Conversation not found",
         )
     
-    # 参加者チェック
-    is_member = await check_conversation_member(conversation_id, current_user.id, db)
-    if not is_member:
+    # 未読メッセージ数を取得（参加者でなければ自分の参加者行がないため None）
+    count_query = (
+        select(ConversationMember.id, func.count(Message.id))
+        .outerjoin(Message, unread_messages_condition(ConversationMember))
+        .where(
+            and_(
+                ConversationMember.conversation_id == conversation_id,
+                ConversationMember.user_id == current_user.id,
+            )
+        )
+        .group_by(ConversationMember.id)
+    )
+    result = await db.execute(count_query)
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not a member of this conversation",
         )
     
-    # 未読メッセージ数を取得
-    count_query = select(func.count()).select_from(Message).where(
-        and_(
-            Message.conversation_id == conversation_id,
-            Message.sender_id != current_user.id,
-            Message.is_read == False
-        )
-    )
-    result = await db.execute(count_query)
-    unread_count = result.scalar() or 0
-    
-    return UnreadCountResponse(unread_count=unread_count)
+    return UnreadCountResponse(unread_count=row[1])
 
 
 # ==================== オンライン状態管理エンドポイント ====================
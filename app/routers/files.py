@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.models.user import User
 from app.core.security import get_current_user
+from app.services.profile_cards import profile_cards
 from typing import Optional
 import os
 import uuid
@@ -250,6 +251,7 @@ async def upload_avatar(
     current_user.avatar_url = str(file_path)
     await db.commit()
     await db.refresh(current_user)
+    profile_cards.invalidate(current_user.id)
     
     return {
         "avatar_url": str(file_path),
@@ -1,5 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.core.config import settings
+from app.core.security import get_current_admin_user
+from app.models.user import User
+from app.services.exclusion_service import exclusion_sets
+from app.services.profile_cards import profile_cards
+from app.services.search_facets import search_facets
+from app.services.search_results import search_result_cache
 
 router = APIRouter(tags=["health"])
 
@@ -29,3 +35,13 @@ async def config_check():
         "allowed_domain": settings.ALLOWED_EMAIL_DOMAIN,
         # パスワードやシークレットキーは表示しない
     }
+
+@router.get("/health/caches")
+async def cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """プロセス内キャッシュのヒット率など（管理者のみ・このワーカーの値）"""
+    return {
+        "search_results": search_result_cache.stats(),
+        "search_facets": search_facets.stats(),
+        "exclusion_sets": exclusion_sets.stats(),
+        "profile_cards": profile_cards.stats(),
+    }
@@ -27,6 +27,10 @@ from app.schemas.safety import (
     UserInfo,
 )
 from app.core.security import get_current_user, get_current_admin_user
+from app.routers.chat import check_users_blocked
+from app.services.exclusion_service import exclusion_sets
+from app.services.match_service import match_store
+from app.services.recommendation_service import recommendations
 from typing import Optional
 
 # 通報ルーター
@@ -255,8 +259,12 @@ async def create_block(
         blocked_id=payload.blocked_user_id,
     )
     db.add(new_block)
+    # ブロックした相手とのマッチは解消する
+    await match_store.remove(db, current_user.id, payload.blocked_user_id)
+    await recommendations.mark_dirty(db, [current_user.id, payload.blocked_user_id])
     await db.commit()
     await db.refresh(new_block)
+    exclusion_sets.record_block(current_user.id, payload.blocked_user_id)
     
     return BlockResponse(
         id=new_block.id,
@@ -347,7 +355,13 @@ async def remove_block(
         )
     
     await db.delete(block)
+    await db.flush()
+    # 相手からもブロックされていなければ、残っている相互いいねからマッチを作り直す
+    if not await check_users_blocked(current_user.id, blocked_user_id, db):
+        await match_store.restore(db, current_user.id, blocked_user_id)
+    await recommendations.mark_dirty(db, [current_user.id, blocked_user_id])
     await db.commit()
+    exclusion_sets.remove_block(current_user.id, blocked_user_id)
     
     return BlockRemoveResponse(
         message="Block removed successfully",
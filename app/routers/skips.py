@@ -4,20 +4,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
-from sqlalchemy.orm import selectinload
 from app.db.session import get_db
 from app.models.skip import Skip
-from app.models.like import Like
 from app.models.user import User
-from app.models.tag import UserTag
 from app.schemas.skip import (
     SkipCreate,
     SkipRead,
     SkipListResponse,
     SkipDeleteResponse,
 )
-from app.schemas.user import UserWithTags
 from app.core.security import get_current_user
+from app.services.exclusion_service import LIKED, exclusion_sets, not_excluded
+from app.services.profile_cards import profile_cards
+from app.services.recommendation_service import recommendations
 
 router = APIRouter(prefix="/skips", tags=["skips"])
 
@@ -76,7 +75,9 @@ async def create_skip(
         skipped_id=payload.skipped_user_id,
     )
     db.add(new_skip)
+    await recommendations.mark_dirty(db, [current_user_id])
     await db.commit()
+    exclusion_sets.record_skip(current_user_id, payload.skipped_user_id)
     
     return SkipDeleteResponse(message="User skipped successfully")
 
@@ -97,99 +98,39 @@ async def get_skips(
     - 自分がスキップしたユーザー
     - かつ、自分がまだいいねしていないユーザー
     """
-    # すでに自分がいいねしたユーザーID（マッチ済みも含む）
-    my_liked_users_result = await db.execute(
-        select(Like.liked_id).where(Like.liker_id == current_user.id)
-    )
-    my_liked_user_ids = {row[0] for row in my_liked_users_result.all()}
-
-    skip_filters = [Skip.skipper_id == current_user.id]
-    if my_liked_user_ids:
-        skip_filters.append(Skip.skipped_id.not_in(my_liked_user_ids))
+    # すでに自分がいいねしたユーザー（マッチ済みも含む）はアンチジョインでSQL内で除外
+    skip_filters = [
+        Skip.skipper_id == current_user.id,
+        not_excluded(Skip.skipped_id, current_user.id, kinds=(LIKED,)),
+    ]
 
     # 総数取得
     count_query = select(func.count()).select_from(Skip).where(and_(*skip_filters))
     total_result = await db.execute(count_query)
     total = total_result.scalar() or 0
     
-    # スキップ一覧取得
+    # スキップ一覧取得（相手ユーザーはプロフィールカードとして別途まとめて読み込む）
     query = (
-        select(Skip)
+        select(Skip.id, Skip.skipped_id, Skip.created_at)
         .where(and_(*skip_filters))
-        .options(selectinload(Skip.skipped))
         .order_by(Skip.created_at.desc())
         .limit(limit)
         .offset(offset)
     )
     result = await db.execute(query)
-    skips = result.scalars().all()
-    
-    # スキップしたユーザーIDのリスト
-    skipped_user_ids = [skip.skipped_id for skip in skips]
-    
-    # タグ情報を一括取得
-    if skipped_user_ids:
-        skipped_user_tags_query = await db.execute(
-            select(UserTag)
-            .where(UserTag.user_id.in_(skipped_user_ids))
-            .options(selectinload(UserTag.tag))
-        )
-        skipped_user_tags = skipped_user_tags_query.scalars().all()
-    else:
-        skipped_user_tags = []
+    skips = result.all()
     
-    user_tags_dict = {}
-    for user_tag in skipped_user_tags:
-        user_tags_dict.setdefault(user_tag.user_id, []).append(
-            {
-                "id": user_tag.tag.id,
-                "name": user_tag.tag.name,
-                "description": user_tag.tag.description,
-            }
-        )
+    # 相手のプロフィールを一括取得（ユーザー・タグの2本）
+    cards = await profile_cards.get_cards(db, [skip.skipped_id for skip in skips])
     
-    # レスポンス整形
-    skips_read = []
-    for skip in skips:
-        tags = user_tags_dict.get(skip.skipped_id, [])
-        if not skip.skipped.show_tags:
-            tags = []
-        
-        skipped_user = UserWithTags(
-            id=skip.skipped.id,
-            email=None,
-            display_name=skip.skipped.display_name,
-            bio=skip.skipped.bio if skip.skipped.show_bio else None,
-            avatar_url=skip.skipped.avatar_url,
-            campus=skip.skipped.campus,
-            faculty=skip.skipped.faculty if skip.skipped.show_faculty else None,
-            grade=skip.skipped.grade if skip.skipped.show_grade else None,
-            birthday=skip.skipped.birthday if skip.skipped.show_birthday else None,
-            gender=skip.skipped.gender if skip.skipped.show_gender else None,
-            sexuality=skip.skipped.sexuality if skip.skipped.show_sexuality else None,
-            looking_for=skip.skipped.looking_for if skip.skipped.show_looking_for else None,
-            profile_completed=skip.skipped.profile_completed,
-            is_active=skip.skipped.is_active,
-            created_at=skip.skipped.created_at,
-            show_faculty=skip.skipped.show_faculty,
-            show_grade=skip.skipped.show_grade,
-            show_birthday=skip.skipped.show_birthday,
-            show_age=skip.skipped.show_age,
-            show_gender=skip.skipped.show_gender,
-            show_sexuality=skip.skipped.show_sexuality,
-            show_looking_for=skip.skipped.show_looking_for,
-            show_bio=skip.skipped.show_bio,
-            show_tags=skip.skipped.show_tags,
-            tags=tags,
-        )
-        
-        skips_read.append(
-            SkipRead(
-                id=skip.id,
-                skipped_user=skipped_user,
-                created_at=skip.created_at,
-            )
+    skips_read = [
+        SkipRead(
+            id=skip.id,
+            skipped_user=cards[skip.skipped_id],
+            created_at=skip.created_at,
         )
+        for skip in skips
+    ]
     
     return SkipListResponse(
         skips=skips_read,
@@ -228,7 +169,9 @@ async def remove_skip(
         )
     
     await db.delete(skip)
+    await recommendations.mark_dirty(db, [current_user.id])
     await db.commit()
+    exclusion_sets.remove_skip(current_user.id, skipped_user_id)
     
     return SkipDeleteResponse(message="Skip removed successfully")
 
@@ -0,0 +1,156 @@
+# app/routers/swipes.py
+# スワイプ（いいね・スキップ）のまとめて送信
+
+from datetime import datetime
+from typing import Dict, List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db.dialect import insert_for
+from app.db.session import get_db
+from app.models.like import Like
+from app.models.skip import Skip
+from app.models.user import User
+from app.schemas.swipe import (
+    SwipeAction,
+    SwipeBatchCreate,
+    SwipeBatchResponse,
+    SwipeResult,
+    SwipeResultStatus,
+)
+from app.core.security import get_current_user
+from app.routers.chat import create_or_get_conversation
+from app.services.exclusion_service import exclusion_sets
+from app.services.match_service import match_store
+from app.services.recommendation_service import recommendations
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/swipes", tags=["swipes"])
+
+
+@router.post("/batch", response_model=SwipeBatchResponse)
+async def send_swipes(
+    payload: SwipeBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    いいね・スキップをまとめて送信
+
+    - 相手ユーザーの存在とブロック関係は、バッチ全体で1回ずつ確認する
+    - いいね・スキップはそれぞれ1本の INSERT ... ON CONFLICT DO NOTHING で作成する
+      （既に存在するものは already_exists として返す）
+    - 今回のいいねで成立したマッチは1本のクエリでまとめて判定する
+    - 結果は送信された順に、項目ごとのステータスで返す
+    """
+    current_user_id = current_user.id
+
+    # 同じ相手の2件目以降と自分自身は無効
+    results: List[SwipeResult] = []
+    seen = set()
+    for item in payload.swipes:
+        item_status = SwipeResultStatus.created
+        if item.user_id == current_user_id or item.user_id in seen:
+            item_status = SwipeResultStatus.invalid
+        seen.add(item.user_id)
+        results.append(SwipeResult(user_id=item.user_id, action=item.action, status=item_status))
+    pending = [result for result in results if result.status == SwipeResultStatus.created]
+
+    try:
+        # 相手ユーザーの存在確認（1本）
+        target_ids = [result.user_id for result in pending]
+        existing_query = await db.execute(select(User.id).where(User.id.in_(target_ids)))
+        existing_ids = set(existing_query.scalars().all())
+
+        # ブロック関係（双方向）の確認。他ワーカーでの変更も反映するためDBから読み直す（1本）
+        exclusion_set = await exclusion_sets.load(db, current_user_id)
+
+        for result in pending:
+            if result.user_id not in existing_ids:
+                result.status = SwipeResultStatus.not_found
+            elif result.action == SwipeAction.like and exclusion_set.is_blocked(result.user_id):
+                result.status = SwipeResultStatus.blocked
+
+        like_ids = [r.user_id for r in pending if r.status == SwipeResultStatus.created and r.action == SwipeAction.like]
+        skip_ids = [r.user_id for r in pending if r.status == SwipeResultStatus.created and r.action == SwipeAction.skip]
+        dialect_name = db.bind.dialect.name
+
+        # いいね・スキップを一括作成（既存の組は作成されず RETURNING に含まれない）
+        liked_at: Dict[int, datetime] = {}
+        if like_ids:
+            # 同時に送られた相互いいねを取りこぼさないよう、いいねの作成前に組のロックを取る
+            await match_store.lock_pairs(db, current_user_id, like_ids)
+            statement = (
+                insert_for(dialect_name, Like)
+                .values([{"liker_id": current_user_id, "liked_id": user_id} for user_id in like_ids])
+                .on_conflict_do_nothing(index_elements=["liker_id", "liked_id"])
+                .returning(Like.liked_id, Like.created_at)
+            )
+            liked_at = dict((await db.execute(statement)).all())
+
+        created_skip_ids = set()
+        if skip_ids:
+            statement = (
+                insert_for(dialect_name, Skip)
+                .values([{"skipper_id": current_user_id, "skipped_id": user_id} for user_id in skip_ids])
+                .on_conflict_do_nothing(index_elements=["skipper_id", "skipped_id"])
+                .returning(Skip.skipped_id)
+            )
+            created_skip_ids = set((await db.execute(statement)).scalars().all())
+
+        # 今回のいいねのうち、相手からもいいねされているものをまとめて判定（1本、いいねの作成後に行う）
+        matched_at: Dict[int, datetime] = {}
+        if liked_at:
+            reverse_query = await db.execute(
+                select(Like.liker_id).where(
+                    Like.liker_id.in_(list(liked_at)),
+                    Like.liked_id == current_user_id,
+                )
+            )
+            # 成立日時は後にいいねした方＝今回のいいねの日時
+            matched_at = {user_id: liked_at[user_id] for user_id in reverse_query.scalars().all()}
+            await match_store.record_many(db, current_user_id, matched_at)
+
+        if liked_at or created_skip_ids:
+            await recommendations.mark_dirty(db, [current_user_id])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"[Swipe Debug] Batch swipe failed: user_id={current_user_id}, error={e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="スワイプの送信に失敗しました",
+        )
+
+    for result in pending:
+        if result.status != SwipeResultStatus.created:
+            continue
+        created_ids = liked_at if result.action == SwipeAction.like else created_skip_ids
+        if result.user_id not in created_ids:
+            result.status = SwipeResultStatus.already_exists
+            continue
+        if result.action == SwipeAction.like:
+            exclusion_sets.record_like(current_user_id, result.user_id)
+        else:
+            exclusion_sets.record_skip(current_user_id, result.user_id)
+        if result.user_id in matched_at:
+            result.is_match = True
+            result.matched_at = matched_at[result.user_id]
+
+    # マッチ成立時はトークルームを自動生成（失敗してもいいね・マッチは成立済み）
+    for user_id in matched_at:
+        try:
+            await create_or_get_conversation(current_user_id, user_id, db)
+        except Exception as e:
+            logger.warning("Auto-create conversation on match failed: %s", e, exc_info=True)
+
+    logger.info(
+        f"[Swipe Debug] Batch swipe: user_id={current_user_id}, items={len(results)}, "
+        f"likes={len(liked_at)}, skips={len(created_skip_ids)}, matches={len(matched_at)}"
+    )
+    return SwipeBatchResponse(
+        results=results,
+        created=len(liked_at) + len(created_skip_ids),
+        matches=len(matched_at),
+    )
@@ -12,12 +12,19 @@ from app.schemas.tag import (
     TagRead,
     TagWithUserCount,
     TagListResponse,
+    PopularTagsResponse,
+    TagSuggestion,
+    TagAutocompleteResponse,
     UserTagAdd,
     UserTagRead,
     UserTagListResponse,
     TagAddResponse,
 )
 from app.core.security import get_current_user
+from app.services.profile_cards import profile_cards
+from app.services.recommendation_service import recommendations
+from app.services.tag_index_service import tag_index
+from app.services.tag_autocomplete import tag_autocomplete
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
@@ -50,23 +57,8 @@ async def get_tags(
     result = await db.execute(query)
     tags = result.scalars().all()
     
-    # 各タグのユーザー数を取得
-    tags_with_count = []
-    for tag in tags:
-        count_query = select(func.count()).select_from(UserTag).where(UserTag.tag_id == tag.id)
-        count_result = await db.execute(count_query)
-        user_count = count_result.scalar() or 0
-        
-        tags_with_count.append(
-            TagWithUserCount(
-                id=tag.id,
-                name=tag.name,
-                description=tag.description,
-                created_at=tag.created_at,
-                updated_at=tag.updated_at,
-                user_count=user_count,
-            )
-        )
+    # ユーザー数は tags.user_count（user_tags の追加・削除時に更新される）から読む
+    tags_with_count = [TagWithUserCount.model_validate(tag) for tag in tags]
     
     return TagListResponse(
         tags=tags_with_count,
@@ -105,10 +97,52 @@ async def create_tag(
     db.add(new_tag)
     await db.commit()
     await db.refresh(new_tag)
+    tag_autocomplete.add(new_tag.id, new_tag.name)
     
     return new_tag
 
 
+@router.get("/popular", response_model=PopularTagsResponse)
+async def get_popular_tags(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    人気タグ（利用ユーザー数の多い順）を取得
+    
+    - tags.user_count のインデックスを降順に読むだけで応答する
+    """
+    result = await db.execute(
+        select(Tag).order_by(Tag.user_count.desc(), Tag.id.desc()).limit(limit)
+    )
+    return PopularTagsResponse(
+        tags=[TagWithUserCount.model_validate(tag) for tag in result.scalars().all()]
+    )
+
+
+@router.get("/autocomplete", response_model=TagAutocompleteResponse)
+async def autocomplete_tags(
+    q: str = Query(..., min_length=1, max_length=64, description="入力中のタグ名（前方一致）"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    タグ名のオートコンプリート
+    
+    - タグ名、または名前中の単語が q で始まるタグを利用ユーザー数の多い順に返す
+    - プロセス内のインデックスから応答する（インデックスが未構築・期限切れの場合のみDBから構築）
+    """
+    await tag_autocomplete.ensure_loaded(db)
+    await tag_index.ensure_loaded(db)
+    suggestions = tag_autocomplete.suggest(q, limit)
+    return TagAutocompleteResponse(
+        tags=[
+            TagSuggestion(id=suggestion.tag_id, name=suggestion.name, user_count=suggestion.user_count)
+            for suggestion in suggestions
+        ]
+    )
+
+
 @router.get("/{tag_id}", response_model=TagRead)
 async def get_tag(
     tag_id: int,
@@ -146,8 +180,13 @@ async def delete_tag(
             detail="Tag not found",
         )
     
+    await recommendations.mark_tag_holders_dirty(db, tag_id)
     await db.delete(tag)
     await db.commit()
+    tag_index.drop_tag(tag_id)
+    tag_autocomplete.remove(tag_id)
+    # タグを持っていたユーザーのカードに影響するため全件破棄する
+    profile_cards.invalidate_all()
     
     return None
 
@@ -1,18 +1,20 @@
 # app/routers_users.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, distinct, text
+from sqlalchemy import select, and_, or_, func, distinct, exists, delete
 from sqlalchemy.orm import selectinload
 from app.db.session import get_db
+from app.db.dialect import insert_for
+from app.db.statement_counter import StatementCounter
 from app.models.user import User
-from app.models.tag import Tag, UserTag
+from app.models.tag import Tag, UserTag, tag_user_count_updates
 from app.models.like import Like
-from app.models.block import Block
-from app.models.skip import Skip
+from app.models.looking_for import UserLookingFor
 from app.schemas.user import UserCreate, UserRead, UserWithTags, InitialProfileCreate, PrivacySettingsUpdate
 from app.schemas.tag import (
     UserTagAdd,
+    UserTagsReplace,
     UserTagRead,
     UserTagListResponse,
     TagAddResponse,
@@ -21,13 +23,29 @@ from app.schemas.tag import (
 from app.schemas.search import (
     UserSearchResponse,
     UserSearchResult,
+    SearchFacetsResponse,
+    FacetCount,
     UserSuggestionsResponse,
     UserSuggestion,
     TagInfo,
     LikeStatus,
     SortOrder,
 )
+from app.core.config import settings
+from app.core.cursor import decode_cursor, encode_cursor
 from app.core.security import get_current_user
+from app.services.tag_index_service import tag_index
+from app.services.tag_autocomplete import tag_autocomplete
+from app.services.suggestion_planner import SuggestionQueryPlanner, fetch_viewer_tags
+from app.services.exclusion_service import exclusion_sets, not_excluded
+from app.services.ranking_engine import similarity_ranker
+from app.services.recommendation_service import recommendations
+from app.services.suggestion_sessions import SuggestionSession, suggestion_sessions
+from app.services.text_search import apply_text_search
+from app.services.search_query import SearchFilters, filter_conditions
+from app.services.search_facets import search_facets
+from app.services.search_results import search_result_cache
+from app.services.profile_cards import profile_cards
 from typing import Optional
 from datetime import date, datetime
 import sys
@@ -76,6 +94,48 @@ def _expand_filter_aliases(values: list[str], alias_map: dict[str, list[str]]) -
         expanded.update(alias_map.get(normalized_value, []))
     return list(expanded)
 
+
+def _years_before(today: date, years: int) -> date:
+    """today から years 年前の日付（2/29 で該当日がない年は 2/28）"""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+
+def _birthday_range_for_age(
+    age_min: Optional[int], age_max: Optional[int], today: date
+) -> tuple[Optional[date], Optional[date]]:
+    """
+    年齢の範囲を誕生日の範囲に変換する
+
+    Returns:
+        (born_after, born_on_or_before): born_after < birthday <= born_on_or_before（Noneは制限なし）
+    """
+    born_on_or_before = _years_before(today, age_min) if age_min is not None else None
+    born_after = _years_before(today, age_max + 1) if age_max is not None else None
+    return born_after, born_on_or_before
+
+
+def _order_search_query(query, sort_key: str, relevance=None):
+    """検索クエリに並び順を付ける（同値の場合は id で順序を確定させる）"""
+    if sort_key == "relevance":
+        return query.order_by(relevance.desc(), User.id.desc())
+    if sort_key == "display_name":
+        return query.order_by(User.display_name.asc(), User.id.asc())
+    # RECENT / POPULAR（TODO: 将来的にいいね数などで並び替え）
+    return query.order_by(User.created_at.desc(), User.id.desc())
+
+
+def _search_next_cursor(sort_key: str, last_user: User, next_offset: int) -> str:
+    """検索結果の次ページ用カーソル"""
+    if sort_key == "relevance":
+        return encode_cursor({"k": sort_key, "o": next_offset})
+    if sort_key == "display_name":
+        return encode_cursor({"k": sort_key, "n": last_user.display_name, "i": last_user.id})
+    return encode_cursor({"k": sort_key, "t": last_user.created_at.isoformat(), "i": last_user.id})
+
+
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 
 # 関数シグネチャ
@@ -134,8 +194,17 @@ async def update_me(
         current_user.sexuality = payload.sexuality
     if payload.looking_for is not None:
         current_user.looking_for = payload.looking_for
+    # 検索条件・ファセットの対象項目が変わる場合は検索結果とファセット件数のキャッシュを破棄する
+    search_fields_changed = any(
+        getattr(payload, field) is not None
+        for field in ("display_name", "bio", "campus", "faculty", "grade", "sexuality")
+    )
     await db.commit()
     await db.refresh(current_user)
+    profile_cards.invalidate(current_user.id)
+    if search_fields_changed:
+        search_facets.invalidate()
+        search_result_cache.invalidate()
     return current_user
 
 # 初回プロフィール登録エンドポイント
@@ -172,6 +241,9 @@ async def complete_initial_profile(
     print(f"[InitialProfile API] Committing to database...")
     await db.commit()
     await db.refresh(current_user)
+    search_facets.invalidate()
+    search_result_cache.invalidate()
+    profile_cards.invalidate(current_user.id)
     print(f"[InitialProfile API] Profile completed successfully for user {current_user.id}")
     return current_user
 
@@ -211,6 +283,10 @@ async def update_privacy_settings(
     
     await db.commit()
     await db.refresh(current_user)
+    # 公開設定は検索結果・ファセット件数に反映されるため、キャッシュを破棄する
+    search_facets.invalidate()
+    search_result_cache.invalidate()
+    profile_cards.invalidate(current_user.id)
     return current_user
 
 
@@ -288,8 +364,11 @@ async def add_tag_to_me(
         tag_id=payload.tag_id,
     )
     db.add(new_user_tag)
+    await recommendations.mark_dirty(db, [current_user.id])
     await db.commit()
     await db.refresh(new_user_tag)
+    tag_index.add(current_user.id, payload.tag_id)
+    profile_cards.invalidate(current_user.id)
     
     return TagAddResponse(
         message="Tag added successfully",
@@ -303,6 +382,116 @@ async def add_tag_to_me(
     )
 
 
+@router.put("/me/tags", response_model=UserTagListResponse)
+async def replace_my_tags(
+    payload: UserTagsReplace,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    自分のタグを一括で置き換え（認証必要）
+    
+    - tag_ids / tag_names で指定したタグの集合に置き換える（空の場合はすべて外す）
+    - 存在しない名前のタグは作成する
+    - 現在のタグとの差分だけを 1回の INSERT … ON CONFLICT DO NOTHING と 1回の DELETE で反映する（1トランザクション）
+    """
+    dialect_name = db.bind.dialect.name
+    tag_names = []
+    for name in payload.tag_names:
+        name = name.strip()
+        if not name or len(name) > 64:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Tag names must be 1-64 characters",
+            )
+        if name not in tag_names:
+            tag_names.append(name)
+    requested_ids = set(payload.tag_ids)
+    
+    try:
+        # 存在しない名前のタグを作成（同時に作成された場合は既存のものを使う）
+        created_tags = []
+        if tag_names:
+            result = await db.execute(
+                insert_for(dialect_name, Tag)
+                .values([{"name": name} for name in tag_names])
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(Tag.id, Tag.name)
+            )
+            created_tags = result.all()
+        
+        # 指定されたタグID・タグ名を1回で解決
+        desired_ids = set()
+        if requested_ids or tag_names:
+            result = await db.execute(
+                select(Tag.id, Tag.name).where(or_(Tag.id.in_(requested_ids), Tag.name.in_(tag_names)))
+            )
+            resolved = result.all()
+            missing_ids = requested_ids - {tag_id for tag_id, _ in resolved}
+            if missing_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Tags not found: {sorted(missing_ids)}",
+                )
+            desired_ids = {tag_id for tag_id, _ in resolved}
+        
+        result = await db.execute(select(UserTag.tag_id).where(UserTag.user_id == current_user.id))
+        current_ids = {row[0] for row in result.all()}
+        
+        added_ids = []
+        removed_ids = []
+        to_add = desired_ids - current_ids
+        if to_add:
+            result = await db.execute(
+                insert_for(dialect_name, UserTag)
+                .values([{"user_id": current_user.id, "tag_id": tag_id} for tag_id in sorted(to_add)])
+                .on_conflict_do_nothing(index_elements=["user_id", "tag_id"])
+                .returning(UserTag.tag_id)
+            )
+            added_ids = [row[0] for row in result.all()]
+        to_remove = current_ids - desired_ids
+        if to_remove:
+            result = await db.execute(
+                delete(UserTag)
+                .where(UserTag.user_id == current_user.id, UserTag.tag_id.in_(to_remove))
+                .returning(UserTag.tag_id)
+            )
+            removed_ids = [row[0] for row in result.all()]
+        
+        # ORMを経由しない変更のため、利用ユーザー数は明示的に更新する
+        deltas = {tag_id: 1 for tag_id in added_ids}
+        deltas.update({tag_id: -1 for tag_id in removed_ids})
+        for statement in tag_user_count_updates(deltas):
+            await db.execute(statement)
+        if deltas:
+            await recommendations.mark_dirty(db, [current_user.id])
+        await db.commit()
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"[Tags Debug] Error replacing tags for user {current_user.id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"タグ更新エラー: {str(e)}"
+        )
+    
+    for tag_id, name in created_tags:
+        tag_autocomplete.add(tag_id, name)
+    for tag_id in added_ids:
+        tag_index.add(current_user.id, tag_id)
+    for tag_id in removed_ids:
+        tag_index.remove(current_user.id, tag_id)
+    profile_cards.invalidate(current_user.id)
+    logger.info(
+        f"[Tags Debug] Replaced tags for user {current_user.id}: "
+        f"added={added_ids}, removed={removed_ids}, created={[tag_id for tag_id, _ in created_tags]}"
+    )
+    
+    return await get_my_tags(current_user=current_user, db=db)
+
+
 @router.delete("/me/tags/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_tag_from_me(
     tag_id: int,
@@ -330,7 +519,10 @@ async def remove_tag_from_me(
         )
     
     await db.delete(user_tag)
+    await recommendations.mark_dirty(db, [current_user.id])
     await db.commit()
+    tag_index.remove(current_user.id, tag_id)
+    profile_cards.invalidate(current_user.id)
     
     return None
 
@@ -345,8 +537,10 @@ async def search_users(
     grade: Optional[str] = Query(None, description="学年"),
     search: Optional[str] = Query(None, description="フリーテキスト検索（display_name, bio）"),
     limit: int = Query(20, ge=1, le=100, description="取得件数"),
-    offset: int = Query(0, ge=0, description="オフセット"),
+    offset: int = Query(0, ge=0, description="オフセット（cursor 指定時は無視）"),
     sort: SortOrder = Query(SortOrder.RECENT, description="並び順"),
+    cursor: Optional[str] = Query(None, description="次ページ取得用カーソル（前回レスポンスの next_cursor）"),
+    include_total: bool = Query(False, description="2ページ目以降でも総数を計算するか"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -354,9 +548,11 @@ async def search_users(
     ユーザー検索・フィルタリング
     
     - タグや属性（学部・学年）で絞り込み検索
-    - フリーテキスト検索（display_name, bio）
+    - フリーテキスト検索（display_name, bio）。sort=relevance で関連度順
     - 複数条件での絞り込み
-    - ページネーション対応
+    - ページネーション対応（cursor によるキーセットページング推奨。offset も引き続き利用可能）
+    - 総数（total）は最初のページ、または include_total=true の場合のみ計算する
+    - 同じ条件・並び順の結果IDは閲覧者間で共有してキャッシュし、閲覧者ごとの除外は後から適用する
     - いいね状態を含む
     - ブロックユーザーを除外
     - 自分自身を除外
@@ -366,18 +562,48 @@ async def search_users(
         # ========== リクエストパラメータのログ出力 ==========
         logger.info(f"[Search Debug] ========== Search Request Started ==========")
         logger.info(f"[Search Debug] User ID: {current_user.id}")
-        logger.info(f"[Search Debug] Request params - tags: {tags}, campus: {campus}, faculty: {faculty}, grade: {grade}, search: {search}, limit: {limit}, offset: {offset}, sort: {sort}")
-        print(f"[Search Debug] Request params - tags: {tags}, campus: {campus}, faculty: {faculty}, grade: {grade}, search: {search}, limit: {limit}, offset: {offset}, sort: {sort}", file=sys.stderr)
+        logger.info(f"[Search Debug] Request params - tags: {tags}, campus: {campus}, faculty: {faculty}, grade: {grade}, search: {search}, limit: {limit}, offset: {offset}, sort: {sort}, cursor: {cursor}")
+        print(f"[Search Debug] Request params - tags: {tags}, campus: {campus}, faculty: {faculty}, grade: {grade}, search: {search}, limit: {limit}, offset: {offset}, sort: {sort}, cursor: {cursor}", file=sys.stderr)
+
+        search = search.strip() if search else None
+
+        # ========== カーソルの解析 ==========
+        # 並び順ごとのキー: 名前順は (display_name, id) 昇順、関連度順は関連度降順（オフセット）、
+        # それ以外は (created_at, id) 降順
+        if sort == SortOrder.RELEVANCE and search:
+            sort_key = "relevance"
+        elif sort == SortOrder.ALPHABETICAL:
+            sort_key = "display_name"
+        else:
+            sort_key = "created_at"
+        after = None
+        if cursor:
+            try:
+                cursor_payload = decode_cursor(cursor)
+                if cursor_payload.get("k") != sort_key:
+                    raise ValueError("sort mismatch")
+                if sort_key == "relevance":
+                    # 関連度は浮動小数のためキーにせず、カーソルにオフセットを持たせる
+                    cursor_offset = int(cursor_payload["o"])
+                    if cursor_offset < 0:
+                        raise ValueError("negative offset")
+                elif sort_key == "display_name":
+                    after = (str(cursor_payload["n"]), int(cursor_payload["i"]))
+                else:
+                    after = (datetime.fromisoformat(cursor_payload["t"]), int(cursor_payload["i"]))
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="カーソルが不正です"
+                )
+            offset = cursor_offset if sort_key == "relevance" else 0
         
         # ========== 基本クエリ構築 ==========
+        # 閲覧者に依存しない条件のみ（結果IDを閲覧者間で共有するため。自分自身・除外ユーザーは後で適用）
         try:
             logger.info(f"[Search Debug] Building base query...")
-            query = select(User).where(
-                and_(
-                    User.is_active == True,
-                    User.id != current_user.id
-                )
-            )
+            query = select(User).where(User.is_active == True)
+            relevance = None
             logger.info(f"[Search Debug] Base query built successfully")
         except Exception as e:
             logger.error(f"[Search Debug] Error building base query: {str(e)}", exc_info=True)
@@ -386,297 +612,196 @@ async def search_users(
                 detail=f"クエリ構築エラー: {str(e)}"
             )
         
-        # ========== ブロックユーザーを除外 ==========
-        try:
-            logger.info(f"[Search Debug] Fetching blocked users...")
-            blocked_users_query = select(Block.blocked_id).where(Block.blocker_id == current_user.id)
-            blocking_users_query = select(Block.blocker_id).where(Block.blocked_id == current_user.id)
-            
-            blocked_user_ids_result = await db.execute(blocked_users_query)
-            blocked_user_ids = {row[0] for row in blocked_user_ids_result.all()}
-            logger.info(f"[Search Debug] Blocked user IDs (I blocked): {len(blocked_user_ids)} users")
-            
-            blocking_users_ids_result = await db.execute(blocking_users_query)
-            blocking_user_ids = {row[0] for row in blocking_users_ids_result.all()}
-            logger.info(f"[Search Debug] Blocking user IDs (blocked me): {len(blocking_user_ids)} users")
-            
-            excluded_user_ids = blocked_user_ids | blocking_user_ids
-            logger.info(f"[Search Debug] Total excluded user IDs: {len(excluded_user_ids)}")
-            
-            if excluded_user_ids:
-                query = query.where(User.id.not_in(excluded_user_ids))
-                logger.info(f"[Search Debug] Excluded user IDs filter applied")
-        except Exception as e:
-            logger.error(f"[Search Debug] Error fetching blocked users: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"ブロックユーザー取得エラー: {str(e)}"
-            )
-
-        # ========== すでにいいねを送ったユーザーを除外（探す画面に表示しない） ==========
+        # ========== フィルター条件の構築 ==========
+        # タグ・キャンパス・学部・学年はすべてSQLの条件式として組み立てる（途中結果をPythonに取り出さない）
         try:
-            logger.info(f"[Search Debug] Fetching sent like user IDs...")
-            sent_likes_query = await db.execute(
-                select(Like.liked_id).where(Like.liker_id == current_user.id)
-            )
-            sent_like_user_ids = {row[0] for row in sent_likes_query.all()}
-            logger.info(f"[Search Debug] Sent like user IDs: {len(sent_like_user_ids)} users")
-            if sent_like_user_ids:
-                excluded_user_ids = excluded_user_ids | sent_like_user_ids
-                query = query.where(User.id.not_in(sent_like_user_ids))
-                logger.info(f"[Search Debug] Excluded already-liked users from search results")
+            filters = SearchFilters.from_params(tags=tags, campus=campus, faculty=faculty, grade=grade, search=search)
+            filters_applied = filters.applied()
+            for filter_name, condition in filter_conditions(filters).items():
+                query = query.where(condition)
+                logger.info(f"[Search Debug] Filter '{filter_name}' applied: {filters_applied[filter_name]}")
         except Exception as e:
-            logger.error(f"[Search Debug] Error fetching sent likes: {str(e)}", exc_info=True)
+            logger.error(f"[Search Debug] Error building filters: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"いいね取得エラー: {str(e)}"
+                detail=f"フィルター構築エラー: {str(e)}"
             )
-
-        # ========== 自分がスキップしたユーザーを除外（探す画面に再表示しない） ==========
+        
+        # フリーテキスト検索
+        if filters.search:
+            try:
+                logger.info(f"[Search Debug] Processing search filter: {filters.search}")
+                # PostgreSQL はトライグラムインデックス、SQLite は FTS5 で検索（bio は show_bio=True のみ）
+                text_search = apply_text_search(query, db.bind.dialect.name, filters.search)
+                query = text_search.query
+                relevance = text_search.relevance
+                logger.info(f"[Search Debug] Search filter '{filters.search}' applied")
+            except Exception as e:
+                logger.error(f"[Search Debug] Error processing search filter: {str(e)}", exc_info=True)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"検索フィルターエラー: {str(e)}"
+                )
+        
+        logger.info(f"[Search Debug] All filters applied: {filters_applied}")
+        
+        need_total = include_total or (cursor is None and offset == 0)
+        total = None
+        next_cursor = None
+        
+        # ========== 結果IDキャッシュ ==========
+        # 同じ条件・並び順の結果IDは全閲覧者で共有し、閲覧者ごとの除外はID列に対して適用する
         try:
-            logger.info(f"[Search Debug] Fetching skipped user IDs...")
-            skipped_users_query = await db.execute(
-                select(Skip.skipped_id).where(Skip.skipper_id == current_user.id)
-            )
-            skipped_user_ids = {row[0] for row in skipped_users_query.all()}
-            logger.info(f"[Search Debug] Skipped user IDs: {len(skipped_user_ids)} users")
-            if skipped_user_ids:
-                excluded_user_ids = excluded_user_ids | skipped_user_ids
-                query = query.where(User.id.not_in(skipped_user_ids))
-                logger.info(f"[Search Debug] Excluded already-skipped users from search results")
+            cache_key = (filters.signature(), sort_key)
+            ranked_ids = search_result_cache.get(cache_key)
+            if ranked_ids is None:
+                id_query = _order_search_query(query.with_only_columns(User.id), sort_key, relevance)
+                id_result = await db.execute(id_query.limit(search_result_cache.max_ids + 1))
+                # 上限を超える条件はキャッシュせず、下のSQLでのページングに任せる
+                ranked_ids = search_result_cache.put(cache_key, [row[0] for row in id_result.all()])
+                logger.info(f"[Search Debug] Result ID cache miss (cached={ranked_ids is not None})")
+            else:
+                logger.info(f"[Search Debug] Result ID cache hit: {len(ranked_ids)} ids")
+            
+            start = 0
+            if ranked_ids is not None and after is not None:
+                if after[1] in ranked_ids:
+                    start = ranked_ids.index(after[1]) + 1
+                else:
+                    # カーソルのユーザーがキャッシュ後に結果から外れた場合はSQLでページングする
+                    ranked_ids = None
         except Exception as e:
-            logger.error(f"[Search Debug] Error fetching skipped users: {str(e)}", exc_info=True)
+            logger.error(f"[Search Debug] Error reading result ID cache: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"スキップ取得エラー: {str(e)}"
+                detail=f"検索結果キャッシュエラー: {str(e)}"
             )
         
-        # ========== フィルター条件の構築 ==========
-        filters_applied = {}
-        
-        # タグでのフィルタリング
-        if tags:
+        if ranked_ids is not None:
+            # ========== キャッシュしたID列からページを切り出す ==========
             try:
-                logger.info(f"[Search Debug] Processing tags filter: {tags}")
-                tag_names = [tag.strip() for tag in tags.split(",") if tag.strip()]
-                logger.info(f"[Search Debug] Parsed tag names: {tag_names}")
+                # 除外集合（ワーカーごとのキャッシュ。最大TTL分古い）はID列の間引きにのみ使い、
+                # 表示するユーザーのブロック・除外はページ取得のSQL（アンチジョイン）で最終判定する
+                exclusion_set = await exclusion_sets.get(db, current_user.id)
+                excluded = exclusion_set.ids() | {current_user.id}
+                if need_total:
+                    total = sum(1 for user_id in ranked_ids if user_id not in excluded)
+                visible_ids = [user_id for user_id in ranked_ids[start:] if user_id not in excluded]
+                page_ids = visible_ids[offset:offset + limit + 1]
                 
-                if tag_names:
-                    filters_applied["tags"] = tag_names
-                    
-                    # 各タグに対してサブクエリを作成（AND条件）
-                    for idx, tag_name in enumerate(tag_names):
-                        try:
-                            logger.info(f"[Search Debug] Processing tag {idx+1}/{len(tag_names)}: '{tag_name}'")
-                            
-                            # タグ名からタグIDを取得
-                            tag_subquery = select(Tag.id).where(Tag.name.ilike(f"%{tag_name}%"))
-                            tag_result = await db.execute(tag_subquery)
-                            tag_ids = [row[0] for row in tag_result.all()]
-                            logger.info(f"[Search Debug] Found {len(tag_ids)} tag IDs for '{tag_name}': {tag_ids}")
-                            
-                            if not tag_ids:
-                                logger.warning(f"[Search Debug] No tags found matching '{tag_name}', skipping this tag")
-                                continue
-                            
-                            # そのタグを持つユーザーIDを取得（タグを公開しているユーザーのみ）
-                            user_with_tag_subquery = select(UserTag.user_id).where(
-                                and_(
-                                    UserTag.tag_id.in_(tag_ids),
-                                    UserTag.user_id.in_(select(User.id).where(User.show_tags == True))
-                                )
-                            )
-                            user_with_tag_result = await db.execute(user_with_tag_subquery)
-                            user_ids_with_tag = [row[0] for row in user_with_tag_result.all()]
-                            logger.info(f"[Search Debug] Found {len(user_ids_with_tag)} users with tag '{tag_name}' (showing tags)")
-                            
-                            query = query.where(User.id.in_(user_with_tag_subquery))
-                            logger.info(f"[Search Debug] Tag filter '{tag_name}' applied to query")
-                        except Exception as e:
-                            logger.error(f"[Search Debug] Error processing tag '{tag_name}': {str(e)}", exc_info=True)
-                            raise HTTPException(
-                                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                                detail=f"タグフィルター処理エラー (tag: {tag_name}): {str(e)}"
-                            )
+                users = []
+                if page_ids:
+                    page_result = await db.execute(
+                        select(User).where(
+                            User.id.in_(page_ids[:limit]),
+                            User.is_active == True,
+                            not_excluded(User.id, current_user.id),
+                        )
+                    )
+                    users_by_id = {user.id: user for user in page_result.scalars().all()}
+                    # キャッシュ後に退会したユーザー・他ワーカーでブロック等した（された）ユーザーは除く
+                    users = [users_by_id[user_id] for user_id in page_ids[:limit] if user_id in users_by_id]
+                if len(page_ids) > limit and users:
+                    next_cursor = _search_next_cursor(sort_key, users[-1], offset + limit)
             except Exception as e:
-                logger.error(f"[Search Debug] Error in tags filter: {str(e)}", exc_info=True)
+                logger.error(f"[Search Debug] Error paging cached results: {str(e)}", exc_info=True)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"タグフィルターエラー: {str(e)}"
+                    detail=f"ユーザー取得エラー: {str(e)}"
                 )
-        
-        # キャンパスでのフィルタリング（複数選択対応）
-        if campus:
+        else:
+            # ========== 除外ユーザー（自分自身・ブロック・いいね送信済み・スキップ済み）を除外 ==========
+            # 除外IDはPythonに取り出さず、共通のアンチジョイン条件としてSQL内で処理する
             try:
-                logger.info(f"[Search Debug] Processing campus filter: {campus}")
-                campus_list = [c.strip() for c in campus.split(",") if c.strip()]
-                logger.info(f"[Search Debug] Parsed campus list: {campus_list}")
-                if campus_list:
-                    filters_applied["campus"] = campus_list
-                    # OR条件で複数のキャンパスに一致するユーザーを検索
-                    campus_conditions = [User.campus.ilike(f"%{c}%") for c in campus_list]
-                    query = query.where(or_(*campus_conditions))
-                    logger.info(f"[Search Debug] Campus filter '{campus_list}' applied")
+                query = query.where(User.id != current_user.id, not_excluded(User.id, current_user.id))
+                logger.info(f"[Search Debug] Exclusion anti-join applied")
             except Exception as e:
-                logger.error(f"[Search Debug] Error processing campus filter: {str(e)}", exc_info=True)
+                logger.error(f"[Search Debug] Error applying exclusion filter: {str(e)}", exc_info=True)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"キャンパスフィルターエラー: {str(e)}"
+                    detail=f"除外ユーザー条件エラー: {str(e)}"
                 )
-        
-        # キャンパスでのフィルタリング（複数選択対応）
-        if campus:
+            
+            # ========== 総数取得（最初のページ、または明示的に要求された場合のみ） ==========
             try:
-                logger.info(f"[Search Debug] Processing campus filter: {campus}")
-                campus_list = [c.strip() for c in campus.split(",") if c.strip()]
-                logger.info(f"[Search Debug] Parsed campus list: {campus_list}")
-                if campus_list:
-                    filters_applied["campus"] = campus_list
-                    # OR条件で複数のキャンパスに一致するユーザーを検索
-                    campus_conditions = [User.campus.ilike(f"%{c}%") for c in campus_list]
-                    query = query.where(or_(*campus_conditions))
-                    logger.info(f"[Search Debug] Campus filter '{campus_list}' applied")
+                if need_total:
+                    logger.info(f"[Search Debug] Counting total results...")
+                    count_query = select(func.count()).select_from(query.subquery())
+                    total_result = await db.execute(count_query)
+                    total = total_result.scalar() or 0
+                    logger.info(f"[Search Debug] Total count: {total}")
             except Exception as e:
-                logger.error(f"[Search Debug] Error processing campus filter: {str(e)}", exc_info=True)
+                logger.error(f"[Search Debug] Error counting results: {str(e)}", exc_info=True)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"キャンパスフィルターエラー: {str(e)}"
+                    detail=f"件数取得エラー: {str(e)}"
                 )
-        
-        # 学部でのフィルタリング（複数選択対応）
-        if faculty:
+            
+            # ========== 並び替え ==========
             try:
-                logger.info(f"[Search Debug] Processing faculty filter: {faculty}")
-                faculty_list = [f.strip() for f in faculty.split(",") if f.strip()]
-                logger.info(f"[Search Debug] Parsed faculty list: {faculty_list}")
-                if faculty_list:
-                    filters_applied["faculty"] = faculty_list
-                    # OR条件で複数の学部に一致するユーザーを検索（プライバシー設定を考慮）
-                    faculty_conditions = [
-                    and_(
-                            User.faculty.ilike(f"%{f}%"),
-                        User.show_faculty == True
+                logger.info(f"[Search Debug] Applying sort: {sort}")
+                query = _order_search_query(query, sort_key, relevance)
+                # キーセットページング
+                if after is not None and sort_key == "display_name":
+                    query = query.where(
+                        or_(
+                            User.display_name > after[0],
+                            and_(User.display_name == after[0], User.id > after[1]),
+                        )
                     )
-                        for f in faculty_list
-                    ]
-                    query = query.where(or_(*faculty_conditions))
-                    logger.info(f"[Search Debug] Faculty filter '{faculty_list}' applied")
+                elif after is not None:
+                    query = query.where(
+                        or_(
+                            User.created_at < after[0],
+                            and_(User.created_at == after[0], User.id < after[1]),
+                        )
+                    )
+                logger.info(f"[Search Debug] Sort applied: {sort}")
             except Exception as e:
-                logger.error(f"[Search Debug] Error processing faculty filter: {str(e)}", exc_info=True)
+                logger.error(f"[Search Debug] Error applying sort: {str(e)}", exc_info=True)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"学部フィルターエラー: {str(e)}"
+                    detail=f"並び替えエラー: {str(e)}"
                 )
-        
-        # 学年でのフィルタリング（複数選択対応）
-        if grade:
+            
+            # ========== ページネーション ==========
             try:
-                logger.info(f"[Search Debug] Processing grade filter: {grade}")
-                grade_list = [g.strip() for g in grade.split(",") if g.strip()]
-                logger.info(f"[Search Debug] Parsed grade list: {grade_list}")
-                if grade_list:
-                    filters_applied["grade"] = grade_list
-                    # OR条件で複数の学年に一致するユーザーを検索（プライバシー設定を考慮）
-                    grade_conditions = [
-                    and_(
-                            User.grade.ilike(f"%{g}%"),
-                        User.show_grade == True
-                    )
-                        for g in grade_list
-                    ]
-                    query = query.where(or_(*grade_conditions))
-                    logger.info(f"[Search Debug] Grade filter '{grade_list}' applied")
+                logger.info(f"[Search Debug] Applying pagination: limit={limit}, offset={offset}")
+                # 次ページの有無を判定するため1件多く取得する
+                query = query.limit(limit + 1)
+                if offset:
+                    query = query.offset(offset)
             except Exception as e:
-                logger.error(f"[Search Debug] Error processing grade filter: {str(e)}", exc_info=True)
+                logger.error(f"[Search Debug] Error applying pagination: {str(e)}", exc_info=True)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"学年フィルターエラー: {str(e)}"
+                    detail=f"ページネーションエラー: {str(e)}"
                 )
-        
-        # フリーテキスト検索
-        if search:
+            
+            # ========== ユーザー取得 ==========
             try:
-                logger.info(f"[Search Debug] Processing search filter: {search}")
-                filters_applied["search"] = search
-                search_filter = or_(
-                    User.display_name.ilike(f"%{search}%"),
-                    and_(User.bio.ilike(f"%{search}%"), User.show_bio == True)
-                )
-                query = query.where(search_filter)
-                logger.info(f"[Search Debug] Search filter '{search}' applied")
+                logger.info(f"[Search Debug] Executing main query...")
+                result = await db.execute(query)
+                users = result.scalars().all()
+                if len(users) > limit:
+                    users = users[:limit]
+                    next_cursor = _search_next_cursor(sort_key, users[-1], offset + limit)
             except Exception as e:
-                logger.error(f"[Search Debug] Error processing search filter: {str(e)}", exc_info=True)
+                logger.error(f"[Search Debug] Error executing main query: {str(e)}", exc_info=True)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"検索フィルターエラー: {str(e)}"
+                    detail=f"ユーザー取得エラー: {str(e)}"
                 )
         
-        logger.info(f"[Search Debug] All filters applied: {filters_applied}")
-        
-        # ========== 総数取得 ==========
-        try:
-            logger.info(f"[Search Debug] Counting total results...")
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await db.execute(count_query)
-            total = total_result.scalar() or 0
-            logger.info(f"[Search Debug] Total count: {total}")
-        except Exception as e:
-            logger.error(f"[Search Debug] Error counting results: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"件数取得エラー: {str(e)}"
-            )
-        
-        # ========== 並び替え ==========
-        try:
-            logger.info(f"[Search Debug] Applying sort: {sort}")
-            if sort == SortOrder.RECENT:
-                query = query.order_by(User.created_at.desc())
-            elif sort == SortOrder.ALPHABETICAL:
-                query = query.order_by(User.display_name.asc())
-            elif sort == SortOrder.POPULAR:
-                # TODO: 将来的にいいね数などで並び替え
-                query = query.order_by(User.created_at.desc())
-            logger.info(f"[Search Debug] Sort applied: {sort}")
-        except Exception as e:
-            logger.error(f"[Search Debug] Error applying sort: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"並び替えエラー: {str(e)}"
-            )
-        
-        # ========== ページネーション ==========
-        try:
-            logger.info(f"[Search Debug] Applying pagination: limit={limit}, offset={offset}")
-            query = query.limit(limit).offset(offset)
-        except Exception as e:
-            logger.error(f"[Search Debug] Error applying pagination: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"ページネーションエラー: {str(e)}"
-            )
-        
-        # ========== ユーザー取得 ==========
-        try:
-            logger.info(f"[Search Debug] Executing main query...")
-            result = await db.execute(query)
-            users = result.scalars().all()
-            logger.info(f"[Search Debug] Found {len(users)} users")
-            
-            if not users:
-                logger.info(f"[Search Debug] No users found, returning empty response")
-                return UserSearchResponse(
-                    users=[],
-                    total=total,
-                    limit=limit,
-                    offset=offset,
-                    filters_applied=filters_applied,
-                )
-        except Exception as e:
-            logger.error(f"[Search Debug] Error executing main query: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"ユーザー取得エラー: {str(e)}"
+        logger.info(f"[Search Debug] Found {len(users)} users")
+        if not users:
+            logger.info(f"[Search Debug] No users found, returning empty response")
+            return UserSearchResponse(
+                users=[],
+                total=total,
+                limit=limit,
+                offset=offset,
+                filters_applied=filters_applied,
             )
         
         user_ids = [user.id for user in users]
@@ -778,6 +903,7 @@ async def search_users(
                 limit=limit,
                 offset=offset,
                 filters_applied=filters_applied,
+                next_cursor=next_cursor,
             )
         except Exception as e:
             logger.error(f"[Search Debug] Error building response: {str(e)}", exc_info=True)
@@ -798,10 +924,48 @@ async def search_users(
         )
 
 
+@router.get("/search/facets", response_model=SearchFacetsResponse)
+async def get_search_facets(
+    tags: Optional[str] = Query(None, description="カンマ区切りのタグ名"),
+    campus: Optional[str] = Query(None, description="キャンパス名"),
+    faculty: Optional[str] = Query(None, description="学部名"),
+    grade: Optional[str] = Query(None, description="学年"),
+    search: Optional[str] = Query(None, description="フリーテキスト検索（display_name, bio）"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    検索フィルターのファセット件数
+    
+    - 現在のフィルター条件での キャンパス・学部・学年・セクシュアリティ・タグ の値ごとのユーザー数
+    - キャンパス・学部・学年は、そのファセット自身の絞り込みを外した件数（複数選択のため）
+    - 公開設定がONのユーザーのみ数える
+    - 閲覧者ごとの除外は反映しない（全閲覧者で共有してキャッシュする）
+    """
+    try:
+        filters = SearchFilters.from_params(tags=tags, campus=campus, faculty=faculty, grade=grade, search=search)
+        logger.info(f"[Facets Debug] User ID: {current_user.id}, filters: {filters.applied()}")
+        counts = await search_facets.get_counts(db, filters)
+        return SearchFacetsResponse(
+            **{
+                facet: [FacetCount(value=value, count=count) for value, count in values]
+                for facet, values in counts.items()
+            },
+            filters_applied=filters.applied(),
+        )
+    except Exception as e:
+        logger.error(f"[Facets Debug] Error computing facets: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"ファセット集計エラー: {str(e)}"
+        )
+
+
 # ==================== おすすめユーザーエンドポイント ====================
 
 @router.get("/suggestions", response_model=UserSuggestionsResponse)
 async def get_user_suggestions(
+    response: Response,
     limit: int = Query(10, ge=1, le=100, description="取得件数"),
     sexuality: Optional[str] = Query(None, description="セクシュアリティフィルター（カンマ区切り）"),
     relationship_goal: Optional[str] = Query(None, description="関係性目標フィルター（カンマ区切り、dating, friends, casual, long_term, other）"),
@@ -812,33 +976,53 @@ async def get_user_suggestions(
     age_min: Optional[int] = Query(None, ge=0, le=150, description="最小年齢"),
     age_max: Optional[int] = Query(None, ge=0, le=150, description="最大年齢"),
     sort: SortOrder = Query(SortOrder.RECENT, description="並び順（recent, alphabetical, popular）"),
+    cursor: Optional[str] = Query(None, description="次ページ取得用カーソル（前回レスポンスの next_cursor）"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
     おすすめユーザー取得
     
-    - 共通タグ数に基づくおすすめ
+    - タグの類似度に基づくおすすめ
+    - フィルター未指定時はバックグラウンドジョブが事前計算した user_recommendations を読む
     - マッチスコア付き
     - ブロックユーザーを除外
     - 自分自身を除外
     - すでにいいねを送ったユーザーを除外（探す画面に表示しない）
     - フィルター対応（sexuality, relationship_goal, campus, faculty, grade, sex, age_min, age_max）
+    - 除外対象はSQL内のアンチジョインで処理し、発行SQL数（認証を除く、このエンドポイントが発行した全SQL）を
+      X-Suggestion-Statements ヘッダーで返す
+    - 順位付け結果はセッションとして保持し、next_cursor で続きのページを返す（ページごとに再計算しない）
     """
+    statements = StatementCounter(db).start()
     try:
         # ========== リクエストパラメータのログ出力 ==========
         logger.info(f"[Suggestions Debug] ========== Suggestions Request Started ==========")
         logger.info(f"[Suggestions Debug] User ID: {current_user.id}")
         logger.info(f"[Suggestions Debug] Request params - limit: {limit}, sexuality: {sexuality}, relationship_goal: {relationship_goal}, campus: {campus}, faculty: {faculty}, grade: {grade}, sex: {sex}, age_min: {age_min}, age_max: {age_max}")
         print(f"[Suggestions Debug] Request params - limit: {limit}, sexuality: {sexuality}, relationship_goal: {relationship_goal}, campus: {campus}, faculty: {faculty}, grade: {grade}, sex: {sex}, age_min: {age_min}, age_max: {age_max}", file=sys.stderr)
+
+        # ========== カーソルの解析 ==========
+        cursor_payload = None
+        if cursor:
+            try:
+                cursor_payload = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="カーソルが不正です"
+                )
+        # セッションは同じフィルター条件でのみ続きを返す
+        filter_signature = (sexuality, relationship_goal, campus, faculty, grade, sex, age_min, age_max)
     
         # ========== 自分のタグを取得 ==========
+        # 自分のタグは直前の編集を反映するため user_tags から読む（他ワーカーのタグ転置インデックスは
+        # 最大 TAG_INDEX_MAX_AGE_SECONDS 古い）。インデックスは候補ユーザーの列挙にのみ使う
+        # 事前計算済みのおすすめの有無も同じSQLで確認する
         try:
             logger.info(f"[Suggestions Debug] Fetching my tags...")
-            my_tags_query = await db.execute(
-                select(UserTag.tag_id).where(UserTag.user_id == current_user.id)
-            )
-            my_tag_ids = [row[0] for row in my_tags_query.all()]
+            await tag_index.ensure_loaded(db)
+            my_tag_ids, has_precomputed = await fetch_viewer_tags(db, current_user.id)
             logger.info(f"[Suggestions Debug] Found {len(my_tag_ids)} tags for current user: {my_tag_ids}")
         except Exception as e:
             logger.error(f"[Suggestions Debug] Error fetching my tags: {str(e)}", exc_info=True)
@@ -847,68 +1031,6 @@ async def get_user_suggestions(
                 detail=f"タグ取得エラー: {str(e)}"
             )
 
-        # ========== ブロックユーザーを除外 ==========
-        try:
-            logger.info(f"[Suggestions Debug] Fetching blocked users...")
-            blocked_users_query = select(Block.blocked_id).where(Block.blocker_id == current_user.id)
-            blocking_users_query = select(Block.blocker_id).where(Block.blocked_id == current_user.id)
-
-            blocked_user_ids_result = await db.execute(blocked_users_query)
-            blocked_user_ids = {row[0] for row in blocked_user_ids_result.all()}
-            logger.info(f"[Suggestions Debug] Blocked user IDs (I blocked): {len(blocked_user_ids)} users")
-
-            blocking_users_ids_result = await db.execute(blocking_users_query)
-            blocking_user_ids = {row[0] for row in blocking_users_ids_result.all()}
-            logger.info(f"[Suggestions Debug] Blocking user IDs (blocked me): {len(blocking_user_ids)} users")
-
-            excluded_user_ids = blocked_user_ids | blocking_user_ids
-            logger.info(f"[Suggestions Debug] Total excluded user IDs (blocked): {len(excluded_user_ids)}")
-        except Exception as e:
-            logger.error(f"[Suggestions Debug] Error fetching blocked users: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"ブロックユーザー取得エラー: {str(e)}"
-            )
-
-        # ========== いいね送信済みユーザーを除外（探す画面に表示しない） ==========
-        try:
-            logger.info(f"[Suggestions Debug] Fetching sent like user IDs...")
-            sent_likes_query = await db.execute(
-                select(Like.liked_id).where(Like.liker_id == current_user.id)
-            )
-            sent_like_user_ids = {row[0] for row in sent_likes_query.all()}
-            logger.info(f"[Suggestions Debug] Sent like user IDs: {len(sent_like_user_ids)} users")
-
-            excluded_user_ids |= sent_like_user_ids  # いいね送信済みを除外（マッチ含む）
-            excluded_user_ids.add(current_user.id)  # 自分自身も除外
-            logger.info(f"[Suggestions Debug] Total excluded user IDs (including sent likes and self): {len(excluded_user_ids)}")
-        except Exception as e:
-            logger.error(f"[Suggestions Debug] Error fetching matched users: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"マッチユーザー取得エラー: {str(e)}"
-            )
-
-        # ========== 自分がスキップしたユーザーを除外（探す画面に再表示しない） ==========
-        try:
-            logger.info(f"[Suggestions Debug] Fetching skipped user IDs...")
-            skipped_users_query = await db.execute(
-                select(Skip.skipped_id).where(Skip.skipper_id == current_user.id)
-            )
-            skipped_user_ids = {row[0] for row in skipped_users_query.all()}
-            logger.info(f"[Suggestions Debug] Skipped user IDs: {len(skipped_user_ids)} users")
-            if skipped_user_ids:
-                excluded_user_ids |= skipped_user_ids
-            logger.info(
-                f"[Suggestions Debug] Total excluded user IDs (including skipped): {len(excluded_user_ids)}"
-            )
-        except Exception as e:
-            logger.error(f"[Suggestions Debug] Error fetching skipped users: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"スキップユーザー取得エラー: {str(e)}"
-            )
-
         # ========== フィルター条件を構築 ==========
         filter_conditions = []
         
@@ -946,22 +1068,16 @@ async def get_user_suggestions(
                         relationship_goal_candidates = _expand_filter_aliases(
                             relationship_goal_list, RELATIONSHIP_GOAL_FILTER_ALIASES
                         )
-                        # 複数の関係性目標に一致するユーザーを検索（looking_forは単一またはカンマ区切り複数、プライバシー考慮）
-                        def _looking_for_matches(goal: str):
-                            return or_(
-                                User.looking_for == goal,
-                                User.looking_for.like(f"{goal},%"),
-                                User.looking_for.like(f"%,{goal},%"),
-                                User.looking_for.like(f"%,{goal}"),
-                            )
-                        relationship_goal_conditions = [
+                        # 複数の関係性目標に一致するユーザーを検索（正規化テーブル user_looking_for の (goal, user_id) インデックスを使用、プライバシー考慮）
+                        filter_conditions.append(
                             and_(
-                                _looking_for_matches(goal),
                                 User.show_looking_for == True,
+                                exists().where(
+                                    UserLookingFor.user_id == User.id,
+                                    UserLookingFor.goal.in_(relationship_goal_candidates),
+                                ),
                             )
-                            for goal in relationship_goal_candidates
-                        ]
-                        filter_conditions.append(or_(*relationship_goal_conditions))
+                        )
                         logger.info(f"[Suggestions Debug] Relationship goal filter applied: {relationship_goal_candidates} (with privacy check)")
                         print(f"[Suggestions Debug] Relationship goal filter applied: {relationship_goal_candidates} (with privacy check)", file=sys.stderr)
             
@@ -1036,24 +1152,18 @@ async def get_user_suggestions(
             # 年齢フィルター（birthdayから年齢を計算）
             if age_min is not None or age_max is not None:
                 logger.info(f"[Suggestions Debug] Processing age filter: age_min={age_min}, age_max={age_max}")
-                # PostgreSQLのAGE関数を使用して年齢を計算
-                # テーブル名はUserモデルの__tablename__を使用
-                age_expr = text("EXTRACT(YEAR FROM AGE(users.birthday))")
+                # 年齢の範囲を誕生日の範囲に変換する（行ごとの年齢計算をせず、(is_active, birthday) のインデックスを使う）
+                born_after, born_on_or_before = _birthday_range_for_age(age_min, age_max, date.today())
                 
                 # 年齢条件を構築
                 age_range_conditions = []
-                if age_min is not None and age_max is not None:
-                    # 両方指定されている場合
-                    age_range_conditions.append(and_(age_expr >= age_min, age_expr <= age_max))
-                    logger.info(f"[Suggestions Debug] Age filter range: {age_min} <= age <= {age_max}")
-                elif age_min is not None:
-                    # 最小年齢のみ指定
-                    age_range_conditions.append(age_expr >= age_min)
-                    logger.info(f"[Suggestions Debug] Age min filter: age >= {age_min}")
-                elif age_max is not None:
-                    # 最大年齢のみ指定
-                    age_range_conditions.append(age_expr <= age_max)
-                    logger.info(f"[Suggestions Debug] Age max filter: age <= {age_max}")
+                if born_on_or_before is not None:
+                    # age >= age_min ⇔ birthday <= 今日からage_min年前
+                    age_range_conditions.append(User.birthday <= born_on_or_before)
+                if born_after is not None:
+                    # age <= age_max ⇔ birthday > 今日から(age_max + 1)年前
+                    age_range_conditions.append(User.birthday > born_after)
+                logger.info(f"[Suggestions Debug] Age filter birthday range: {born_after} < birthday <= {born_on_or_before}")
                 
                 # プライバシー設定を考慮：show_ageがTrueのユーザーのみを対象
                 # birthdayがNULLの場合は除外（年齢が計算できないため）
@@ -1078,98 +1188,62 @@ async def get_user_suggestions(
                 detail=f"フィルター条件構築エラー: {str(e)}"
             )
 
-        async def build_fallback_response(reason: str) -> UserSuggestionsResponse:
+        planner = SuggestionQueryPlanner(db, current_user.id, filter_conditions)
+
+        def build_suggestion(user: User, tags: list, match_score: float, reason: str, has_received_like: bool) -> UserSuggestion:
+            return UserSuggestion(
+                id=user.id,
+                display_name=user.display_name,
+                bio=user.bio if user.show_bio else None,
+                avatar_url=user.avatar_url,
+                faculty=user.faculty if user.show_faculty else None,
+                grade=user.grade if user.show_grade else None,
+                tags=tags if user.show_tags else [],
+                match_score=match_score,
+                reason=reason,
+                has_received_like=has_received_like,
+            )
+
+        def finish(suggestions: list, next_cursor: Optional[str] = None) -> UserSuggestionsResponse:
+            # セッションの保存（INSERT）はこの時点で発行済み。コミットはSQL文を発行しない
+            logger.info(f"[Suggestions Debug] Statements issued: {statements.count}")
+            response.headers["X-Suggestion-Statements"] = str(statements.count)
+            return UserSuggestionsResponse(
+                users=suggestions,
+                total=len(suggestions),
+                limit=limit,
+                next_cursor=next_cursor,
+            )
+
+        async def build_fallback_response(reason: str, after: Optional[tuple] = None) -> UserSuggestionsResponse:
             try:
                 logger.info(f"[Suggestions Debug] Building fallback response. Reason: {reason}")
-                conditions = [
-                    User.is_active == True,
-                    User.profile_completed == True,
-                ]
-                if excluded_user_ids:
-                    conditions.append(User.id.not_in(list(excluded_user_ids)))
-                    logger.info(f"[Suggestions Debug] Excluded {len(excluded_user_ids)} users from fallback")
-                
-                # フィルター条件を追加
-                if filter_conditions:
-                    conditions.extend(filter_conditions)
-                    logger.info(f"[Suggestions Debug] Added {len(filter_conditions)} filter conditions to fallback")
-
-                fallback_query = (
-                    select(User)
-                    .where(and_(*conditions))
-                    .order_by(User.created_at.desc())
-                    .limit(limit)
-                )
+                # 除外対象・フィルター条件はすべてSQL内（CTE + アンチジョイン）で適用される
+                # 続きのページは (created_at, id) のキーセットで取得する
+                fallback_rows = await planner.fetch_recent(limit, after=after)
+                logger.info(f"[Suggestions Debug] Fallback query returned {len(fallback_rows)} users")
 
-                logger.info(f"[Suggestions Debug] Executing fallback query...")
-                fallback_result = await db.execute(fallback_query)
-                fallback_users = fallback_result.scalars().all()
-                logger.info(f"[Suggestions Debug] Fallback query returned {len(fallback_users)} users")
-
-                if not fallback_users:
+                if not fallback_rows:
                     logger.info(f"[Suggestions Debug] No users in fallback response")
-                    return UserSuggestionsResponse(
-                        users=[],
-                        total=0,
-                        limit=limit,
-                    )
-
-                fallback_user_ids = [user.id for user in fallback_users]
-                logger.info(f"[Suggestions Debug] Fallback user IDs: {fallback_user_ids}")
+                    return finish([])
 
+                fallback_user_ids = [user.id for user, _ in fallback_rows]
                 try:
-                    fallback_tags_query = await db.execute(
-                        select(UserTag)
-                        .where(UserTag.user_id.in_(fallback_user_ids))
-                        .options(selectinload(UserTag.tag))
-                    )
-                    fallback_user_tags = fallback_tags_query.scalars().all()
-                    logger.info(f"[Suggestions Debug] Found {len(fallback_user_tags)} tags for fallback users")
-
-                    fallback_tags_dict = {}
-                    for user_tag in fallback_user_tags:
-                        fallback_tags_dict.setdefault(user_tag.user_id, []).append(
-                            TagInfo(
-                                id=user_tag.tag.id,
-                                name=user_tag.tag.name,
-                                description=user_tag.tag.description,
-                            )
-                        )
+                    fallback_tags_dict = await planner.fetch_tags(fallback_user_ids)
                 except Exception as e:
                     logger.error(f"[Suggestions Debug] Error fetching tags in fallback: {str(e)}", exc_info=True)
                     fallback_tags_dict = {}
 
-                try:
-                    # すでにいいねをもらっているユーザーIDを取得（一度に取得して効率化）
-                    received_likes_query = await db.execute(
-                        select(Like.liker_id).where(Like.liked_id == current_user.id)
-                    )
-                    received_like_user_ids = {row[0] for row in received_likes_query.all()}
-                    logger.info(f"[Suggestions Debug] Received likes from {len(received_like_user_ids)} users")
-                except Exception as e:
-                    logger.error(f"[Suggestions Debug] Error fetching likes in fallback: {str(e)}", exc_info=True)
-                    received_like_user_ids = set()
-                
-                suggestions = []
-                for user in fallback_users:
-                    tags = fallback_tags_dict.get(user.id, [])
-                    # すでにいいねをもらっているかチェック
-                    has_received_like = user.id in received_like_user_ids
-                    
-                    suggestions.append(
-                        UserSuggestion(
-                            id=user.id,
-                            display_name=user.display_name,
-                            bio=user.bio if user.show_bio else None,
-                            avatar_url=user.avatar_url,
-                            faculty=user.faculty if user.show_faculty else None,
-                            grade=user.grade if user.show_grade else None,
-                            tags=tags if user.show_tags else [],
-                            match_score=0.0,
-                            reason=reason,
-                            has_received_like=has_received_like,
-                        )
+                suggestions = [
+                    build_suggestion(
+                        user,
+                        fallback_tags_dict.get(user.id, []),
+                        match_score=0.0,
+                        reason=reason,
+                        has_received_like=has_received_like,
                     )
+                    for user, has_received_like in fallback_rows
+                ]
 
                 # 並び替え（fallback）
                 if sort == SortOrder.ALPHABETICAL:
@@ -1179,247 +1253,223 @@ async def get_user_suggestions(
                 else:
                     pass  # RECENT: fallbackは既にcreated_at.desc()で取得済み
 
+                next_cursor = None
+                if len(fallback_rows) == limit:
+                    last_user = fallback_rows[-1][0]
+                    next_cursor = encode_cursor({
+                        "k": "recent",
+                        "r": reason,
+                        "t": last_user.created_at.isoformat(),
+                        "i": last_user.id,
+                    })
+
                 logger.info(f"[Suggestions Debug] Fallback response built with {len(suggestions)} suggestions")
-                return UserSuggestionsResponse(
-                    users=suggestions,
-                    total=len(suggestions),
-                    limit=limit,
-                )
+                return finish(suggestions, next_cursor)
             except Exception as e:
                 logger.error(f"[Suggestions Debug] Error in build_fallback_response: {str(e)}", exc_info=True)
                 raise
 
-        # ========== タグがない場合の処理 ==========
-        if not my_tag_ids:
-            logger.info(f"[Suggestions Debug] No tags found, using fallback response")
-            return await build_fallback_response("タグ未設定のため、最近登録したユーザーをおすすめします")
-        
-        # ========== フィルター条件を満たすユーザーIDを事前に取得 ==========
-        filtered_user_ids = None
-        if filter_conditions:
+        async def build_ranked_response(
+            rows: list, user_score_dict: dict, next_cursor: Optional[str] = None
+        ) -> UserSuggestionsResponse:
+            """順位付け済みの (User, has_received_like) からレスポンスを構築"""
+            suggested_user_ids = [user.id for user, _ in rows]
+            logger.info(f"[Suggestions Debug] Suggested user IDs: {suggested_user_ids}")
+
+            # ========== ユーザーのタグを一括取得 ==========
             try:
-                # フィルター適用前のユーザー数を確認（デバッグ用）
-                base_count_query = select(func.count(User.id)).where(
-                    and_(
-                        User.is_active == True,
-                        User.profile_completed == True,
-                    )
+                logger.info(f"[Suggestions Debug] Fetching tags for {len(suggested_user_ids)} users...")
+                user_tags_dict = await planner.fetch_tags(suggested_user_ids)
+                logger.info(f"[Suggestions Debug] Tags organized for {len(user_tags_dict)} users")
+            except Exception as e:
+                logger.error(f"[Suggestions Debug] Error fetching user tags: {str(e)}", exc_info=True)
+                # タグ取得エラーは致命的ではないので、空の辞書で続行
+                user_tags_dict = {}
+
+            # ========== レスポンス整形 ==========
+            try:
+                logger.info(f"[Suggestions Debug] Building response...")
+                suggestions = []
+                my_tag_id_set = set(my_tag_ids)
+            
+                for user, has_received_like in rows:
+                    try:
+                        user_tags = user_tags_dict.get(user.id, [])
+                    
+                        # マッチスコア（タグの類似度、0〜1）
+                        match_score = user_score_dict.get(user.id, 0.0)
+                    
+                        # 共通タグ名を取得
+                        common_tag_names = [tag.name for tag in user_tags if tag.id in my_tag_id_set]
+                    
+                        if common_tag_names:
+                            reason = f"共通タグ「{', '.join(common_tag_names[:3])}」を持っています"
+                        else:
+                            reason = "おすすめのユーザーです"
+                    
+                        suggestions.append(
+                            build_suggestion(user, user_tags, match_score, reason, has_received_like)
+                        )
+                    except Exception as e:
+                        logger.error(f"[Suggestions Debug] Error processing user {user.id}: {str(e)}", exc_info=True)
+                        # 個別ユーザーの処理エラーはスキップして続行
+                        continue
+            
+                # 並び替え: sort パラメータに応じてソート（recent=スコア優先のまま, alphabetical=名前順, popular=スコア優先）
+                if sort == SortOrder.ALPHABETICAL:
+                    suggestions.sort(key=lambda x: (x.display_name or "").lower())
+                elif sort == SortOrder.POPULAR:
+                    suggestions.sort(key=lambda x: (x.match_score, (x.display_name or "").lower()), reverse=True)
+                else:
+                    # RECENT: スコア順を維持（既存の共通タグベースの並び）
+                    suggestions.sort(key=lambda x: x.match_score, reverse=True)
+                logger.info(f"[Suggestions Debug] Response built with {len(suggestions)} suggestions")
+                logger.info(f"[Suggestions Debug] ========== Suggestions Request Completed ==========")
+            
+                return finish(suggestions, next_cursor)
+            except Exception as e:
+                logger.error(f"[Suggestions Debug] Error building response: {str(e)}", exc_info=True)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"レスポンス構築エラー: {str(e)}"
                 )
-                base_count_result = await db.execute(base_count_query)
-                base_count = base_count_result.scalar() or 0
-                logger.info(f"[Suggestions Debug] Base user count (active + profile_completed): {base_count}")
-                print(f"[Suggestions Debug] Base user count (active + profile_completed): {base_count}", file=sys.stderr)
-                
-                logger.info(f"[Suggestions Debug] Applying filter conditions to query")
-                print(f"[Suggestions Debug] Applying filter conditions to query", file=sys.stderr)
-                filtered_users_query = select(User.id).where(
-                    and_(
-                        User.is_active == True,
-                        User.profile_completed == True,
-                        *filter_conditions
+
+        async def serve_session(
+            session: SuggestionSession, offset: int, prefetched: Optional[dict] = None
+        ) -> UserSuggestionsResponse:
+            """セッションの offset 以降から1ページ分を返す"""
+            # ========== 1ページ分のユーザー情報を取得 ==========
+            # 候補から順にチャンク単位で問い合わせ、除外・フィルター条件を満たすユーザーが
+            # limit 件そろった時点で打ち切る（除外IDはSQL内のアンチジョインで処理）
+            try:
+                candidate_ids = session.remaining(offset)
+                if prefetched is not None:
+                    rows = [prefetched[user_id] for user_id in candidate_ids if user_id in prefetched][:limit]
+                else:
+                    rows = await planner.fetch_ranked(
+                        candidate_ids,
+                        limit=limit,
+                        chunk_size=max(limit * 3, 50),
                     )
-                )
-                filtered_result = await db.execute(filtered_users_query)
-                filtered_user_ids = {row[0] for row in filtered_result.all()}
-                logger.info(f"[Suggestions Debug] Filtered user IDs count: {len(filtered_user_ids)} (out of {base_count} base users)")
-                print(f"[Suggestions Debug] Filtered user IDs count: {len(filtered_user_ids)} (out of {base_count} base users)", file=sys.stderr)
-                
-                # フィルター結果が空の場合は空のレスポンスを返す
-                if not filtered_user_ids:
+                logger.info(f"[Suggestions Debug] Found {len(rows)} users matching conditions (offset={offset})")
+
+                if not rows and offset == 0:
                     logger.info(f"[Suggestions Debug] No users match filter conditions")
-                    print(f"[Suggestions Debug] No users match filter conditions", file=sys.stderr)
                     return await build_fallback_response("フィルター条件に一致するユーザーが見つかりませんでした")
+
+                next_cursor = None
+                if len(rows) == limit:
+                    next_offset = session.position_after(rows[-1][0].id, offset)
+                    if session.remaining(next_offset):
+                        next_cursor = encode_cursor({"k": "session", "s": session.session_id, "o": next_offset})
+            except HTTPException:
+                raise
             except Exception as e:
-                logger.error(f"[Suggestions Debug] Error applying filter conditions: {str(e)}", exc_info=True)
+                logger.error(f"[Suggestions Debug] Error fetching user information: {str(e)}", exc_info=True)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"フィルター適用エラー: {str(e)}"
-                )
-        else:
-            logger.info(f"[Suggestions Debug] No filter conditions to apply")
-            print(f"[Suggestions Debug] No filter conditions to apply", file=sys.stderr)
-        
-        # ========== 共通タグを持つユーザーを検索 ==========
-        try:
-            logger.info(f"[Suggestions Debug] Searching for users with common tags...")
-            common_tags_conditions = [
-                UserTag.tag_id.in_(my_tag_ids),
-            ]
-            
-            if excluded_user_ids:
-                common_tags_conditions.append(UserTag.user_id.not_in(excluded_user_ids))
-                logger.info(f"[Suggestions Debug] Excluded {len(excluded_user_ids)} users from common tags query")
-            
-            if filtered_user_ids:
-                common_tags_conditions.append(UserTag.user_id.in_(filtered_user_ids))
-                logger.info(f"[Suggestions Debug] Applied filtered user IDs to common tags query")
-            
-            common_tags_query = (
-                select(
-                    UserTag.user_id,
-                    func.count(UserTag.tag_id).label("common_tag_count")
+                    detail=f"ユーザー情報取得エラー: {str(e)}"
                 )
-                .where(and_(*common_tags_conditions))
-                .group_by(UserTag.user_id)
-                .order_by(func.count(UserTag.tag_id).desc())
-                .limit(limit)
-            )
-            
-            logger.info(f"[Suggestions Debug] Executing common tags query...")
-            common_tags_result = await db.execute(common_tags_query)
-            user_scores = common_tags_result.all()
-            logger.info(f"[Suggestions Debug] Found {len(user_scores)} users with common tags")
-            
-            if not user_scores:
-                logger.info(f"[Suggestions Debug] No common tags found, using fallback")
-                return await build_fallback_response("共通タグが見つからなかったため、最近登録したユーザーをおすすめします")
-        except Exception as e:
-            logger.error(f"[Suggestions Debug] Error searching common tags: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"共通タグ検索エラー: {str(e)}"
-            )
-        
-        # ========== ユーザー情報を取得 ==========
-        try:
-            suggested_user_ids = [row[0] for row in user_scores]
-            user_score_dict = {row[0]: row[1] for row in user_scores}
-            logger.info(f"[Suggestions Debug] Suggested user IDs: {suggested_user_ids}")
-            logger.info(f"[Suggestions Debug] User scores: {user_score_dict}")
-            
-            # ユーザー情報を取得
-            # 注意: suggested_user_idsは既にfiltered_user_idsでフィルタリングされているため、
-            # ここで再度フィルター条件を適用する必要はない
-            user_query_conditions = [
-                User.id.in_(suggested_user_ids),
-                User.is_active == True,
-            ]
-            
-            logger.info(f"[Suggestions Debug] Executing user query for {len(suggested_user_ids)} user IDs...")
-            users_query = await db.execute(
-                select(User).where(and_(*user_query_conditions))
+
+            return await build_ranked_response(
+                rows, session.score_map(user.id for user, _ in rows), next_cursor
             )
-            users = users_query.scalars().all()
-            logger.info(f"[Suggestions Debug] Found {len(users)} users matching conditions")
-        except Exception as e:
-            logger.error(f"[Suggestions Debug] Error fetching user information: {str(e)}", exc_info=True)
+
+        # ========== カーソル指定時は前回の続きを返す ==========
+        if cursor_payload is not None:
+            kind = cursor_payload.get("k")
+            try:
+                if kind == "session":
+                    session = await suggestion_sessions.get(
+                        db, current_user.id, str(cursor_payload["s"]), filter_signature
+                    )
+                    if session is None:
+                        raise HTTPException(
+                            status_code=status.HTTP_410_GONE,
+                            detail="おすすめの有効期限が切れました。カーソルなしで再取得してください"
+                        )
+                    return await serve_session(session, int(cursor_payload["o"]))
+                if kind == "recent":
+                    after = (datetime.fromisoformat(cursor_payload["t"]), int(cursor_payload["i"]))
+                    return await build_fallback_response(str(cursor_payload["r"]), after=after)
+            except (KeyError, TypeError, ValueError):
+                pass
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"ユーザー情報取得エラー: {str(e)}"
-            )
-        
-        # ========== ユーザーのタグを一括取得 ==========
-        try:
-            logger.info(f"[Suggestions Debug] Fetching tags for {len(suggested_user_ids)} users...")
-            user_tags_query = await db.execute(
-                select(UserTag)
-                .where(UserTag.user_id.in_(suggested_user_ids))
-                .options(selectinload(UserTag.tag))
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="カーソルが不正です"
             )
-            all_user_tags = user_tags_query.scalars().all()
-            logger.info(f"[Suggestions Debug] Found {len(all_user_tags)} user-tag relationships")
-            
-            # ユーザーIDごとにタグを整理
-            user_tags_dict = {}
-            for user_tag in all_user_tags:
-                if user_tag.user_id not in user_tags_dict:
-                    user_tags_dict[user_tag.user_id] = []
-                user_tags_dict[user_tag.user_id].append(
-                    TagInfo(
-                        id=user_tag.tag.id,
-                        name=user_tag.tag.name,
-                        description=user_tag.tag.description,
-                    )
+
+        # ========== 事前計算済みのおすすめ（フィルター未指定時） ==========
+        # バックグラウンドジョブが user_recommendations に書き込んだ上位候補を1本のSQLで読み、
+        # そのままセッションにする（未計算のユーザーは以下のリアルタイム計算・フォールバックに進む）
+        # 未計算・タグ未設定のユーザーは自分のタグの取得時に判定済みのため問い合わせない
+        if not filter_conditions and has_precomputed:
+            try:
+                precomputed = await planner.fetch_precomputed(settings.RECOMMENDATION_TOP_N)
+                logger.info(f"[Suggestions Debug] Precomputed recommendations: {len(precomputed)}")
+            except Exception as e:
+                logger.error(f"[Suggestions Debug] Error reading precomputed recommendations: {str(e)}", exc_info=True)
+                # 事前計算の読み取りエラーは致命的ではないので、リアルタイム計算で続行
+                precomputed = []
+            if precomputed:
+                session = await suggestion_sessions.create(
+                    db,
+                    current_user.id,
+                    filter_signature,
+                    [(user.id, score) for user, _, score in precomputed],
                 )
-            logger.info(f"[Suggestions Debug] Tags organized for {len(user_tags_dict)} users")
-        except Exception as e:
-            logger.error(f"[Suggestions Debug] Error fetching user tags: {str(e)}", exc_info=True)
-            # タグ取得エラーは致命的ではないので、空の辞書で続行
-            user_tags_dict = {}
-        
-        # ========== いいね状態を取得 ==========
-        try:
-            logger.info(f"[Suggestions Debug] Fetching like statuses...")
-            received_likes_query = await db.execute(
-                select(Like.liker_id).where(Like.liked_id == current_user.id)
-            )
-            received_like_user_ids = {row[0] for row in received_likes_query.all()}
-            logger.info(f"[Suggestions Debug] Received likes from {len(received_like_user_ids)} users")
-        except Exception as e:
-            logger.error(f"[Suggestions Debug] Error fetching like statuses: {str(e)}", exc_info=True)
-            # いいね取得エラーは致命的ではないので、空のセットで続行
-            received_like_user_ids = set()
-        
-        # ========== レスポンス整形 ==========
+                suggestions_response = await serve_session(
+                    session,
+                    0,
+                    prefetched={user.id: (user, has_received_like) for user, has_received_like, _ in precomputed},
+                )
+                # セッションの保存はレスポンス構築後にコミット（読み込み済みのユーザーを失効させないため）
+                await db.commit()
+                return suggestions_response
+
+        # ========== タグがない場合の処理 ==========
+        if not my_tag_ids:
+            logger.info(f"[Suggestions Debug] No tags found, using fallback response")
+            return await build_fallback_response("タグ未設定のため、最近登録したユーザーをおすすめします")
+
+        # ========== タグの類似度をインメモリで計算 ==========
+        # 全候補の類似度を一括計算し、上位候補をセッションとして保持する
         try:
-            logger.info(f"[Suggestions Debug] Building response...")
-            suggestions = []
-            my_tag_count = len(my_tag_ids)
-            
-            for user in users:
-                try:
-                    common_count = user_score_dict.get(user.id, 0)
-                    user_tags = user_tags_dict.get(user.id, [])
-                    
-                    # マッチスコア計算（共通タグ数 / 自分のタグ数）
-                    match_score = min(common_count / my_tag_count, 1.0) if my_tag_count > 0 else 0.0
-                    
-                    # 共通タグ名を取得
-                    common_tag_names = [
-                        tag.name for tag in user_tags
-                        if any(my_tag_id == tag.id for my_tag_id in my_tag_ids)
-                    ]
-                    
-                    if common_tag_names:
-                        reason = f"共通タグ「{', '.join(common_tag_names[:3])}」を持っています"
-                    else:
-                        reason = "おすすめのユーザーです"
-                    
-                    # すでにいいねをもらっているかチェック
-                    has_received_like = user.id in received_like_user_ids
-                    
-                    suggestions.append(
-                        UserSuggestion(
-                            id=user.id,
-                            display_name=user.display_name,
-                            bio=user.bio if user.show_bio else None,
-                            avatar_url=user.avatar_url,
-                            faculty=user.faculty if user.show_faculty else None,
-                            grade=user.grade if user.show_grade else None,
-                            tags=user_tags if user.show_tags else [],
-                            match_score=match_score,
-                            reason=reason,
-                            has_received_like=has_received_like,
-                        )
-                    )
-                except Exception as e:
-                    logger.error(f"[Suggestions Debug] Error processing user {user.id}: {str(e)}", exc_info=True)
-                    # 個別ユーザーの処理エラーはスキップして続行
-                    continue
-            
-            # 並び替え: sort パラメータに応じてソート（recent=スコア優先のまま, alphabetical=名前順, popular=スコア優先）
-            if sort == SortOrder.ALPHABETICAL:
-                suggestions.sort(key=lambda x: (x.display_name or "").lower())
-            elif sort == SortOrder.POPULAR:
-                suggestions.sort(key=lambda x: (x.match_score, (x.display_name or "").lower()), reverse=True)
-            else:
-                # RECENT: スコア順を維持（既存の共通タグベースの並び）
-                suggestions.sort(key=lambda x: x.match_score, reverse=True)
-            logger.info(f"[Suggestions Debug] Response built with {len(suggestions)} suggestions")
-            logger.info(f"[Suggestions Debug] ========== Suggestions Request Completed ==========")
-            
-            return UserSuggestionsResponse(
-                users=suggestions,
-                total=len(suggestions),
-                limit=limit,
+            # 除外集合（キャッシュ）で候補を事前に間引く。最終的な除外判定はSQL側で行う
+            exclusion_set = await exclusion_sets.get(db, current_user.id)
+            excluded_user_ids = exclusion_set.ids() | {current_user.id}
+            logger.info(f"[Suggestions Debug] Exclusion set size: {len(exclusion_set)}")
+
+            logger.info(f"[Suggestions Debug] Ranking users by tag similarity ({similarity_ranker.metric})...")
+            ranking = similarity_ranker.rank(
+                my_tag_ids,
+                exclude_user_ids=excluded_user_ids,
+                top_k=settings.SUGGESTION_SESSION_MAX_CANDIDATES,
             )
+            logger.info(f"[Suggestions Debug] Found {len(ranking.candidates)} candidates with common tags")
+
+            if not ranking.candidates:
+                logger.info(f"[Suggestions Debug] No common tags found, using fallback")
+                return await build_fallback_response("共通タグが見つからなかったため、最近登録したユーザーをおすすめします")
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"[Suggestions Debug] Error building response: {str(e)}", exc_info=True)
+            logger.error(f"[Suggestions Debug] Error ranking common tags: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"レスポンス構築エラー: {str(e)}"
+                detail=f"共通タグ検索エラー: {str(e)}"
             )
-    
+
+        session = await suggestion_sessions.create(
+            db,
+            current_user.id,
+            filter_signature,
+            [(candidate.user_id, candidate.score) for candidate in ranking.candidates],
+        )
+        suggestions_response = await serve_session(session, 0)
+        await db.commit()
+        return suggestions_response
+
     except HTTPException:
         # HTTPExceptionはそのまま再スロー
         raise
@@ -1430,6 +1480,8 @@ async def get_user_suggestions(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"予期しないエラーが発生しました: {str(e)}"
         )
+    finally:
+        statements.stop()
 
 
 # ==================== 個別ユーザー取得エンドポイント（最後に定義） ====================
@@ -1444,53 +1496,8 @@ async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     注意: このエンドポイントは動的パスパラメータを使用するため、
     他のすべての /users/* エンドポイントの後に定義する必要がある
     """
-    user = await db.get(User, user_id)
-    if not user:
+    card = await profile_cards.get_card(db, user_id)
+    if card is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    # タグ情報を取得
-    user_tags_query = await db.execute(
-        select(UserTag)
-        .where(UserTag.user_id == user.id)
-        .options(selectinload(UserTag.tag))
-    )
-    user_tags = user_tags_query.scalars().all()
-    
-    tags = [
-        {
-            "id": user_tag.tag.id,
-            "name": user_tag.tag.name,
-            "description": user_tag.tag.description,
-        }
-        for user_tag in user_tags
-    ]
-    
-    return UserWithTags(
-        id=user.id,
-        email=None,  # プライバシー保護のため
-        display_name=user.display_name,
-        bio=user.bio if user.show_bio else None,
-        avatar_url=user.avatar_url,
-        campus=user.campus if user.show_campus else None,
-        faculty=user.faculty if user.show_faculty else None,
-        grade=user.grade if user.show_grade else None,
-        birthday=user.birthday if user.show_birthday else None,
-        gender=user.gender if user.show_gender else None,
-        sexuality=user.sexuality if user.show_sexuality else None,
-        looking_for=user.looking_for if user.show_looking_for else None,
-        profile_completed=user.profile_completed,
-        is_active=user.is_active,
-        created_at=user.created_at,
-        show_campus=user.show_campus,
-        show_faculty=user.show_faculty,
-        show_grade=user.show_grade,
-        show_birthday=user.show_birthday,
-        show_age=user.show_age,
-        show_gender=user.show_gender,
-        show_sexuality=user.show_sexuality,
-        show_looking_for=user.show_looking_for,
-        show_bio=user.show_bio,
-        show_tags=user.show_tags,
-        tags=tags if user.show_tags else [],
-    )
+    return card
 
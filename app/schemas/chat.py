@@ -2,9 +2,11 @@
 
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
+from enum import Enum
 from typing import Optional, List
 from app.models.enums import ConversationType, MessageType
 from app.schemas.avatar_utils import normalize_avatar_url
+from app.schemas.user import UserWithTags
 
 
 class ConversationCreate(BaseModel):
@@ -98,17 +100,47 @@ class ConversationDetail(BaseModel):
 class ConversationListResponse(BaseModel):
     """会話一覧レスポンス"""
     conversations: List[ConversationRead]
-    total: int
+    total: Optional[int] = None  # cursor 指定時は数えない
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+
+
+class BlockState(str, Enum):
+    """相手とのブロック関係"""
+    none = "none"
+    blocked = "blocked"        # 自分が相手をブロックしている
+    blocked_by = "blocked_by"  # 相手が自分をブロックしている
+
+
+class InboxItem(BaseModel):
+    """受信箱の1件"""
+    id: int
+    type: ConversationType
+    title: Optional[str]
+    other_user: UserWithTags = Field(..., description="相手のプロフィールカード（公開設定を反映）")
+    is_online: bool = Field(default=False, description="相手のオンライン状態")
+    last_message: Optional[LastMessage]
+    unread_count: int
+    block_state: BlockState
+    last_activity_at: datetime = Field(..., description="最後のメッセージ日時（メッセージがなければ会話の作成日時）")
+    created_at: datetime
+
+
+class InboxResponse(BaseModel):
+    """受信箱レスポンス"""
+    conversations: List[InboxItem]
+    limit: int
+    next_cursor: Optional[str] = None
 
 
 class MessageListResponse(BaseModel):
     """メッセージ一覧レスポンス"""
     messages: List[MessageRead]
-    total: int
+    total: Optional[int] = Field(None, description="総数（キーセットページングでは数えないためNone）")
     limit: int
     offset: int
+    has_more: bool = Field(default=False, description="同じ方向に続きのメッセージがあるか")
 
 
 class UnreadCountResponse(BaseModel):
@@ -121,3 +153,14 @@ class MessageReadResponse(BaseModel):
     message: str
     message_id: int
 
+
+
+class ConversationReadUpdate(BaseModel):
+    """まとめて既読リクエスト"""
+    up_to_message_id: Optional[int] = Field(None, gt=0, description="このIDまでを既読にする（未指定なら最新まで）")
+
+
+class ConversationReadStateResponse(BaseModel):
+    """既読位置レスポンス"""
+    conversation_id: int
+    last_read_message_id: int
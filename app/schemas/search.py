@@ -12,6 +12,7 @@ class SortOrder(str, Enum):
     RECENT = "recent"         # 新規順
     POPULAR = "popular"       # 人気順（将来実装）
     ALPHABETICAL = "alphabetical"  # 名前順
+    RELEVANCE = "relevance"   # 関連度順（フリーテキスト検索時のみ。それ以外は新規順）
 
 
 class TagInfo(BaseModel):
@@ -55,10 +56,27 @@ class UserSearchResult(BaseModel):
 class UserSearchResponse(BaseModel):
     """ユーザー検索レスポンス"""
     users: List[UserSearchResult]
-    total: int
+    total: Optional[int] = None  # 最初のページ（または include_total=true）のみ計算
     limit: int
     offset: int
     filters_applied: dict
+    next_cursor: Optional[str] = None  # 次ページ取得用カーソル（これ以上ない場合はNone）
+
+
+class FacetCount(BaseModel):
+    """ファセットの値ごとの件数"""
+    value: str
+    count: int
+
+
+class SearchFacetsResponse(BaseModel):
+    """検索フィルターのファセット件数レスポンス"""
+    campus: List[FacetCount]
+    faculty: List[FacetCount]
+    grade: List[FacetCount]
+    sexuality: List[FacetCount]
+    tags: List[FacetCount]
+    filters_applied: dict
 
 
 class UserSuggestion(BaseModel):
@@ -88,4 +106,5 @@ class UserSuggestionsResponse(BaseModel):
     users: List[UserSuggestion]
     total: int
     limit: int
+    next_cursor: Optional[str] = None  # 次ページ取得用カーソル（これ以上ない場合はNone）
 
@@ -0,0 +1,44 @@
+# app/schemas/swipe.py
+
+from __future__ import annotations
+
+from pydantic import BaseModel, Field
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+
+class SwipeAction(str, Enum):
+    like = "like"
+    skip = "skip"
+
+
+class SwipeResultStatus(str, Enum):
+    created = "created"            # 作成した
+    already_exists = "already_exists"  # 既にいいね・スキップ済み
+    not_found = "not_found"        # 相手ユーザーが存在しない
+    blocked = "blocked"            # ブロック関係があるためいいねできない
+    invalid = "invalid"            # 自分自身、または同じバッチ内で同じ相手を重複指定
+
+
+class SwipeItem(BaseModel):
+    user_id: int = Field(..., gt=0, description="相手ユーザーのID")
+    action: SwipeAction
+
+
+class SwipeBatchCreate(BaseModel):
+    swipes: List[SwipeItem] = Field(..., min_length=1, max_length=100, description="スワイプした順のいいね・スキップ")
+
+
+class SwipeResult(BaseModel):
+    user_id: int
+    action: SwipeAction
+    status: SwipeResultStatus
+    is_match: bool = False
+    matched_at: Optional[datetime] = None
+
+
+class SwipeBatchResponse(BaseModel):
+    results: List[SwipeResult]
+    created: int
+    matches: int
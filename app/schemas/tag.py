@@ -28,9 +28,25 @@ class TagListResponse(BaseModel):
     limit: int
     offset: int
 
+class PopularTagsResponse(BaseModel):
+    tags: list[TagWithUserCount]
+
+class TagSuggestion(BaseModel):
+    id: int
+    name: str
+    user_count: int
+
+class TagAutocompleteResponse(BaseModel):
+    tags: list[TagSuggestion]
+
 class UserTagAdd(BaseModel):
     tag_id: int
 
+class UserTagsReplace(BaseModel):
+    """自分のタグをこの一覧で置き換える（IDと名前は併用可。存在しない名前のタグは作成される）"""
+    tag_ids: list[int] = Field(default_factory=list, max_length=50)
+    tag_names: list[str] = Field(default_factory=list, max_length=50)
+
 class UserTagRead(BaseModel):
     id: int
     name: str
@@ -0,0 +1,188 @@
+"""
+除外ユーザー集合サービス
+
+「自分がいいね・スキップ・ブロックしたユーザー」「自分をブロックしたユーザー」を
+ユーザーごとにソート済み整数配列として保持し、おすすめの候補の事前の間引きに使う
+
+- いいね・スキップ・ブロックの書き込み時に差分更新する
+- LRUで保持ユーザー数を制限し、TTLでワーカー間の差分を吸収する
+  （他ワーカーでの書き込みは最大TTL（既定60秒）反映されない）
+- DB側で絞り込みが必要なクエリには、同じ定義のアンチジョイン条件を提供する
+
+キャッシュ（get）は候補を減らすためだけに使い、ブロックや表示可否の最終判定は
+アンチジョイン条件（not_excluded）か、DBから読み直した集合（load）で行うこと
+"""
+
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import exists, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.block import Block
+from app.models.like import Like
+from app.models.skip import Skip
+
+logger = logging.getLogger(__name__)
+
+# 除外理由の種類
+LIKED = "liked"            # 自分がいいねしたユーザー
+SKIPPED = "skipped"        # 自分がスキップしたユーザー
+BLOCKED = "blocked"        # 自分がブロックしたユーザー
+BLOCKED_BY = "blocked_by"  # 自分をブロックしたユーザー
+
+ALL_KINDS = (LIKED, SKIPPED, BLOCKED, BLOCKED_BY)
+BLOCK_KINDS = (BLOCKED, BLOCKED_BY)
+
+
+def _contains(values: array, value: int) -> bool:
+    index = bisect_left(values, value)
+    return index < len(values) and values[index] == value
+
+
+class ExclusionSet:
+    """1ユーザー分の除外集合（種類ごとのソート済み配列）"""
+
+    __slots__ = ("liked", "skipped", "blocked", "blocked_by")
+
+    def __init__(self):
+        self.liked = array("i")
+        self.skipped = array("i")
+        self.blocked = array("i")
+        self.blocked_by = array("i")
+
+    def _values(self, kind: str) -> array:
+        return getattr(self, kind)
+
+    def add(self, kind: str, user_id: int) -> None:
+        values = self._values(kind)
+        index = bisect_left(values, user_id)
+        if index == len(values) or values[index] != user_id:
+            values.insert(index, user_id)
+
+    def discard(self, kind: str, user_id: int) -> None:
+        values = self._values(kind)
+        index = bisect_left(values, user_id)
+        if index < len(values) and values[index] == user_id:
+            del values[index]
+
+    def contains(self, user_id: int, kinds: Sequence[str] = ALL_KINDS) -> bool:
+        return any(_contains(self._values(kind), user_id) for kind in kinds)
+
+    def is_blocked(self, user_id: int) -> bool:
+        """どちらかの方向でブロック関係があるか"""
+        return self.contains(user_id, BLOCK_KINDS)
+
+    def ids(self, kinds: Sequence[str] = ALL_KINDS) -> set:
+        result = set()
+        for kind in kinds:
+            result.update(self._values(kind))
+        return result
+
+    def __len__(self) -> int:
+        return sum(len(self._values(kind)) for kind in ALL_KINDS)
+
+
+class ExclusionSetService:
+    """ユーザーごとの除外集合をLRUで保持するサービス"""
+
+    def __init__(self, max_users: int = 5000, ttl_seconds: float = 60):
+        self._cache = LRUCache(max_entries=max_users, ttl_seconds=ttl_seconds)
+
+    # ==================== 読み取り ====================
+
+    async def get(self, db: AsyncSession, user_id: int) -> ExclusionSet:
+        """
+        除外集合を取得（キャッシュになければ1本のSQLで構築）
+
+        ワーカーごとのキャッシュのため、他ワーカーでのいいね・スキップ・ブロックは最大TTL（既定60秒）
+        反映されない。候補を事前に間引く用途に限り、結果をそのまま返す処理の最終的な除外判定
+        （特にブロック）には使わないこと（not_excluded または load を使う）
+        """
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            return cached
+        return await self.load(db, user_id)
+
+    async def load(self, db: AsyncSession, user_id: int) -> ExclusionSet:
+        """キャッシュを使わずDBから構築し直す（ブロック判定やバックグラウンドジョブなど鮮度が必要な場合）"""
+        excluded = excluded_users_cte(user_id, name="exclusion_source")
+        result = await db.execute(select(excluded.c.kind, excluded.c.user_id))
+        exclusion_set = ExclusionSet()
+        buckets = {kind: [] for kind in ALL_KINDS}
+        for kind, other_id in result.all():
+            buckets[kind].append(other_id)
+        for kind, ids in buckets.items():
+            setattr(exclusion_set, kind, array("i", sorted(set(ids))))
+        self._cache.set(user_id, exclusion_set)
+        logger.info(f"[Exclusion] Loaded exclusion set: user_id={user_id}, size={len(exclusion_set)}")
+        return exclusion_set
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def reset(self) -> None:
+        self._cache.clear()
+        self._cache.reset_stats()
+
+    # ==================== 書き込み時の差分更新 ====================
+
+    def _update(self, user_id: int, kind: str, other_id: int, add: bool) -> None:
+        # キャッシュにないユーザーは次回読み取り時にDBから構築されるため何もしない
+        exclusion_set = self._cache.peek(user_id)
+        if exclusion_set is None:
+            return
+        if add:
+            exclusion_set.add(kind, other_id)
+        else:
+            exclusion_set.discard(kind, other_id)
+
+    def record_like(self, liker_id: int, liked_id: int) -> None:
+        self._update(liker_id, LIKED, liked_id, add=True)
+
+    def remove_like(self, liker_id: int, liked_id: int) -> None:
+        self._update(liker_id, LIKED, liked_id, add=False)
+
+    def record_skip(self, skipper_id: int, skipped_id: int) -> None:
+        self._update(skipper_id, SKIPPED, skipped_id, add=True)
+
+    def remove_skip(self, skipper_id: int, skipped_id: int) -> None:
+        self._update(skipper_id, SKIPPED, skipped_id, add=False)
+
+    def record_block(self, blocker_id: int, blocked_id: int) -> None:
+        self._update(blocker_id, BLOCKED, blocked_id, add=True)
+        self._update(blocked_id, BLOCKED_BY, blocker_id, add=True)
+
+    def remove_block(self, blocker_id: int, blocked_id: int) -> None:
+        self._update(blocker_id, BLOCKED, blocked_id, add=False)
+        self._update(blocked_id, BLOCKED_BY, blocker_id, add=False)
+
+
+# ==================== SQL（アンチジョイン）用の共通定義 ====================
+
+def excluded_users_cte(viewer_id: int, kinds: Iterable[str] = ALL_KINDS, name: str = "excluded_users"):
+    """閲覧者から見た除外ユーザー (kind, user_id) のCTE"""
+    sources = {
+        LIKED: select(Like.liked_id.label("user_id")).where(Like.liker_id == viewer_id),
+        SKIPPED: select(Skip.skipped_id.label("user_id")).where(Skip.skipper_id == viewer_id),
+        BLOCKED: select(Block.blocked_id.label("user_id")).where(Block.blocker_id == viewer_id),
+        BLOCKED_BY: select(Block.blocker_id.label("user_id")).where(Block.blocked_id == viewer_id),
+    }
+    selects: List = [sources[kind].add_columns(literal(kind).label("kind")) for kind in kinds]
+    return union_all(*selects).cte(name)
+
+
+def not_excluded(user_id_column, viewer_id: int, kinds: Iterable[str] = ALL_KINDS, name: Optional[str] = None):
+    """user_id_column が閲覧者の除外集合に含まれないことを表すアンチジョイン条件"""
+    excluded = excluded_users_cte(viewer_id, kinds, name=name or "excluded_users")
+    return ~exists().where(excluded.c.user_id == user_id_column)
+
+
+exclusion_sets = ExclusionSetService(
+    max_users=settings.EXCLUSION_CACHE_MAX_USERS,
+    ttl_seconds=settings.EXCLUSION_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,181 @@
+"""
+マッチング（相互いいね）の永続化
+
+相互いいねの判定を一覧取得のたびに likes の突き合わせで行わず、成立時に matches へ書き込む
+
+- いいね送信で相手からのいいねがあれば、同じトランザクション内で両方向の2行を作成する
+- いいね取り消し・ブロックで削除し、ブロック解除時は相互いいねが残っていれば作り直す
+- 書き込みはすべて呼び出し側のトランザクションでコミットされる
+
+READ COMMITTED では同時に送られた相互いいねが互いの未コミットのいいねを見落とし、
+どちらも matches を作らないことがあるため、
+
+- PostgreSQLではいいねの作成前に組ごとのアドバイザリロック（トランザクション終了で解放）を取り、
+  相手からのいいねの判定はいいねの作成後に行う（SQLiteは書き込みが直列化されるため不要）
+- 取りこぼし済みの組は repair_missing がバックグラウンドジョブで作り直す
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import and_, case, delete, exists, literal, or_, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import insert_for
+from app.models.block import Block
+from app.models.like import Like
+from app.models.match import Match
+
+logger = logging.getLogger(__name__)
+
+
+def _pair_condition(user_a_id: int, user_b_id: int):
+    return or_(
+        and_(Match.user_id == user_a_id, Match.matched_user_id == user_b_id),
+        and_(Match.user_id == user_b_id, Match.matched_user_id == user_a_id),
+    )
+
+
+def _blocked_between(user_a_column, user_b_column):
+    return exists().where(
+        or_(
+            and_(Block.blocker_id == user_a_column, Block.blocked_id == user_b_column),
+            and_(Block.blocker_id == user_b_column, Block.blocked_id == user_a_column),
+        )
+    )
+
+
+class MatchService:
+    """matches テーブルの作成・削除・参照"""
+
+    async def lock_pairs(self, db: AsyncSession, user_id: int, other_user_ids: Iterable[int]) -> None:
+        """
+        いいねの組を直列化するロックを取る（PostgreSQLのみ、トランザクション終了で解放）
+
+        キーは (小さい方のID, 大きい方のID) の2引数形式で、おすすめジョブの1引数のロックとは衝突しない。
+        デッドロックを避けるため、いいねの作成前に昇順で取る
+        """
+        if db.bind.dialect.name != "postgresql":
+            return
+        pairs = sorted({(min(user_id, other_id), max(user_id, other_id)) for other_id in other_user_ids})
+        for low_id, high_id in pairs:
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(:low_id, :high_id)"),
+                {"low_id": low_id, "high_id": high_id},
+            )
+
+    async def record_if_mutual(
+        self, db: AsyncSession, liker_id: int, liked_id: int, matched_at: datetime
+    ) -> bool:
+        """
+        相手からのいいねがあればマッチを作成し、成立したかを返す（いいねの作成後に呼ぶ）
+
+        判定と作成を INSERT ... SELECT ... WHERE EXISTS の1本で行う。
+        修復ジョブが同時に同じ組を作成した場合は False を返すが、マッチ自体は成立している
+        """
+        reverse_like = exists().where(Like.liker_id == liked_id, Like.liked_id == liker_id)
+        matched_at_value = literal(matched_at, Match.matched_at.type)
+        rows = union_all(
+            select(literal(liker_id), literal(liked_id), matched_at_value).where(reverse_like),
+            select(literal(liked_id), literal(liker_id), matched_at_value).where(reverse_like),
+        )
+        statement = (
+            insert_for(db.bind.dialect.name, Match)
+            .from_select(["user_id", "matched_user_id", "matched_at"], rows)
+            .on_conflict_do_nothing(index_elements=["user_id", "matched_user_id"])
+            .returning(Match.id)
+        )
+        return bool((await db.execute(statement)).all())
+
+    async def repair_missing(self, db: AsyncSession) -> int:
+        """
+        相互いいねがあるのに matches がない組を作り直し、作成した行数を返す
+
+        同時送信で取りこぼした組を修復する。ブロック中の組は作らない。
+        成立日時は後にいいねした方の日時
+        """
+        reverse = Like.__table__.alias("reverse_likes")
+        matched_at = case(
+            (Like.created_at >= reverse.c.created_at, Like.created_at),
+            else_=reverse.c.created_at,
+        )
+        missing = (
+            select(Like.liker_id, Like.liked_id, matched_at)
+            .join(reverse, and_(reverse.c.liker_id == Like.liked_id, reverse.c.liked_id == Like.liker_id))
+            .where(
+                ~exists().where(Match.user_id == Like.liker_id, Match.matched_user_id == Like.liked_id),
+                ~_blocked_between(Like.liker_id, Like.liked_id),
+            )
+        )
+        statement = (
+            insert_for(db.bind.dialect.name, Match)
+            .from_select(["user_id", "matched_user_id", "matched_at"], missing)
+            .on_conflict_do_nothing(index_elements=["user_id", "matched_user_id"])
+            .returning(Match.id)
+        )
+        repaired = len((await db.execute(statement)).all())
+        if repaired:
+            logger.warning(f"[Match Debug] Repaired {repaired} missing match rows")
+        return repaired
+
+    async def record(self, db: AsyncSession, user_a_id: int, user_b_id: int, matched_at: datetime) -> None:
+        """マッチを作成する（既に存在する場合は何もしない）"""
+        await self.record_many(db, user_a_id, {user_b_id: matched_at})
+
+    async def record_many(self, db: AsyncSession, user_id: int, matched_at_by_user: Dict[int, datetime]) -> None:
+        """1ユーザーと複数の相手とのマッチを1本のINSERTで作成する"""
+        if not matched_at_by_user:
+            return
+        rows = []
+        for other_id, matched_at in matched_at_by_user.items():
+            rows.append({"user_id": user_id, "matched_user_id": other_id, "matched_at": matched_at})
+            rows.append({"user_id": other_id, "matched_user_id": user_id, "matched_at": matched_at})
+        statement = insert_for(db.bind.dialect.name, Match).values(rows)
+        await db.execute(statement.on_conflict_do_nothing(index_elements=["user_id", "matched_user_id"]))
+
+    async def remove(self, db: AsyncSession, user_a_id: int, user_b_id: int) -> None:
+        """マッチを削除する（存在しない場合は何もしない）"""
+        await db.execute(delete(Match).where(_pair_condition(user_a_id, user_b_id)))
+
+    async def restore(self, db: AsyncSession, user_a_id: int, user_b_id: int) -> bool:
+        """相互いいねが残っていればマッチを作り直す（ブロック解除時）"""
+        result = await db.execute(
+            select(Like.created_at).where(
+                or_(
+                    and_(Like.liker_id == user_a_id, Like.liked_id == user_b_id),
+                    and_(Like.liker_id == user_b_id, Like.liked_id == user_a_id),
+                )
+            )
+        )
+        liked_at = result.scalars().all()
+        if len(liked_at) < 2:
+            return False
+        await self.record(db, user_a_id, user_b_id, max(liked_at))
+        return True
+
+    async def matched_among(self, db: AsyncSession, user_id: int, other_user_ids: Iterable[int]) -> Set[int]:
+        """other_user_ids のうち user_id とマッチしているユーザーID"""
+        other_user_ids = list(other_user_ids)
+        if not other_user_ids:
+            return set()
+        result = await db.execute(
+            select(Match.matched_user_id).where(
+                Match.user_id == user_id,
+                Match.matched_user_id.in_(other_user_ids),
+            )
+        )
+        return set(result.scalars().all())
+
+    async def get_matched_at(self, db: AsyncSession, user_id: int, other_user_id: int) -> Optional[datetime]:
+        """マッチ成立日時（未成立ならNone）"""
+        result = await db.execute(
+            select(Match.matched_at).where(
+                Match.user_id == user_id,
+                Match.matched_user_id == other_user_id,
+            )
+        )
+        return result.scalar_one_or_none()
+
+
+match_store = MatchService()
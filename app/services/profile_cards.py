@@ -0,0 +1,150 @@
+"""
+プロフィールカード（他ユーザーに見せる UserWithTags）の組み立て
+
+いいね・マッチ・スキップ一覧や個別ユーザー取得で共通に使う
+
+- ユーザーIDの一覧から、ユーザー1本・タグ1本の計2本のクエリでまとめて読み込む
+  （ユーザーを他のクエリと一緒に読み込み済みの場合は build_cards でタグ1本のみ）
+- 公開設定（show_*）による項目の非表示化は build_card の1か所で行う
+- 組み立てたカードはユーザーごとに短いTTLでキャッシュし、本人のプロフィール・公開設定・
+  タグの変更時に破棄する（他ワーカーのキャッシュはTTLで失効。TTLを0にするとキャッシュしない）
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.tag import Tag, UserTag
+from app.models.user import User
+from app.schemas.user import UserWithTags
+
+logger = logging.getLogger(__name__)
+
+
+def build_card(user: User, tags: Sequence[dict]) -> UserWithTags:
+    """公開設定を反映したプロフィールカード（メールアドレスは含めない）"""
+    return UserWithTags(
+        id=user.id,
+        email=None,
+        display_name=user.display_name,
+        bio=user.bio if user.show_bio else None,
+        avatar_url=user.avatar_url,
+        campus=user.campus if user.show_campus else None,
+        faculty=user.faculty if user.show_faculty else None,
+        grade=user.grade if user.show_grade else None,
+        birthday=user.birthday if user.show_birthday else None,
+        gender=user.gender if user.show_gender else None,
+        sexuality=user.sexuality if user.show_sexuality else None,
+        looking_for=user.looking_for if user.show_looking_for else None,
+        profile_completed=user.profile_completed,
+        is_active=user.is_active,
+        created_at=user.created_at,
+        show_campus=user.show_campus,
+        show_faculty=user.show_faculty,
+        show_grade=user.show_grade,
+        show_birthday=user.show_birthday,
+        show_age=user.show_age,
+        show_gender=user.show_gender,
+        show_sexuality=user.show_sexuality,
+        show_looking_for=user.show_looking_for,
+        show_bio=user.show_bio,
+        show_tags=user.show_tags,
+        tags=list(tags) if user.show_tags else [],
+    )
+
+
+class ProfileCardService:
+    """プロフィールカードの一括読み込みとユーザー単位のキャッシュ"""
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 30):
+        self.ttl_seconds = ttl_seconds
+        self._cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def get_cards(self, db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, UserWithTags]:
+        """ユーザーID → カード（存在しないユーザーは含まれない）"""
+        user_ids = list(dict.fromkeys(user_ids))
+        cards: Dict[int, UserWithTags] = {}
+        missing: List[int] = []
+        for user_id in user_ids:
+            card = self._cache.get(user_id) if self.ttl_seconds else None
+            if card is not None:
+                cards[user_id] = card
+            else:
+                missing.append(user_id)
+        if not missing:
+            return cards
+
+        users_result = await db.execute(select(User).where(User.id.in_(missing)))
+        users = users_result.scalars().all()
+        cards.update(await self._build_and_cache(db, users))
+        logger.info(f"[ProfileCards] Loaded: requested={len(user_ids)}, loaded={len(users)}")
+        return cards
+
+    async def build_cards(self, db: AsyncSession, users: Sequence[User]) -> Dict[int, UserWithTags]:
+        """
+        読み込み済みのユーザーからカードを組み立てる（ユーザーを他のクエリと一緒に取得した場合用）
+
+        キャッシュにないユーザーのタグのみ1本のクエリで読み込む
+        """
+        cards: Dict[int, UserWithTags] = {}
+        missing: List[User] = []
+        for user in users:
+            card = self._cache.get(user.id) if self.ttl_seconds else None
+            if card is not None:
+                cards[user.id] = card
+            else:
+                missing.append(user)
+        if missing:
+            cards.update(await self._build_and_cache(db, missing))
+        return cards
+
+    async def _build_and_cache(self, db: AsyncSession, users: Sequence[User]) -> Dict[int, UserWithTags]:
+        if not users:
+            return {}
+        tags_result = await db.execute(
+            select(UserTag.user_id, Tag.id, Tag.name, Tag.description)
+            .join(Tag, Tag.id == UserTag.tag_id)
+            .where(UserTag.user_id.in_([user.id for user in users]))
+            .order_by(UserTag.user_id, Tag.id)
+        )
+        tags_by_user: Dict[int, List[dict]] = {}
+        for user_id, tag_id, name, description in tags_result.all():
+            tags_by_user.setdefault(user_id, []).append(
+                {"id": tag_id, "name": name, "description": description}
+            )
+
+        cards: Dict[int, UserWithTags] = {}
+        for user in users:
+            card = build_card(user, tags_by_user.get(user.id, []))
+            cards[user.id] = card
+            if self.ttl_seconds:
+                self._cache.set(user.id, card)
+        return cards
+
+    async def get_card(self, db: AsyncSession, user_id: int) -> Optional[UserWithTags]:
+        return (await self.get_cards(db, [user_id])).get(user_id)
+
+    def invalidate(self, user_id: int) -> None:
+        """本人のプロフィール・公開設定・タグが変わったときに破棄する"""
+        self._cache.delete(user_id)
+
+    def invalidate_all(self) -> None:
+        """タグの削除など、複数ユーザーのカードに影響する変更時に全件破棄する"""
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def reset(self) -> None:
+        self._cache.clear()
+        self._cache.reset_stats()
+
+
+profile_cards = ProfileCardService(
+    max_entries=settings.PROFILE_CARD_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PROFILE_CARD_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,158 @@
+"""
+おすすめユーザーの類似度ランキング
+
+タグ転置インデックスから ユーザー×タグ の疎行列（CSC相当: タグごとの行番号配列）を
+NumPy配列として組み立て、全候補の類似度を1回のベクトル演算で計算する
+
+- cosine: 希少なタグほど重く扱うIDF重み付きコサイン類似度
+- jaccard: 共通タグ数 / 両者のタグの和集合の大きさ
+- 上位k件の抽出は argpartition で行い、同点は新しいユーザー（IDが大きい順）を優先する
+"""
+
+import logging
+import time
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.tag_index_service import TagInvertedIndex, tag_index
+
+logger = logging.getLogger(__name__)
+
+COSINE = "cosine"
+JACCARD = "jaccard"
+METRICS = (COSINE, JACCARD)
+
+
+class RankedCandidate(NamedTuple):
+    user_id: int
+    score: float
+    common_tag_count: int
+
+
+class SimilarityRanking(NamedTuple):
+    candidates: List[RankedCandidate]
+    # top_k で打ち切った場合True（後続の候補がまだ残っている）
+    truncated: bool
+
+    @property
+    def user_ids(self) -> List[int]:
+        return [candidate.user_id for candidate in self.candidates]
+
+
+class _MatrixSnapshot:
+    """タグ転置インデックスのある版から作った行列表現"""
+
+    def __init__(self, postings: Dict[int, array], version: int):
+        self.version = version
+        tag_ids = sorted(tag_id for tag_id, users in postings.items() if len(users))
+        columns = [np.frombuffer(postings[tag_id], dtype=np.int32) for tag_id in tag_ids]
+        all_users = np.concatenate(columns) if columns else np.empty(0, dtype=np.int32)
+
+        # 行 = ユーザー（ID昇順）
+        self.user_ids = np.unique(all_users)
+        n_users = len(self.user_ids)
+
+        document_frequency = np.array([len(column) for column in columns], dtype=np.float64)
+        idf = np.log((n_users + 1) / (document_frequency + 1)) + 1.0
+
+        self.rows_by_tag: Dict[int, np.ndarray] = {}
+        self.idf_by_tag: Dict[int, float] = {}
+        for tag_id, column, weight in zip(tag_ids, columns, idf):
+            self.rows_by_tag[tag_id] = np.searchsorted(self.user_ids, column)
+            self.idf_by_tag[tag_id] = float(weight)
+
+        all_rows = np.searchsorted(self.user_ids, all_users)
+        weights = np.repeat(idf, document_frequency.astype(np.int64))
+        self.tag_counts = np.bincount(all_rows, minlength=n_users)
+        self.norms = np.sqrt(np.bincount(all_rows, weights=weights ** 2, minlength=n_users))
+
+
+class SimilarityRanker:
+    """タグ転置インデックスを元に類似度でユーザーを順位付けする"""
+
+    def __init__(self, index: TagInvertedIndex, metric: str = COSINE):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown similarity metric: {metric}")
+        self.index = index
+        self.metric = metric
+        self._snapshot: Optional[_MatrixSnapshot] = None
+
+    def _current_snapshot(self) -> _MatrixSnapshot:
+        # インデックスが更新されていれば作り直す（O(タグ付与数) のベクトル演算）
+        if self._snapshot is None or self._snapshot.version != self.index.version:
+            started = time.perf_counter()
+            self._snapshot = _MatrixSnapshot(self.index.postings(), self.index.version)
+            logger.info(
+                f"[Ranking] Matrix rebuilt: users={len(self._snapshot.user_ids)}, "
+                f"tags={len(self._snapshot.rows_by_tag)}, "
+                f"elapsed={(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return self._snapshot
+
+    def reset(self) -> None:
+        self._snapshot = None
+
+    def rank(
+        self,
+        tag_ids: Iterable[int],
+        exclude_user_ids: Optional[Iterable[int]] = None,
+        top_k: Optional[int] = None,
+    ) -> SimilarityRanking:
+        """
+        指定タグ集合に対する類似度で候補ユーザーを順位付け
+
+        Args:
+            tag_ids: 基準となるタグID（通常は閲覧者のタグ）
+            exclude_user_ids: 候補から除くユーザーID
+            top_k: 上位何件を返すか（Noneの場合は全候補）
+        """
+        snapshot = self._current_snapshot()
+        query_tags = sorted(tag_id for tag_id in set(tag_ids) if tag_id in snapshot.rows_by_tag)
+        if not query_tags:
+            return SimilarityRanking(candidates=[], truncated=False)
+
+        rows = np.concatenate([snapshot.rows_by_tag[tag_id] for tag_id in query_tags])
+        candidate_rows, inverse = np.unique(rows, return_inverse=True)
+        common = np.bincount(inverse, minlength=len(candidate_rows))
+
+        if self.metric == COSINE:
+            query_idf = np.array([snapshot.idf_by_tag[tag_id] for tag_id in query_tags])
+            squared_weights = np.repeat(
+                query_idf ** 2, [len(snapshot.rows_by_tag[tag_id]) for tag_id in query_tags]
+            )
+            dot = np.bincount(inverse, weights=squared_weights, minlength=len(candidate_rows))
+            query_norm = np.sqrt(np.sum(query_idf ** 2))
+            scores = dot / (query_norm * snapshot.norms[candidate_rows])
+        else:
+            union = len(query_tags) + snapshot.tag_counts[candidate_rows] - common
+            scores = common / union
+
+        candidate_user_ids = snapshot.user_ids[candidate_rows]
+        if exclude_user_ids:
+            excluded = np.fromiter(exclude_user_ids, dtype=np.int64)
+            keep = ~np.isin(candidate_user_ids, excluded)
+            candidate_user_ids, scores, common = candidate_user_ids[keep], scores[keep], common[keep]
+
+        truncated = top_k is not None and len(scores) > top_k
+        if truncated:
+            # k番目のスコア以上を残してから並べ替える（境界の同点も含めて決定的にするため）
+            kth = np.argpartition(-scores, top_k - 1)[:top_k]
+            selected = np.flatnonzero(scores >= scores[kth].min())
+        else:
+            selected = np.arange(len(scores))
+
+        order = selected[np.lexsort((-candidate_user_ids[selected], -scores[selected]))]
+        if top_k is not None:
+            order = order[:top_k]
+
+        candidates = [
+            RankedCandidate(int(user_id), round(min(float(score), 1.0), 6), int(count))
+            for user_id, score, count in zip(candidate_user_ids[order], scores[order], common[order])
+        ]
+        return SimilarityRanking(candidates=candidates, truncated=truncated)
+
+
+similarity_ranker = SimilarityRanker(tag_index, metric=settings.SUGGESTION_SIMILARITY_METRIC)
@@ -0,0 +1,215 @@
+"""
+事前計算おすすめ（今日のおすすめ）サービス
+
+バックグラウンドジョブがユーザーごとの上位N件を user_recommendations に書き込み、
+/users/suggestions はフィルター未指定時にそのテーブルを読むだけで応答する
+
+- タグ・いいね・スキップ・ブロックの書き込み時に recommendation_states.is_dirty を立て、
+  ジョブは is_dirty のユーザー・未計算のユーザー・期限切れのユーザーだけを再計算する
+- 複数ワーカーで起動しても二重に計算しないよう、PostgreSQLではアドバイザリロックで1ワーカーに限定する
+- 非正規化した値のずれ（同時送信の相互いいねで取りこぼした matches、ON DELETE CASCADE で
+  ずれた tags.user_count）の修復も、ロックを取れたワーカーがバッチの前に行う
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List
+
+from sqlalchemy import delete, func, insert, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.recommendation import RecommendationState, UserRecommendation
+from app.models.tag import UserTag, tag_user_count_recount
+from app.models.user import User
+from app.services.exclusion_service import exclusion_sets
+from app.services.match_service import match_store
+from app.services.ranking_engine import similarity_ranker
+from app.services.tag_index_service import tag_index
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_lock のキー（他用途のロックと衝突しない任意の定数）
+_JOB_LOCK_KEY = 728_305_001
+
+
+class RecommendationService:
+    """事前計算おすすめの再計算・無効化を行うサービス"""
+
+    def __init__(self, top_n: int = 50, batch_size: int = 200, max_age_seconds: int = 86400):
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.max_age_seconds = max_age_seconds
+
+    # ==================== 無効化（書き込み時） ====================
+
+    async def mark_dirty(self, db: AsyncSession, user_ids: Iterable[int]) -> None:
+        """
+        再計算が必要なユーザーとして印を付ける（呼び出し側のトランザクションでコミットされる）
+
+        状態行がないユーザーは未計算扱いのため、次回のジョブで計算される
+        """
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return
+        await db.execute(
+            update(RecommendationState)
+            .where(RecommendationState.user_id.in_(user_ids))
+            .values(is_dirty=True)
+        )
+
+    async def mark_tag_holders_dirty(self, db: AsyncSession, tag_id: int) -> None:
+        """タグを持つ全ユーザーに再計算の印を付ける（タグ削除時）"""
+        await db.execute(
+            update(RecommendationState)
+            .where(RecommendationState.user_id.in_(select(UserTag.user_id).where(UserTag.tag_id == tag_id)))
+            .values(is_dirty=True)
+        )
+
+    # ==================== 再計算 ====================
+
+    async def refresh_user(self, db: AsyncSession, user_id: int) -> int:
+        """1ユーザー分のおすすめを再計算して書き込み、書き込んだ件数を返す（コミットは呼び出し側）"""
+        await tag_index.ensure_loaded(db)
+        # ジョブは他ワーカーでの書き込みも反映する必要があるため、キャッシュを使わずに読み直す
+        # （本人のタグも user_tags から読む。タグ転置インデックスは候補ユーザーの列挙にのみ使う）
+        tags_result = await db.execute(
+            select(UserTag.tag_id).where(UserTag.user_id == user_id).order_by(UserTag.tag_id)
+        )
+        my_tag_ids = list(tags_result.scalars().all())
+        exclusion_set = await exclusion_sets.load(db, user_id)
+        ranking = similarity_ranker.rank(
+            my_tag_ids,
+            exclude_user_ids=exclusion_set.ids() | {user_id},
+            top_k=self.top_n * 2,
+        )
+
+        candidates = ranking.candidates
+        if candidates:
+            active_result = await db.execute(
+                select(User.id).where(
+                    User.id.in_([candidate.user_id for candidate in candidates]),
+                    User.is_active == True,
+                )
+            )
+            active_ids = {row[0] for row in active_result.all()}
+            candidates = [candidate for candidate in candidates if candidate.user_id in active_ids][:self.top_n]
+
+        now = datetime.now(timezone.utc)
+        await db.execute(delete(UserRecommendation).where(UserRecommendation.user_id == user_id))
+        if candidates:
+            await db.execute(
+                insert(UserRecommendation),
+                [
+                    {
+                        "user_id": user_id,
+                        "candidate_user_id": candidate.user_id,
+                        "rank": rank,
+                        "score": candidate.score,
+                        "computed_at": now,
+                    }
+                    for rank, candidate in enumerate(candidates, start=1)
+                ],
+            )
+
+        state = await db.get(RecommendationState, user_id)
+        if state is None:
+            db.add(RecommendationState(user_id=user_id, is_dirty=False, computed_at=now))
+        else:
+            state.is_dirty = False
+            state.computed_at = now
+        return len(candidates)
+
+    async def pending_user_ids(self, db: AsyncSession) -> List[int]:
+        """再計算が必要なアクティブユーザー（変更あり・未計算・期限切れ）"""
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.max_age_seconds)
+        result = await db.execute(
+            select(User.id)
+            .outerjoin(RecommendationState, RecommendationState.user_id == User.id)
+            .where(
+                User.is_active == True,
+                or_(
+                    RecommendationState.user_id.is_(None),
+                    RecommendationState.is_dirty == True,
+                    RecommendationState.computed_at < stale_before,
+                ),
+            )
+            .order_by(func.coalesce(RecommendationState.computed_at, User.created_at))
+            .limit(self.batch_size)
+        )
+        return [row[0] for row in result.all()]
+
+    async def refresh_pending(self, db: AsyncSession) -> int:
+        """
+        再計算が必要なユーザーを1バッチ分処理し、処理したユーザー数を返す
+
+        PostgreSQLではアドバイザリロックを取れたワーカーだけが処理する。セッションのコネクションは
+        ユーザーごとのコミットでプールに返り、解放が別のコネクションで実行されるとロックが残り続けるため、
+        ロックはバッチの間保持する専用コネクション（AUTOCOMMIT）で取得・解放する
+        """
+        if db.bind.dialect.name != "postgresql":
+            return await self._refresh_batch(db)
+        async with db.bind.connect() as connection:
+            lock_connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            locked = (
+                await lock_connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _JOB_LOCK_KEY})
+            ).scalar()
+            if not locked:
+                logger.info(f"[Recommendations] Another worker is refreshing, skipped")
+                return 0
+            try:
+                return await self._refresh_batch(db)
+            finally:
+                await lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _JOB_LOCK_KEY})
+
+    async def repair_denormalized(self, db: AsyncSession) -> None:
+        """非正規化した値のずれを修復する（matches の取りこぼし・tags.user_count）"""
+        try:
+            await match_store.repair_missing(db)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"[Recommendations] Failed to repair matches: {str(e)}", exc_info=True)
+        try:
+            result = await db.execute(tag_user_count_recount())
+            await db.commit()
+            if result.rowcount:
+                logger.warning(f"[Recommendations] Recounted user_count for {result.rowcount} tags")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"[Recommendations] Failed to recount tag user counts: {str(e)}", exc_info=True)
+
+    async def _refresh_batch(self, db: AsyncSession) -> int:
+        await self.repair_denormalized(db)
+
+        user_ids = await self.pending_user_ids(db)
+        for user_id in user_ids:
+            try:
+                await self.refresh_user(db, user_id)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"[Recommendations] Failed to refresh user_id={user_id}: {str(e)}", exc_info=True)
+        if user_ids:
+            logger.info(f"[Recommendations] Refreshed {len(user_ids)} users")
+        return len(user_ids)
+
+    async def run_forever(self, session_factory, interval_seconds: float) -> None:
+        """一定間隔で refresh_pending を実行し続ける（アプリ起動時にタスクとして開始）"""
+        while True:
+            try:
+                async with session_factory() as db:
+                    await self.refresh_pending(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Recommendations] Refresh job failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(interval_seconds)
+
+
+recommendations = RecommendationService(
+    top_n=settings.RECOMMENDATION_TOP_N,
+    batch_size=settings.RECOMMENDATION_BATCH_SIZE,
+    max_age_seconds=settings.RECOMMENDATION_MAX_AGE_SECONDS,
+)
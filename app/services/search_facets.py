@@ -0,0 +1,116 @@
+"""
+検索フィルターのファセット件数（/users/search/facets）
+
+キャンパス・学部・学年・セクシュアリティ・タグの値ごとのユーザー数を、
+ファセットごとの GROUP BY を UNION ALL でつないだ1本のクエリで集計する
+
+- キャンパス・学部・学年は複数選択（OR）のため、そのファセット自身の絞り込みは外して数える
+  （選択中の値以外を追加したときの件数がわかるように）
+- タグはAND条件のため、選択中のタグも含めたすべての絞り込みで数える
+- 各値は公開設定がONのユーザーのみ数える
+- 閲覧者ごとの除外（ブロック・いいね済み等）は反映しない。そのため結果は正規化済みフィルターだけを
+  キーにして全閲覧者で共有し、短いTTLでキャッシュする
+- プロフィール・公開設定の更新時にキャッシュを破棄する（他ワーカーのキャッシュはTTLで失効）
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import distinct, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.tag import Tag, UserTag
+from app.models.user import User
+from app.services.search_query import SearchFilters, filter_conditions
+from app.services.text_search import apply_text_search
+
+logger = logging.getLogger(__name__)
+
+FACETS = ("campus", "faculty", "grade", "sexuality", "tags")
+
+# 複数選択（OR）のため、自身の絞り込みを外して数えるファセット
+DISJUNCTIVE_FACETS = ("campus", "faculty", "grade")
+
+# タグは種類が多いため件数の多い順に上位のみ返す
+MAX_TAG_VALUES = 50
+
+
+def _facet_columns():
+    # ファセット名 → (値の列, 公開設定の列)
+    return {
+        "campus": (User.campus, User.show_campus),
+        "faculty": (User.faculty, User.show_faculty),
+        "grade": (User.grade, User.show_grade),
+        "sexuality": (User.sexuality, User.show_sexuality),
+        "tags": (Tag.name, User.show_tags),
+    }
+
+
+class SearchFacetService:
+    """ファセット件数の集計とキャッシュ"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 30):
+        self._cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def _statement(self, filters: SearchFilters, dialect_name: str):
+        conditions = filter_conditions(filters)
+        branches = []
+        for facet, (value_column, visible_column) in _facet_columns().items():
+            statement = select(
+                literal(facet).label("facet"),
+                value_column.label("value"),
+                func.count(distinct(User.id)).label("count"),
+            ).select_from(User)
+            if facet == "tags":
+                statement = statement.join(UserTag, UserTag.user_id == User.id).join(Tag, Tag.id == UserTag.tag_id)
+            statement = statement.where(
+                User.is_active == True,
+                visible_column == True,
+                value_column.is_not(None),
+                value_column != "",
+                *[
+                    condition for name, condition in conditions.items()
+                    if not (name == facet and facet in DISJUNCTIVE_FACETS)
+                ],
+            )
+            if filters.search:
+                statement = apply_text_search(statement, dialect_name, filters.search).query
+            branches.append(statement.group_by(value_column))
+        return union_all(*branches)
+
+    async def get_counts(self, db: AsyncSession, filters: SearchFilters) -> Dict[str, List[Tuple[str, int]]]:
+        """ファセットごとの (値, 件数) の一覧（件数の多い順）"""
+        cached = self._cache.get(filters.signature())
+        if cached is not None:
+            return cached
+
+        result = await db.execute(self._statement(filters, db.bind.dialect.name))
+        counts: Dict[str, List[Tuple[str, int]]] = {facet: [] for facet in FACETS}
+        for facet, value, count in result.all():
+            counts[facet].append((value, count))
+        for facet, values in counts.items():
+            values.sort(key=lambda item: (-item[1], item[0]))
+        counts["tags"] = counts["tags"][:MAX_TAG_VALUES]
+
+        self._cache.set(filters.signature(), counts)
+        logger.info(f"[SearchFacets] Computed: filters={filters.applied()}")
+        return counts
+
+    def invalidate(self) -> None:
+        """プロフィールの公開項目が変わったときに全件破棄する"""
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def reset(self) -> None:
+        self._cache.clear()
+        self._cache.reset_stats()
+
+
+search_facets = SearchFacetService(
+    max_entries=settings.SEARCH_FACET_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_FACET_CACHE_TTL_SECONDS,
+)
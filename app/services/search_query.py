@@ -0,0 +1,149 @@
+"""
+ユーザー検索（/users/search）の絞り込み条件
+
+クエリパラメータを正規化した SearchFilters に変換し、各フィルターをSQLの条件式として組み立てる
+
+- 条件はすべてSQL内で評価し、途中のタグID・ユーザーIDをPythonに取り出さない
+- タグは複数指定時にAND条件。各タグ名は部分一致で、どのタグにも一致しない名前は無視する
+  （タグ名の解決・ANDの判定は1つのサブクエリ内で、HAVING count(DISTINCT 指定番号) により行う）
+- 学部・学年・タグは公開設定を考慮する
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, distinct, func, literal, or_, select, union_all
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.tag import Tag, UserTag
+from app.models.user import User
+
+
+def _split(value: Optional[str]) -> Tuple[str, ...]:
+    """カンマ区切りの値を空要素・重複なしのタプルに変換"""
+    if not value:
+        return ()
+    items = []
+    for item in value.split(","):
+        item = item.strip()
+        if item and item not in items:
+            items.append(item)
+    return tuple(items)
+
+
+class SearchFilters(NamedTuple):
+    """正規化済みの検索フィルター"""
+
+    tags: Tuple[str, ...] = ()
+    campus: Tuple[str, ...] = ()
+    faculty: Tuple[str, ...] = ()
+    grade: Tuple[str, ...] = ()
+    search: Optional[str] = None
+
+    @classmethod
+    def from_params(
+        cls,
+        tags: Optional[str] = None,
+        campus: Optional[str] = None,
+        faculty: Optional[str] = None,
+        grade: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> "SearchFilters":
+        return cls(
+            tags=_split(tags),
+            campus=_split(campus),
+            faculty=_split(faculty),
+            grade=_split(grade),
+            search=search.strip() if search and search.strip() else None,
+        )
+
+    def signature(self) -> tuple:
+        """
+        キャッシュキー用の正規化した値
+
+        大文字小文字を区別せず（部分一致はすべて大文字小文字を区別しないため）、
+        複数指定の順序にも依存しない
+        """
+        return (
+            tuple(sorted({tag.lower() for tag in self.tags})),
+            tuple(sorted({c.lower() for c in self.campus})),
+            tuple(sorted({f.lower() for f in self.faculty})),
+            tuple(sorted({g.lower() for g in self.grade})),
+            self.search.lower() if self.search else None,
+        )
+
+    def applied(self) -> dict:
+        """レスポンスの filters_applied 用（指定されたフィルターのみ）"""
+        return {
+            name: list(value) if isinstance(value, tuple) else value
+            for name, value in self._asdict().items()
+            if value
+        }
+
+
+def _like(value: str) -> str:
+    return f"%{value}%"
+
+
+def tag_condition(tag_names: Tuple[str, ...]) -> ColumnElement:
+    """
+    指定したタグ名（部分一致）をすべて持つユーザーの条件
+
+    タグ名の一覧を (指定番号, パターン) の派生テーブルにしてタグと結合し、
+    ユーザーごとに一致した指定番号の種類数が「いずれかのタグに一致した指定の数」と等しいユーザーを選ぶ
+    """
+    terms = union_all(
+        *(
+            select(literal(index).label("term_index"), literal(_like(name)).label("pattern"))
+            for index, name in enumerate(tag_names)
+        )
+    ).subquery("tag_terms")
+
+    def matched_tags(name: str):
+        return (
+            select(terms.c.term_index, Tag.id.label("tag_id"))
+            .join(Tag, Tag.name.ilike(terms.c.pattern))
+            .subquery(name)
+        )
+
+    resolved = matched_tags("resolved_tags")
+    resolved_term_count = select(func.count(distinct(resolved.c.term_index))).scalar_subquery()
+
+    matched = matched_tags("matched_tags")
+    holders = (
+        select(UserTag.user_id)
+        .join(matched, matched.c.tag_id == UserTag.tag_id)
+        .group_by(UserTag.user_id)
+        .having(func.count(distinct(matched.c.term_index)) == resolved_term_count)
+    )
+    # どのタグ名も既存タグに一致しない場合はタグで絞り込まない
+    return or_(
+        resolved_term_count == 0,
+        and_(User.show_tags == True, User.id.in_(holders)),
+    )
+
+
+def filter_conditions(filters: SearchFilters) -> Dict[str, ColumnElement]:
+    """
+    フリーテキスト検索以外のフィルター条件（フィルター名 → 条件式）
+
+    フリーテキスト検索はDBの種類によって結合が必要なため app/services/text_search.py で扱う
+    """
+    conditions: Dict[str, ColumnElement] = {}
+    if filters.tags:
+        conditions["tags"] = tag_condition(filters.tags)
+    if filters.campus:
+        # OR条件で複数のキャンパスに一致するユーザーを検索
+        conditions["campus"] = or_(*[User.campus.ilike(_like(c)) for c in filters.campus])
+    if filters.faculty:
+        # OR条件で複数の学部に一致するユーザーを検索（プライバシー設定を考慮）
+        conditions["faculty"] = and_(
+            or_(*[User.faculty.ilike(_like(f)) for f in filters.faculty]),
+            User.show_faculty == True,
+        )
+    if filters.grade:
+        # OR条件で複数の学年に一致するユーザーを検索（プライバシー設定を考慮）
+        conditions["grade"] = and_(
+            or_(*[User.grade.ilike(_like(g)) for g in filters.grade]),
+            User.show_grade == True,
+        )
+    return conditions
@@ -0,0 +1,59 @@
+"""
+ユーザー検索（/users/search）の結果IDキャッシュ
+
+閲覧者に依存しない条件（正規化済みフィルター + 並び順）での検索結果IDを並び順どおりに保持し、
+同じ条件で検索する閲覧者全員で共有する
+
+- 閲覧者ごとの除外（自分自身・ブロック・いいね済み・スキップ済み）はキャッシュから取り出した後に適用する
+- 1件あたりのID数に上限を設け、超える条件はキャッシュせずSQLでページングする（メモリを一定以下に保つ）
+- 新規ユーザーやタグの変更はTTLで反映し、プロフィールの検索対象項目・公開設定の更新時は全件破棄する
+"""
+
+import logging
+from array import array
+from typing import Hashable, Iterable, Optional
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResultCache:
+    """検索条件ごとの結果ID列をLRU + TTLで保持する"""
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 30, max_ids: int = 5000):
+        self.max_ids = max_ids
+        self._cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        # 件数が多すぎてキャッシュしなかった回数
+        self.oversized = 0
+
+    def get(self, key: Hashable) -> Optional[array]:
+        return self._cache.get(key)
+
+    def put(self, key: Hashable, user_ids: Iterable[int]) -> Optional[array]:
+        """結果IDを保存して返す（上限を超える場合は保存せずNone）"""
+        ranked_ids = array("i", user_ids)
+        if len(ranked_ids) > self.max_ids:
+            self.oversized += 1
+            return None
+        self._cache.set(key, ranked_ids)
+        return ranked_ids
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "max_ids": self.max_ids, "oversized": self.oversized}
+
+    def reset(self) -> None:
+        self._cache.clear()
+        self._cache.reset_stats()
+        self.oversized = 0
+
+
+search_result_cache = SearchResultCache(
+    max_entries=settings.SEARCH_RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_RESULT_CACHE_TTL_SECONDS,
+    max_ids=settings.SEARCH_RESULT_CACHE_MAX_IDS,
+)
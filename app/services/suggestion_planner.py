@@ -0,0 +1,153 @@
+"""
+おすすめユーザー取得のクエリプランナー
+
+除外対象（ブロック・いいね送信済み・スキップ済み）を exclusion_service の
+CTE + アンチジョインとして1本のSQLに埋め込み、除外IDの一覧をPythonに持ち出さずにおすすめ候補を取得する
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.like import Like
+from app.models.recommendation import UserRecommendation
+from app.models.tag import Tag, UserTag
+from app.models.user import User
+from app.schemas.search import TagInfo
+from app.services.exclusion_service import not_excluded
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_viewer_tags(db: AsyncSession, viewer_id: int) -> Tuple[List[int], bool]:
+    """
+    閲覧者のタグIDと、事前計算済みのおすすめがあるかを1本のSQLで取得
+
+    事前計算の有無をここで確認し、未計算のユーザーでは事前計算の読み取りを発行しない
+    （タグ未設定の場合は行が返らず、事前計算もないものとして扱う）
+    """
+    has_precomputed = exists().where(UserRecommendation.user_id == viewer_id).label("has_precomputed")
+    result = await db.execute(
+        select(UserTag.tag_id, has_precomputed)
+        .where(UserTag.user_id == viewer_id)
+        .order_by(UserTag.tag_id)
+    )
+    rows = result.all()
+    return [tag_id for tag_id, _ in rows], any(flag for _, flag in rows)
+
+
+class SuggestionQueryPlanner:
+    """
+    おすすめユーザー取得用のSQLを組み立てて実行する
+
+    - 通常はユーザー取得1本 + タグ取得1本の計2本
+      （リクエスト全体の発行SQL数は呼び出し側が StatementCounter で計測する）
+    """
+
+    def __init__(self, db: AsyncSession, viewer_id: int, filter_conditions: Sequence = ()):
+        self.db = db
+        self.viewer_id = viewer_id
+        self.filter_conditions = list(filter_conditions)
+
+    def _candidate_statement(self, require_profile_completed: bool):
+        """除外・フィルター条件を適用した (User, has_received_like) のSELECT"""
+        has_received_like = (
+            exists()
+            .where(and_(Like.liker_id == User.id, Like.liked_id == self.viewer_id))
+            .label("has_received_like")
+        )
+        conditions = [
+            User.is_active == True,
+            User.id != self.viewer_id,
+            not_excluded(User.id, self.viewer_id),
+        ]
+        if require_profile_completed:
+            conditions.append(User.profile_completed == True)
+        conditions.extend(self.filter_conditions)
+        return select(User, has_received_like).where(and_(*conditions))
+
+    async def fetch_ranked(
+        self,
+        ranked_user_ids: Sequence[int],
+        limit: int,
+        chunk_size: int,
+    ) -> List[Tuple[User, bool]]:
+        """
+        順位付け済みの候補IDから、条件を満たすユーザーを順位順に limit 件取得
+
+        上位から chunk_size 件ずつ問い合わせ、limit 件そろった時点で打ち切る
+        """
+        # フィルター指定時のみプロフィール完了済みユーザーに限定（従来の挙動を維持）
+        require_profile_completed = bool(self.filter_conditions)
+        rows: List[Tuple[User, bool]] = []
+        for chunk_start in range(0, len(ranked_user_ids), chunk_size):
+            chunk_ids = list(ranked_user_ids[chunk_start:chunk_start + chunk_size])
+            statement = self._candidate_statement(require_profile_completed).where(User.id.in_(chunk_ids))
+            result = await self.db.execute(statement)
+            found: Dict[int, Tuple[User, bool]] = {
+                user.id: (user, bool(has_received_like)) for user, has_received_like in result.all()
+            }
+            rows.extend(found[user_id] for user_id in chunk_ids if user_id in found)
+            if len(rows) >= limit:
+                break
+        return rows[:limit]
+
+    async def fetch_recent(
+        self,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Tuple[User, bool]]:
+        """
+        条件を満たすユーザーを登録が新しい順に limit 件取得（フォールバック用）
+
+        after に前ページ最後の (created_at, id) を渡すと、その続きから取得する
+        """
+        statement = self._candidate_statement(require_profile_completed=True)
+        if after is not None:
+            created_at, user_id = after
+            statement = statement.where(
+                or_(
+                    User.created_at < created_at,
+                    and_(User.created_at == created_at, User.id < user_id),
+                )
+            )
+        statement = statement.order_by(User.created_at.desc(), User.id.desc()).limit(limit)
+        result = await self.db.execute(statement)
+        return [(user, bool(has_received_like)) for user, has_received_like in result.all()]
+
+    async def fetch_precomputed(self, limit: int) -> List[Tuple[User, bool, float]]:
+        """
+        事前計算済みのおすすめ（user_recommendations）を順位順に limit 件取得
+
+        計算後に発生したいいね・スキップ・ブロックは同じアンチジョインで除外する
+        """
+        statement = (
+            self._candidate_statement(require_profile_completed=False)
+            .add_columns(UserRecommendation.score)
+            .join(UserRecommendation, UserRecommendation.candidate_user_id == User.id)
+            .where(UserRecommendation.user_id == self.viewer_id)
+            .order_by(UserRecommendation.rank)
+            .limit(limit)
+        )
+        result = await self.db.execute(statement)
+        return [(user, bool(has_received_like), score) for user, has_received_like, score in result.all()]
+
+    async def fetch_tags(self, user_ids: Sequence[int]) -> Dict[int, List[TagInfo]]:
+        """ユーザーごとのタグ情報を1本のSQLで取得"""
+        if not user_ids:
+            return {}
+        result = await self.db.execute(
+            select(UserTag.user_id, Tag.id, Tag.name, Tag.description)
+            .join(Tag, Tag.id == UserTag.tag_id)
+            .where(UserTag.user_id.in_(list(user_ids)))
+            .order_by(UserTag.user_id, UserTag.id)
+        )
+        tags_by_user: Dict[int, List[TagInfo]] = {}
+        for user_id, tag_id, name, description in result.all():
+            tags_by_user.setdefault(user_id, []).append(
+                TagInfo(id=tag_id, name=name, description=description)
+            )
+        return tags_by_user
@@ -0,0 +1,128 @@
+"""
+おすすめセッション
+
+おすすめの順位付け結果（ユーザーIDとスコアのみ）を閲覧者ごとにTTL付きで保持し、
+2ページ目以降はカーソルで続きを返す（ページごとに順位付けをやり直さない）
+
+- 閲覧者1人につき1セッション（最初のページを取得するたびに作り直す）
+- 続きのページは別のワーカーに届くため、セッションはDB（user_suggestion_sessions）に保持する
+  （作成は1本のUPSERT、続きのページは主キーでの1本の読み取り）
+- いいね・スキップ・ブロックした相手は、ページ取得時のアンチジョインで除外される
+"""
+
+import json
+import logging
+import secrets
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.dialect import insert_for
+from app.models.recommendation import UserSuggestionSession
+
+logger = logging.getLogger(__name__)
+
+
+def _signature_key(filter_signature: Hashable) -> str:
+    """フィルター条件をDBで比較できる文字列にする"""
+    return json.dumps(list(filter_signature), ensure_ascii=False, default=str)
+
+
+class SuggestionSession:
+    """順位付け済みの候補ユーザーID列"""
+
+    __slots__ = ("session_id", "filter_signature", "user_ids", "scores")
+
+    def __init__(
+        self,
+        filter_signature: Hashable,
+        ranked: Iterable[Tuple[int, float]],
+        session_id: Optional[str] = None,
+    ):
+        self.session_id = session_id or secrets.token_urlsafe(8)
+        self.filter_signature = filter_signature
+        self.user_ids = array("i")
+        self.scores = array("d")
+        for user_id, score in ranked:
+            self.user_ids.append(user_id)
+            self.scores.append(score)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def remaining(self, offset: int) -> List[int]:
+        """offset 以降の候補ID"""
+        return list(self.user_ids[offset:])
+
+    def position_after(self, user_id: int, offset: int) -> int:
+        """offset 以降で user_id の次の位置（次ページの開始位置）"""
+        return self.user_ids.index(user_id, offset) + 1
+
+    def score_map(self, user_ids: Iterable[int]) -> Dict[int, float]:
+        wanted = set(user_ids)
+        return {
+            user_id: round(float(score), 6)
+            for user_id, score in zip(self.user_ids, self.scores)
+            if user_id in wanted
+        }
+
+
+class SuggestionSessionStore:
+    """閲覧者ごとのおすすめセッションをDBにTTL付きで保持する"""
+
+    def __init__(self, ttl_seconds: float = 1800):
+        self.ttl_seconds = ttl_seconds
+
+    async def create(
+        self,
+        db: AsyncSession,
+        viewer_id: int,
+        filter_signature: Hashable,
+        ranked: Iterable[Tuple[int, float]],
+    ) -> SuggestionSession:
+        """セッションを作成して閲覧者の前回のセッションを置き換える（コミットは呼び出し側）"""
+        session = SuggestionSession(filter_signature, ranked)
+        values = {
+            "viewer_id": viewer_id,
+            "session_id": session.session_id,
+            "filter_signature": _signature_key(filter_signature),
+            "candidate_ids": session.user_ids.tolist(),
+            "scores": session.scores.tolist(),
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+        }
+        statement = insert_for(db.bind.dialect.name, UserSuggestionSession).values(**values)
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["viewer_id"],
+                set_={key: value for key, value in values.items() if key != "viewer_id"},
+            )
+        )
+        logger.info(f"[SuggestionSession] Created: viewer_id={viewer_id}, candidates={len(session)}")
+        return session
+
+    async def get(
+        self, db: AsyncSession, viewer_id: int, session_id: str, filter_signature: Hashable
+    ) -> Optional[SuggestionSession]:
+        """有効なセッションを取得（期限切れ・作り直し済み・フィルター条件が異なる場合はNone）"""
+        result = await db.execute(
+            select(UserSuggestionSession).where(
+                UserSuggestionSession.viewer_id == viewer_id,
+                UserSuggestionSession.session_id == session_id,
+                UserSuggestionSession.expires_at > datetime.now(timezone.utc),
+            )
+        )
+        record = result.scalar_one_or_none()
+        if record is None or record.filter_signature != _signature_key(filter_signature):
+            return None
+        return SuggestionSession(
+            filter_signature,
+            zip(record.candidate_ids, record.scores),
+            session_id=record.session_id,
+        )
+
+
+suggestion_sessions = SuggestionSessionStore(ttl_seconds=settings.SUGGESTION_SESSION_TTL_SECONDS)
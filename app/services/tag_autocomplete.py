@@ -0,0 +1,159 @@
+"""
+タグ名のオートコンプリート
+
+タグ名（と名前中の各単語）を正規化したキーのソート済み配列をプロセス内に保持し、
+前方一致する範囲を bisect で求めて候補を返す（DBには問い合わせない）
+
+- 正規化: NFKC（全角英数→半角）+ casefold（大文字小文字を区別しない）
+- 並び順: 利用ユーザー数（タグ転置インデックスの件数）の多い順、同数は名前順
+- タグの作成・削除で差分更新し、他ワーカーでの変更は max_age_seconds ごとの再構築で反映する
+"""
+
+import asyncio
+import heapq
+import logging
+import re
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.tag import Tag
+from app.services.tag_index_service import TagInvertedIndex, tag_index
+
+logger = logging.getLogger(__name__)
+
+# 単語の区切りとみなす文字（区切りの直後からも前方一致させる）
+_WORD_SEPARATOR = re.compile(r"[\s_\-・/]+")
+
+
+def normalize_tag_name(value: str) -> str:
+    return unicodedata.normalize("NFKC", value).casefold().strip()
+
+
+def _keys_for(name: str) -> Set[str]:
+    normalized = normalize_tag_name(name)
+    keys = {normalized}
+    for match in _WORD_SEPARATOR.finditer(normalized):
+        suffix = normalized[match.end():]
+        if suffix:
+            keys.add(suffix)
+    return keys
+
+
+class TagSuggestion(NamedTuple):
+    tag_id: int
+    name: str
+    user_count: int
+
+
+class TagAutocompleteIndex:
+    """タグ名の前方一致インデックス"""
+
+    def __init__(self, usage_index: TagInvertedIndex, max_age_seconds: int = 300):
+        self.usage_index = usage_index
+        self.max_age_seconds = max_age_seconds
+        # キー昇順に並べた (キー, タグID)
+        self._keys: List[str] = []
+        self._tag_ids = array("i")
+        self._names: Dict[int, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _is_expired(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > self.max_age_seconds
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """未構築または期限切れの場合のみ再構築する"""
+        if not self._is_expired():
+            return
+        async with self._lock:
+            if self._is_expired():
+                await self.rebuild(db)
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """tags テーブル全体からインデックスを構築"""
+        started = time.perf_counter()
+        result = await db.execute(select(Tag.id, Tag.name))
+        self.load_tags(result.all())
+        logger.info(
+            f"[TagAutocomplete] Rebuilt: tags={len(self._names)}, keys={len(self._keys)}, "
+            f"elapsed={(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+
+    def load_tags(self, tags: Iterable[Tuple[int, str]]) -> None:
+        """(tag_id, name) の組からインデックスを構築"""
+        self._names = {tag_id: name for tag_id, name in tags}
+        entries = sorted(
+            (key, tag_id) for tag_id, name in self._names.items() for key in _keys_for(name)
+        )
+        self._keys = [key for key, _ in entries]
+        self._tag_ids = array("i", (tag_id for _, tag_id in entries))
+        self._loaded_at = time.monotonic()
+
+    def reset(self) -> None:
+        self._keys = []
+        self._tag_ids = array("i")
+        self._names = {}
+        self._loaded_at = None
+
+    # ==================== 差分更新 ====================
+
+    def add(self, tag_id: int, name: str) -> None:
+        """タグが作成されたことを反映"""
+        if not self.is_loaded or tag_id in self._names:
+            return
+        self._names[tag_id] = name
+        for key in _keys_for(name):
+            index = bisect_left(self._keys, key)
+            # 同じキーの中ではタグID昇順に並べる
+            while index < len(self._keys) and self._keys[index] == key and self._tag_ids[index] < tag_id:
+                index += 1
+            self._keys.insert(index, key)
+            self._tag_ids.insert(index, tag_id)
+
+    def remove(self, tag_id: int) -> None:
+        """タグが削除されたことを反映"""
+        name = self._names.pop(tag_id, None)
+        if name is None:
+            return
+        for key in _keys_for(name):
+            index = bisect_left(self._keys, key)
+            while index < len(self._keys) and self._keys[index] == key:
+                if self._tag_ids[index] == tag_id:
+                    del self._keys[index]
+                    del self._tag_ids[index]
+                    break
+                index += 1
+
+    # ==================== 参照 ====================
+
+    def suggest(self, query: str, limit: int = 10) -> List[TagSuggestion]:
+        """query で始まるタグ名（または名前中の単語）を利用ユーザー数の多い順に返す"""
+        prefix = normalize_tag_name(query)
+        if not prefix:
+            return []
+        matched: Set[int] = set()
+        index = bisect_left(self._keys, prefix)
+        while index < len(self._keys) and self._keys[index].startswith(prefix):
+            matched.add(self._tag_ids[index])
+            index += 1
+        top = heapq.nsmallest(
+            limit,
+            ((-len(self.usage_index.users_with(tag_id)), self._names[tag_id], tag_id) for tag_id in matched),
+        )
+        return [TagSuggestion(tag_id, name, -negative_count) for negative_count, name, tag_id in top]
+
+
+tag_autocomplete = TagAutocompleteIndex(tag_index, max_age_seconds=settings.TAG_INDEX_MAX_AGE_SECONDS)
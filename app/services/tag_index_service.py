@@ -0,0 +1,165 @@
+"""
+タグ転置インデックス
+
+tag_id → ソート済みユーザーID配列 をプロセス内に保持し、
+おすすめユーザーの共通タグ数をDBに問い合わせずに計算する
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.tag import UserTag
+
+logger = logging.getLogger(__name__)
+
+
+def _sorted_insert(values: array, value: int) -> bool:
+    """ソート済み配列に重複なしで挿入（挿入した場合True）"""
+    index = bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        return False
+    values.insert(index, value)
+    return True
+
+
+def _sorted_remove(values: array, value: int) -> bool:
+    """ソート済み配列から削除（削除した場合True）"""
+    index = bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        del values[index]
+        return True
+    return False
+
+
+class TagInvertedIndex:
+    """
+    タグ転置インデックス
+
+    - 起動時（または初回利用時）に user_tags 全体から構築
+    - /users/me/tags の追加・削除で差分更新
+    - ワーカープロセス間では共有されないため、max_age_seconds ごとに再構築して整合性を保つ
+    """
+
+    def __init__(self, max_age_seconds: int = 300):
+        # {tag_id: array('i', [user_id, ...])}（昇順）
+        self._postings: Dict[int, array] = {}
+        # {user_id: array('i', [tag_id, ...])}（昇順）
+        self._user_tags: Dict[int, array] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.max_age_seconds = max_age_seconds
+        # 内容が変わるたびに増える版数（派生データのキャッシュ判定に使う）
+        self.version = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _is_expired(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > self.max_age_seconds
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """未構築または期限切れの場合のみ再構築する"""
+        if not self._is_expired():
+            return
+        async with self._lock:
+            if self._is_expired():
+                await self.rebuild(db)
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """user_tags テーブル全体からインデックスを構築"""
+        started = time.perf_counter()
+        result = await db.execute(
+            select(UserTag.tag_id, UserTag.user_id).order_by(UserTag.tag_id, UserTag.user_id)
+        )
+        self.load_pairs(result.all())
+        logger.info(
+            f"[TagIndex] Rebuilt: tags={len(self._postings)}, users={len(self._user_tags)}, "
+            f"elapsed={(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+
+    def load_pairs(self, pairs: Iterable[Tuple[int, int]]) -> None:
+        """(tag_id, user_id) の組からインデックスを構築"""
+        postings: Dict[int, array] = defaultdict(lambda: array("i"))
+        user_tags: Dict[int, array] = defaultdict(lambda: array("i"))
+        for tag_id, user_id in pairs:
+            postings[tag_id].append(user_id)
+            user_tags[user_id].append(tag_id)
+        # 入力順に依存しないよう最後に整列する
+        self._postings = {tag_id: array("i", sorted(set(ids))) for tag_id, ids in postings.items()}
+        self._user_tags = {user_id: array("i", sorted(set(ids))) for user_id, ids in user_tags.items()}
+        self._loaded_at = time.monotonic()
+        self.version += 1
+
+    def reset(self) -> None:
+        """インデックスを破棄（次回利用時に再構築される）"""
+        self._postings = {}
+        self._user_tags = {}
+        self._loaded_at = None
+        self.version += 1
+
+    # ==================== 差分更新 ====================
+
+    def add(self, user_id: int, tag_id: int) -> None:
+        """ユーザーにタグが追加されたことを反映"""
+        if not self.is_loaded:
+            return
+        _sorted_insert(self._postings.setdefault(tag_id, array("i")), user_id)
+        _sorted_insert(self._user_tags.setdefault(user_id, array("i")), tag_id)
+        self.version += 1
+
+    def remove(self, user_id: int, tag_id: int) -> None:
+        """ユーザーからタグが削除されたことを反映"""
+        if not self.is_loaded:
+            return
+        postings = self._postings.get(tag_id)
+        if postings is not None:
+            _sorted_remove(postings, user_id)
+            if not postings:
+                del self._postings[tag_id]
+        tags = self._user_tags.get(user_id)
+        if tags is not None:
+            _sorted_remove(tags, tag_id)
+            if not tags:
+                del self._user_tags[user_id]
+        self.version += 1
+
+    def drop_tag(self, tag_id: int) -> None:
+        """タグ自体が削除されたことを反映（user_tags はCASCADEで消える）"""
+        if not self.is_loaded:
+            return
+        for user_id in self._postings.pop(tag_id, ()):
+            tags = self._user_tags.get(user_id)
+            if tags is not None:
+                _sorted_remove(tags, tag_id)
+                if not tags:
+                    del self._user_tags[user_id]
+        self.version += 1
+
+    # ==================== 参照 ====================
+
+    def tags_of(self, user_id: int) -> List[int]:
+        """ユーザーが持つタグIDの一覧"""
+        return list(self._user_tags.get(user_id, ()))
+
+    def users_with(self, tag_id: int) -> array:
+        """タグを持つユーザーID配列（昇順）"""
+        return self._postings.get(tag_id, array("i"))
+
+    def postings(self) -> Dict[int, array]:
+        """{tag_id: ユーザーID配列} 全体（読み取り専用として扱うこと）"""
+        return self._postings
+
+
+tag_index = TagInvertedIndex(max_age_seconds=settings.TAG_INDEX_MAX_AGE_SECONDS)
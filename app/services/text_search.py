@@ -0,0 +1,118 @@
+"""
+ユーザーのフリーテキスト検索（display_name, bio）
+
+検索条件と関連度スコアをDBの種類に応じて組み立てる（インデックスは app/models/user_text_search.py）
+
+- PostgreSQL: ILIKE '%語%' を pg_trgm の GIN インデックスで検索し、similarity() で関連度を付ける
+- SQLite: FTS5（trigram）の MATCH で検索し、bm25() で関連度を付ける
+  （trigram は3文字未満の語を索引できないため、短い語は LIKE にフォールバックする）
+- bio は show_bio=True のユーザーのみ照合・関連度の対象にする
+- 関連度は display_name の一致を bio の一致より重く扱う
+"""
+
+from typing import NamedTuple
+
+from sqlalchemy import Select, and_, case, func, literal_column, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.user import User
+from app.models.user_text_search import users_fts
+
+# trigram トークナイザーで索引できる最小の文字数
+MIN_TRIGRAM_LENGTH = 3
+
+# display_name の一致を bio の一致の何倍に扱うか
+DISPLAY_NAME_WEIGHT = 2.0
+
+# bm25() の第1引数はFTSテーブル名そのもの
+_FTS_TABLE = literal_column(users_fts.name)
+
+
+class TextSearch(NamedTuple):
+    query: Select
+    # 大きいほど関連度が高い
+    relevance: ColumnElement
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _fts_phrase(term: str) -> str:
+    # FTS5のフレーズとして扱う（演算子や記号を解釈させない）
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _bio_visible(expression: ColumnElement) -> ColumnElement:
+    return case((User.show_bio == True, expression), else_=0.0)
+
+
+def _apply_like(query: Select, term: str) -> TextSearch:
+    pattern = _like_pattern(term)
+    name_hit = User.display_name.ilike(pattern, escape="\\")
+    bio_hit = User.bio.ilike(pattern, escape="\\")
+    query = query.where(or_(name_hit, and_(bio_hit, User.show_bio == True)))
+    relevance = (
+        case((name_hit, DISPLAY_NAME_WEIGHT), else_=0.0)
+        + _bio_visible(case((bio_hit, 1.0), else_=0.0))
+    )
+    return TextSearch(query, relevance)
+
+
+def _apply_postgres(query: Select, term: str) -> TextSearch:
+    # 条件は ILIKE のまま（GINトライグラムインデックスが使われる）、関連度だけ similarity で付ける
+    query, _ = _apply_like(query, term)
+    relevance = (
+        func.similarity(User.display_name, term) * DISPLAY_NAME_WEIGHT
+        + _bio_visible(func.word_similarity(term, func.coalesce(User.bio, "")))
+    )
+    return TextSearch(query, relevance)
+
+
+def _apply_sqlite_fts(query: Select, term: str) -> TextSearch:
+    phrase = _fts_phrase(term)
+    # 列ごとに MATCH し、bm25 の重みで他方の列を0にして列ごとのスコアを得る
+    name_hits = (
+        select(users_fts.c.rowid.label("user_id"), (-func.bm25(_FTS_TABLE, 1.0, 0.0)).label("score"))
+        .where(users_fts.c.display_name.op("MATCH")(phrase))
+        .subquery("name_hits")
+    )
+    bio_hits = (
+        select(users_fts.c.rowid.label("user_id"), (-func.bm25(_FTS_TABLE, 0.0, 1.0)).label("score"))
+        .where(users_fts.c.bio.op("MATCH")(phrase))
+        .subquery("bio_hits")
+    )
+    query = (
+        query
+        .outerjoin(name_hits, name_hits.c.user_id == User.id)
+        .outerjoin(bio_hits, bio_hits.c.user_id == User.id)
+        .where(
+            or_(
+                name_hits.c.user_id.is_not(None),
+                and_(bio_hits.c.user_id.is_not(None), User.show_bio == True),
+            )
+        )
+    )
+    relevance = (
+        func.coalesce(name_hits.c.score, 0.0) * DISPLAY_NAME_WEIGHT
+        + _bio_visible(func.coalesce(bio_hits.c.score, 0.0))
+    )
+    return TextSearch(query, relevance)
+
+
+def apply_text_search(query: Select, dialect_name: str, term: str) -> TextSearch:
+    """
+    User を対象とするクエリにフリーテキスト検索の条件を加え、関連度の式とともに返す
+
+    Args:
+        query: select(User) を元にしたクエリ
+        dialect_name: DBの種類（db.bind.dialect.name）
+        term: 検索語
+    """
+    term = term.strip()
+    if dialect_name == "postgresql":
+        return _apply_postgres(query, term)
+    if dialect_name == "sqlite" and len(term) >= MIN_TRIGRAM_LENGTH:
+        return _apply_sqlite_fts(query, term)
+    return _apply_like(query, term)
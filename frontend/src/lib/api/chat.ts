@@ -2,13 +2,16 @@ import { apiClient } from './index'
 import type {
   Conversation,
   ConversationListResponse,
+  InboxResponse,
   ConversationDetail,
   ConversationCreateRequest,
   Message,
   MessageListResponse,
+  MessageCursorParams,
   MessageCreateRequest,
   UnreadCountResponse,
   MessageReadResponse,
+  ConversationReadStateResponse,
   MessageType,
 } from '@/types/chat'
 
@@ -31,13 +34,17 @@ export const chatApi = {
    */
   async getConversations(
     limit: number = 20,
-    offset: number = 0
+    offset: number = 0,
+    cursor?: string
   ): Promise<ConversationListResponse> {
     try {
       const params = new URLSearchParams({
         limit: String(limit),
         offset: String(offset),
       })
+      if (cursor) {
+        params.set('cursor', cursor)
+      }
       return await apiClient.get<ConversationListResponse>(
         `/conversations?${params}`
       )
@@ -50,6 +57,25 @@ export const chatApi = {
     }
   },
 
+  /**
+   * 受信箱（相手のプロフィールカード・最後のメッセージ・未読数・ブロック関係つき）を取得
+   */
+  async getInbox(limit: number = 20, cursor?: string): Promise<InboxResponse> {
+    try {
+      const params = new URLSearchParams({ limit: String(limit) })
+      if (cursor) {
+        params.set('cursor', cursor)
+      }
+      return await apiClient.get<InboxResponse>(`/conversations/inbox?${params}`)
+    } catch (error: any) {
+      throw new ChatApiError(
+        error.message || '受信箱の取得に失敗しました',
+        error.status,
+        error.code
+      )
+    }
+  },
+
   /**
    * 会話詳細を取得
    */
@@ -91,13 +117,17 @@ export const chatApi = {
   async getMessages(
     conversationId: number,
     limit: number = 50,
-    offset: number = 0
+    offset: number = 0,
+    cursor: MessageCursorParams = {}
   ): Promise<MessageListResponse> {
     try {
       const params = new URLSearchParams({
         limit: String(limit),
         offset: String(offset),
       })
+      if (cursor.before_id !== undefined) params.set('before_id', String(cursor.before_id))
+      if (cursor.after_id !== undefined) params.set('after_id', String(cursor.after_id))
+      if (cursor.latest) params.set('latest', 'true')
       return await apiClient.get<MessageListResponse>(
         `/conversations/${conversationId}/messages?${params}`
       )
@@ -162,6 +192,27 @@ export const chatApi = {
     }
   },
 
+  /**
+   * 指定したメッセージまで（未指定なら最新まで）をまとめて既読にする
+   */
+  async markConversationAsRead(
+    conversationId: number,
+    upToMessageId?: number
+  ): Promise<ConversationReadStateResponse> {
+    try {
+      return await apiClient.put<ConversationReadStateResponse>(
+        `/conversations/${conversationId}/read`,
+        { up_to_message_id: upToMessageId ?? null }
+      )
+    } catch (error: any) {
+      throw new ChatApiError(
+        error.message || '既読マークに失敗しました',
+        error.status,
+        error.code
+      )
+    }
+  },
+
   /**
    * 未読メッセージ数を取得
    */
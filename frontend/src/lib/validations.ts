@@ -38,7 +38,7 @@ export const searchSchema = z.object({
   search: z.string().optional(),
   limit: z.number().min(1).max(100).default(20),
   offset: z.number().min(0).default(0),
-  sort: z.enum(['recent', 'popular', 'alphabetical']).default('recent'),
+  sort: z.enum(['recent', 'popular', 'alphabetical', 'relevance']).default('recent'),
 })
 
 // メッセージ関連のバリデーション
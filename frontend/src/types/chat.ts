@@ -2,6 +2,8 @@
  * チャット関連の型定義
  */
 
+import type { UserProfile } from '@/types/user'
+
 // 会話タイプ
 export type ConversationType = 'direct' | 'group'
 
@@ -65,17 +67,50 @@ export interface ConversationDetail {
 // 会話一覧レスポンス
 export interface ConversationListResponse {
   conversations: Conversation[]
-  total: number
+  total: number | null // cursor 指定時は null
   limit: number
   offset: number
+  next_cursor?: string | null
+}
+
+// 相手とのブロック関係（blocked: 自分がブロック / blocked_by: 相手がブロック）
+export type BlockState = 'none' | 'blocked' | 'blocked_by'
+
+// 受信箱の1件
+export interface InboxItem {
+  id: number
+  type: ConversationType
+  title?: string | null
+  other_user: UserProfile // 公開設定を反映したプロフィールカード
+  is_online: boolean
+  last_message?: LastMessage | null
+  unread_count: number
+  block_state: BlockState
+  last_activity_at: string
+  created_at: string
+}
+
+// 受信箱レスポンス
+export interface InboxResponse {
+  conversations: InboxItem[]
+  limit: number
+  next_cursor?: string | null
 }
 
 // メッセージ一覧レスポンス
 export interface MessageListResponse {
   messages: Message[]
-  total: number
+  total: number | null // キーセットページング（before_id / after_id / latest）では null
   limit: number
   offset: number
+  has_more: boolean
+}
+
+// メッセージ履歴のキーセットページング指定
+export interface MessageCursorParams {
+  before_id?: number // このIDより古いメッセージを新しい順に取得
+  after_id?: number // このIDより新しいメッセージを古い順に取得（差分同期）
+  latest?: boolean // 最新のメッセージから新しい順に取得
 }
 
 // 未読数レスポンス
@@ -89,6 +124,12 @@ export interface MessageReadResponse {
   message_id: number
 }
 
+// まとめて既読レスポンス
+export interface ConversationReadStateResponse {
+  conversation_id: number
+  last_read_message_id: number
+}
+
 // 会話作成リクエスト
 export interface ConversationCreateRequest {
   other_user_id: number
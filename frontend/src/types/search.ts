@@ -32,10 +32,27 @@ export interface UserSearchResult {
 // ユーザー検索レスポンス
 export interface UserSearchResponse {
   users: UserSearchResult[]
-  total: number
+  total: number | null  // 最初のページ（または include_total=true）のみ
   limit: number
   offset: number
   filters_applied: Record<string, any>
+  next_cursor?: string | null
+}
+
+// ファセットの値ごとの件数
+export interface FacetCount {
+  value: string
+  count: number
+}
+
+// 検索フィルターのファセット件数レスポンス（/users/search/facets）
+export interface SearchFacetsResponse {
+  campus: FacetCount[]
+  faculty: FacetCount[]
+  grade: FacetCount[]
+  sexuality: FacetCount[]
+  tags: FacetCount[]
+  filters_applied: Record<string, any>
 }
 
 // おすすめユーザー
@@ -60,7 +77,7 @@ export interface UserSuggestionsResponse {
 }
 
 // 並び順
-export type SortOrder = 'recent' | 'popular' | 'alphabetical'
+export type SortOrder = 'recent' | 'popular' | 'alphabetical' | 'relevance'
 
 // フィルター関連の型定義（データベースの値は英語、表示は日本語）
 export type Sexuality = 'gay' | 'lesbian' | 'bisexual' | 'transgender' | 'pansexual' | 'asexual' | 'other' | 'prefer_not_to_say'
@@ -86,6 +86,31 @@ async def test_db() -> AsyncGenerator[AsyncSession, None]:
         os.remove(TEST_DB_PATH)
 
 
+@pytest.fixture(autouse=True)
+def reset_in_memory_indexes():
+    """プロセス内インデックスはテストDBごとに作り直す"""
+    from app.services.exclusion_service import exclusion_sets
+    from app.services.profile_cards import profile_cards
+    from app.services.search_facets import search_facets
+    from app.services.search_results import search_result_cache
+    from app.services.tag_autocomplete import tag_autocomplete
+    from app.services.tag_index_service import tag_index
+
+    tag_index.reset()
+    tag_autocomplete.reset()
+    exclusion_sets.reset()
+    search_facets.reset()
+    search_result_cache.reset()
+    profile_cards.reset()
+    yield
+    tag_index.reset()
+    tag_autocomplete.reset()
+    exclusion_sets.reset()
+    search_facets.reset()
+    search_result_cache.reset()
+    profile_cards.reset()
+
+
 @pytest_asyncio.fixture(scope="function")
 async def client(test_db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     """テスト用HTTPクライアント"""
@@ -0,0 +1,318 @@
+"""
+チャットAPIのテスト
+
+メッセージ履歴のキーセットページング（before_id / after_id）、既読位置（last_read_message_id）、
+会話一覧（会話に非正規化した最後のメッセージ）、受信箱（/conversations/inbox）、
+1対1会話の組キー（min_user_id, max_user_id）による作成・取得をテスト
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.block import Block
+from app.models.conversation import Conversation, ConversationMember
+from app.models.message import Message
+from app.models.user import User
+from app.routers import chat
+from app.routers.chat import create_or_get_conversation, record_last_message
+from tests.test_suggestions import create_user
+
+
+async def create_conversation(db: AsyncSession, *user_ids: int) -> int:
+    conversation = Conversation()
+    if len(user_ids) == 2:
+        conversation.min_user_id, conversation.max_user_id = min(user_ids), max(user_ids)
+    db.add(conversation)
+    await db.flush()
+    db.add_all([ConversationMember(conversation_id=conversation.id, user_id=user_id) for user_id in user_ids])
+    await db.commit()
+    return conversation.id
+
+
+async def create_messages(db: AsyncSession, conversation_id: int, sender_id: int, count: int) -> list[int]:
+    messages = [
+        Message(conversation_id=conversation_id, sender_id=sender_id, content=f"message {index}")
+        for index in range(count)
+    ]
+    db.add_all(messages)
+    await db.flush()
+    for message in messages:
+        await record_last_message(message, db)
+    await db.commit()
+    return [message.id for message in messages]
+
+
+class TestMessagePagination:
+    """メッセージ履歴のページングのテスト"""
+
+    async def test_keyset_pages_without_count(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        other = await create_user(test_db, "other@s.kyushu-u.ac.jp", "Other")
+        conversation_id = await create_conversation(test_db, test_user.id, other.id)
+        message_ids = await create_messages(test_db, conversation_id, other.id, 5)
+        url = f"/conversations/{conversation_id}/messages"
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.get(f"{url}?latest=true&limit=2", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        body = response.json()
+        assert [m["id"] for m in body["messages"]] == message_ids[:-3:-1]
+        assert (body["total"], body["has_more"]) == (None, True)
+        assert not [sql for sql in statements if "count(" in sql]
+
+        response = await client.get(f"{url}?before_id={message_ids[3]}&limit=3", headers=auth_headers)
+        body = response.json()
+        assert [m["id"] for m in body["messages"]] == message_ids[2::-1]
+        assert body["has_more"] is False
+
+        # 差分同期は古い順
+        response = await client.get(f"{url}?after_id={message_ids[1]}&limit=2", headers=auth_headers)
+        body = response.json()
+        assert [m["id"] for m in body["messages"]] == message_ids[2:4]
+        assert body["has_more"] is True
+
+        # 従来のオフセットページング
+        response = await client.get(f"{url}?limit=2&offset=4", headers=auth_headers)
+        body = response.json()
+        assert [m["id"] for m in body["messages"]] == message_ids[4:]
+        assert (body["total"], body["has_more"]) == (5, False)
+
+        response = await client.get(f"{url}?before_id=1&after_id=1", headers=auth_headers)
+        assert response.status_code == 400
+
+
+class TestReadWatermark:
+    """参加者ごとの既読位置のテスト"""
+
+    async def test_bulk_mark_read_is_one_write(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        other = await create_user(test_db, "other@s.kyushu-u.ac.jp", "Other")
+        conversation_id = await create_conversation(test_db, test_user.id, other.id)
+        message_ids = await create_messages(test_db, conversation_id, other.id, 5)
+        url = f"/conversations/{conversation_id}"
+
+        response = await client.get(f"{url}/unread-count", headers=auth_headers)
+        assert response.json()["unread_count"] == 5
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.put(
+                f"{url}/read", json={"up_to_message_id": message_ids[2]}, headers=auth_headers
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert response.json()["last_read_message_id"] == message_ids[2]
+        assert len([sql for sql in statements if sql.startswith("UPDATE")]) == 1
+
+        response = await client.get(f"{url}/unread-count", headers=auth_headers)
+        assert response.json()["unread_count"] == 2
+        response = await client.get("/conversations", headers=auth_headers)
+        assert response.json()["conversations"][0]["unread_count"] == 2
+
+        # 既読位置は戻らない。個別の既読マークも既読位置を進める
+        response = await client.put(f"{url}/read", json={"up_to_message_id": message_ids[0]}, headers=auth_headers)
+        assert response.json()["last_read_message_id"] == message_ids[2]
+        response = await client.put(f"{url}/messages/{message_ids[3]}/read", headers=auth_headers)
+        assert response.status_code == 200
+
+        response = await client.get(f"{url}/messages", headers=auth_headers)
+        assert [m["is_read"] for m in response.json()["messages"]] == [True, True, True, True, False]
+
+        response = await client.put(f"{url}/read", json={}, headers=auth_headers)
+        assert response.json()["last_read_message_id"] == message_ids[-1]
+        response = await client.get(f"{url}/unread-count", headers=auth_headers)
+        assert response.json()["unread_count"] == 0
+
+
+class TestConversationList:
+    """会話一覧のテスト"""
+
+    async def test_inbox_reads_denormalized_last_message(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        users = [
+            await create_user(test_db, f"peer{index}@s.kyushu-u.ac.jp", f"Peer{index}")
+            for index in range(3)
+        ]
+        user_ids = [user.id for user in users]
+        conversation_ids = [await create_conversation(test_db, test_user.id, user_id) for user_id in user_ids]
+        await create_messages(test_db, conversation_ids[0], user_ids[0], 2)
+
+        # 送信した会話が先頭に来て、最後のメッセージ（プレビュー）が会話に記録される
+        response = await client.post(
+            f"/conversations/{conversation_ids[1]}/messages", json={"content": "x" * 150}, headers=auth_headers
+        )
+        assert response.status_code == 201
+        sent_id = response.json()["id"]
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.get("/conversations?limit=2", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        body = response.json()
+        assert [c["id"] for c in body["conversations"]] == [conversation_ids[1], conversation_ids[0]]
+        last_message = body["conversations"][0]["last_message"]
+        assert (last_message["id"], last_message["content"], last_message["is_read"]) == (sent_id, "x" * 100, False)
+        assert [c["unread_count"] for c in body["conversations"]] == [0, 2]
+        assert body["total"] == 3
+        # 件数と一覧の2本のみ（最新メッセージの集計や参加者の別読み込みはない）
+        assert len([sql for sql in statements if "conversation_members" in sql]) == 2
+        assert not [sql for sql in statements if "max(messages.id)" in sql]
+
+        # 続きはカーソルで（総数は数えない）。ブロックした相手との会話は含めない
+        response = await client.post("/blocks", json={"blocked_user_id": user_ids[0]}, headers=auth_headers)
+        assert response.status_code in (200, 201)
+        response = await client.get(f"/conversations?limit=1&cursor={body['next_cursor']}", headers=auth_headers)
+        assert [c["id"] for c in response.json()["conversations"]] == [conversation_ids[2]]
+        assert response.json()["total"] is None
+        assert response.json()["next_cursor"] is None
+
+        response = await client.get("/conversations?cursor=broken", headers=auth_headers)
+        assert response.status_code == 400
+
+    async def test_inbox_is_two_statements_with_block_state(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        users = [
+            await create_user(test_db, f"peer{index}@s.kyushu-u.ac.jp", f"Peer{index}")
+            for index in range(3)
+        ]
+        user_ids = [user.id for user in users]
+        conversation_ids = [await create_conversation(test_db, test_user.id, user_id) for user_id in user_ids]
+        message_ids = await create_messages(test_db, conversation_ids[0], user_ids[0], 3)
+        test_db.add(Block(blocker_id=user_ids[1], blocked_id=test_user.id))
+        await test_db.commit()
+        response = await client.post("/blocks", json={"blocked_user_id": user_ids[2]}, headers=auth_headers)
+        assert response.status_code == 201
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.get("/conversations/inbox?limit=2", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        body = response.json()
+        assert response.status_code == 200
+        assert [c["id"] for c in body["conversations"]] == [conversation_ids[0], conversation_ids[2]]
+        first, second = body["conversations"]
+        assert first["other_user"]["display_name"] == "Peer0"
+        assert first["other_user"]["email"] is None
+        assert (first["last_message"]["id"], first["unread_count"]) == (message_ids[-1], 3)
+        assert (first["block_state"], second["block_state"]) == ("none", "blocked")
+        assert second["last_message"] is None
+        # 会話一覧とカードのタグの2本（認証のユーザー取得を除く）
+        assert len([sql for sql in statements if "conversation_members" in sql or "user_tags" in sql]) == 2
+
+        response = await client.get(f"/conversations/inbox?cursor={body['next_cursor']}", headers=auth_headers)
+        assert [(c["id"], c["block_state"]) for c in response.json()["conversations"]] == [
+            (conversation_ids[1], "blocked_by")
+        ]
+        assert response.json()["next_cursor"] is None
+
+
+class TestDirectConversationPair:
+    """1対1会話の組キーのテスト"""
+
+    async def test_create_or_get_is_idempotent_and_race_free(
+        self, test_db: AsyncSession, test_user: User, monkeypatch
+    ):
+        other = await create_user(test_db, "other@s.kyushu-u.ac.jp", "Other")
+        user_id, other_id = test_user.id, other.id
+
+        conversation_id = (await create_or_get_conversation(other_id, user_id, test_db)).id
+        assert (await create_or_get_conversation(user_id, other_id, test_db)).id == conversation_id
+        members = await test_db.execute(
+            select(ConversationMember.user_id).where(ConversationMember.conversation_id == conversation_id)
+        )
+        assert sorted(members.scalars().all()) == sorted([user_id, other_id])
+
+        # 既存の会話の確認と作成の間に他のリクエストが作成した場合も、その会話を返す
+        lookup = chat.get_existing_conversation
+        calls = []
+
+        async def lookup_after_race(user1_id, user2_id, db):
+            calls.append((user1_id, user2_id))
+            return None if len(calls) == 1 else await lookup(user1_id, user2_id, db)
+
+        monkeypatch.setattr(chat, "get_existing_conversation", lookup_after_race)
+        assert (await create_or_get_conversation(user_id, other_id, test_db)).id == conversation_id
+        assert len(calls) == 2
+        count = await test_db.execute(select(func.count()).select_from(Conversation))
+        assert count.scalar() == 1
+
+        # 組キーの一意制約
+        test_db.add(Conversation(min_user_id=min(user_id, other_id), max_user_id=max(user_id, other_id)))
+        with pytest.raises(IntegrityError):
+            await test_db.flush()
+        await test_db.rollback()
+
+    async def test_migration_merges_duplicate_conversations(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """組キー導入前に重複していた会話は、最も古い会話にメッセージと未読を統合して削除される"""
+        path = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "add_conversation_direct_pair.py"
+        spec = importlib.util.spec_from_file_location("add_conversation_direct_pair", path)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+
+        other = await create_user(test_db, "other@s.kyushu-u.ac.jp", "Other")
+        third = await create_user(test_db, "third@s.kyushu-u.ac.jp", "Third")
+        user_id, other_id = test_user.id, other.id
+        # 組キーのない（導入前の）重複した会話
+        conversation_ids = []
+        for _ in range(2):
+            conversation = Conversation()
+            test_db.add(conversation)
+            await test_db.flush()
+            test_db.add_all([
+                ConversationMember(conversation_id=conversation.id, user_id=user_id),
+                ConversationMember(conversation_id=conversation.id, user_id=other_id),
+            ])
+            conversation_ids.append(conversation.id)
+        await test_db.commit()
+        survivor_id, duplicate_id = conversation_ids
+        unrelated_id = await create_conversation(test_db, user_id, third.id)
+        first_ids = await create_messages(test_db, survivor_id, user_id, 1)
+        duplicate_ids = await create_messages(test_db, duplicate_id, other_id, 2)
+
+        merged = await test_db.run_sync(
+            lambda session: migration.merge_duplicate_direct_conversations(session.connection())
+        )
+        await test_db.commit()
+
+        assert merged == 1
+        remaining = await test_db.execute(select(Conversation.id).order_by(Conversation.id))
+        assert remaining.scalars().all() == [survivor_id, unrelated_id]
+        moved = await test_db.execute(
+            select(Message.id).where(Message.conversation_id == survivor_id).order_by(Message.id)
+        )
+        assert moved.scalars().all() == first_ids + duplicate_ids
+
+        response = await client.get("/conversations", headers=auth_headers)
+        conversations = {c["id"]: c for c in response.json()["conversations"]}
+        assert set(conversations) == {survivor_id, unrelated_id}
+        assert conversations[survivor_id]["last_message"]["id"] == duplicate_ids[-1]
+        # 重複側で未読だった相手のメッセージは未読のまま
+        assert conversations[survivor_id]["unread_count"] == 2
@@ -0,0 +1,101 @@
+"""
+除外ユーザー集合のテスト
+
+LRUキャッシュ・除外集合サービスと、いいね・スキップ・ブロック時の差分更新をテスト
+"""
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.models.block import Block
+from app.models.like import Like
+from app.models.user import User
+from app.services.exclusion_service import LIKED, SKIPPED, ExclusionSet, exclusion_sets
+from tests.test_suggestions import create_user
+
+
+class TestLRUCache:
+    """LRUキャッシュのテスト"""
+
+    def test_eviction_and_stats(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)  # 最も古く使われた "b" が追い出される
+
+        assert cache.get("b") is None
+        assert cache.peek("a") == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(max_entries=2, ttl_seconds=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+class TestExclusionSet:
+    """除外集合のテスト"""
+
+    def test_add_discard_and_kinds(self):
+        exclusion_set = ExclusionSet()
+        exclusion_set.add(LIKED, 5)
+        exclusion_set.add(LIKED, 2)
+        exclusion_set.add(LIKED, 5)
+        exclusion_set.add(SKIPPED, 9)
+
+        assert list(exclusion_set.liked) == [2, 5]
+        assert exclusion_set.contains(9)
+        assert not exclusion_set.contains(9, kinds=(LIKED,))
+        assert exclusion_set.ids() == {2, 5, 9}
+
+        exclusion_set.discard(LIKED, 2)
+        assert exclusion_set.ids((LIKED,)) == {5}
+        assert len(exclusion_set) == 2
+
+
+class TestExclusionSetService:
+    """除外集合サービスとAPIの連携テスト"""
+
+    async def test_loads_all_kinds_in_one_set(
+        self, test_db: AsyncSession, test_user: User
+    ):
+        liked = await create_user(test_db, "liked@s.kyushu-u.ac.jp", "Liked")
+        blocker = await create_user(test_db, "blocker@s.kyushu-u.ac.jp", "Blocker")
+        test_db.add_all([
+            Like(liker_id=test_user.id, liked_id=liked.id),
+            Block(blocker_id=blocker.id, blocked_id=test_user.id),
+        ])
+        await test_db.commit()
+
+        exclusion_set = await exclusion_sets.get(test_db, test_user.id)
+
+        assert list(exclusion_set.liked) == [liked.id]
+        assert exclusion_set.is_blocked(blocker.id)
+        assert not exclusion_set.is_blocked(liked.id)
+
+    async def test_write_endpoints_update_cached_set(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        other = await create_user(test_db, "other@s.kyushu-u.ac.jp", "Other")
+        exclusion_set = await exclusion_sets.get(test_db, test_user.id)
+        assert len(exclusion_set) == 0
+
+        response = await client.post("/skips", json={"skipped_user_id": other.id}, headers=auth_headers)
+        assert response.status_code == 201
+        assert list(exclusion_set.skipped) == [other.id]
+
+        response = await client.post("/blocks", json={"blocked_user_id": other.id}, headers=auth_headers)
+        assert response.status_code == 201
+        assert exclusion_set.is_blocked(other.id)
+
+        response = await client.delete(f"/blocks/{other.id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert not exclusion_set.is_blocked(other.id)
+
+        # 検索結果からも除外される（スキップ済み）
+        response = await client.get("/users/search", headers=auth_headers)
+        assert response.status_code == 200
+        assert other.id not in [u["id"] for u in response.json()["users"]]
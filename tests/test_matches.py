@@ -0,0 +1,260 @@
+"""
+マッチングのテスト
+
+相互いいねの成立時に matches へ記録し、いいね取り消し・ブロックで解消されることと、
+いいね・スキップのまとめて送信（/swipes/batch）をテスト
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from httpx import AsyncClient
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.security import create_access_token
+from app.db.session import get_db
+from app.main import app
+from app.models.block import Block
+from app.models.like import Like
+from app.models.match import Match
+from app.models.user import User
+from tests.test_suggestions import create_user
+
+
+class TestMatches:
+    """matches テーブルとマッチングAPIのテスト"""
+
+    async def test_mutual_like_records_match(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        early = await create_user(test_db, "early@s.kyushu-u.ac.jp", "Early")
+        late = await create_user(test_db, "late@s.kyushu-u.ac.jp", "Late")
+        pending = await create_user(test_db, "pending@s.kyushu-u.ac.jp", "Pending")
+        liked_at = datetime.now(timezone.utc) - timedelta(days=1)
+        test_db.add_all([
+            Like(liker_id=early.id, liked_id=test_user.id, created_at=liked_at),
+            Like(liker_id=late.id, liked_id=test_user.id, created_at=liked_at),
+        ])
+        await test_db.commit()
+
+        for user in (early, late, pending):
+            response = await client.post("/likes", json={"liked_user_id": user.id}, headers=auth_headers)
+            assert response.status_code == 201
+            assert response.json()["is_match"] == (user is not pending)
+
+        # 1組につき両方向の2行
+        count = await test_db.execute(select(func.count()).select_from(Match))
+        assert count.scalar() == 4
+
+        response = await client.get("/matches", headers=auth_headers)
+        body = response.json()
+        assert body["total"] == 2
+        # 成立日時（後にいいねした方の日時）の新しい順
+        assert [match["user"]["id"] for match in body["matches"]] == [late.id, early.id]
+
+        response = await client.get(f"/matches/{early.id}", headers=auth_headers)
+        assert response.json()["is_matched"] is True
+        response = await client.get(f"/matches/{pending.id}", headers=auth_headers)
+        assert response.json()["like_status"] == {"i_liked": True, "they_liked": False}
+
+    async def test_unlike_and_block_remove_match(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        first = await create_user(test_db, "first@s.kyushu-u.ac.jp", "First")
+        second = await create_user(test_db, "second@s.kyushu-u.ac.jp", "Second")
+        test_db.add_all([
+            Like(liker_id=first.id, liked_id=test_user.id),
+            Like(liker_id=second.id, liked_id=test_user.id),
+        ])
+        await test_db.commit()
+        for user in (first, second):
+            await client.post("/likes", json={"liked_user_id": user.id}, headers=auth_headers)
+
+        response = await client.delete(f"/likes/{first.id}", headers=auth_headers)
+        assert response.status_code == 200
+        response = await client.post("/blocks", json={"blocked_user_id": second.id}, headers=auth_headers)
+        assert response.status_code == 201
+
+        response = await client.get("/matches", headers=auth_headers)
+        assert response.json()["total"] == 0
+        response = await client.get(f"/matches/{first.id}", headers=auth_headers)
+        assert response.json()["like_status"] == {"i_liked": False, "they_liked": True}
+
+        # ブロック解除で、残っている相互いいねからマッチが戻る
+        response = await client.delete(f"/blocks/{second.id}", headers=auth_headers)
+        assert response.status_code == 200
+        response = await client.get("/matches", headers=auth_headers)
+        assert [match["user"]["id"] for match in response.json()["matches"]] == [second.id]
+
+
+class TestSwipeBatch:
+    """/swipes/batch のテスト"""
+
+    async def test_batch_returns_per_item_results(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        fan = await create_user(test_db, "fan@s.kyushu-u.ac.jp", "Fan")
+        liked = await create_user(test_db, "liked@s.kyushu-u.ac.jp", "Liked")
+        skipped = await create_user(test_db, "skipped@s.kyushu-u.ac.jp", "Skipped")
+        blocker = await create_user(test_db, "blocker@s.kyushu-u.ac.jp", "Blocker")
+        test_db.add_all([
+            Like(liker_id=fan.id, liked_id=test_user.id),
+            Like(liker_id=test_user.id, liked_id=liked.id),
+            Block(blocker_id=blocker.id, blocked_id=test_user.id),
+        ])
+        await test_db.commit()
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.post(
+                "/swipes/batch",
+                json={"swipes": [
+                    {"user_id": fan.id, "action": "like"},
+                    {"user_id": liked.id, "action": "like"},
+                    {"user_id": skipped.id, "action": "skip"},
+                    {"user_id": blocker.id, "action": "like"},
+                    {"user_id": 99999, "action": "skip"},
+                    {"user_id": skipped.id, "action": "like"},
+                    {"user_id": test_user.id, "action": "like"},
+                ]},
+                headers=auth_headers,
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [(r["status"], r["is_match"]) for r in body["results"]] == [
+            ("created", True),
+            ("already_exists", False),
+            ("created", False),
+            ("blocked", False),
+            ("not_found", False),
+            ("invalid", False),
+            ("invalid", False),
+        ]
+        assert (body["created"], body["matches"]) == (2, 1)
+        # いいね・スキップの INSERT はそれぞれ1本
+        assert len([sql for sql in statements if sql.startswith("INSERT INTO likes")]) == 1
+        assert len([sql for sql in statements if sql.startswith("INSERT INTO skips")]) == 1
+
+        response = await client.get("/matches", headers=auth_headers)
+        assert [match["user"]["id"] for match in response.json()["matches"]] == [fan.id]
+
+
+class TestSendLike:
+    """POST /likes の書き込み経路のテスト"""
+
+    async def test_checks_and_insert_in_two_statements(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        fan = await create_user(test_db, "fan@s.kyushu-u.ac.jp", "Fan")
+        blocker = await create_user(test_db, "blocker@s.kyushu-u.ac.jp", "Blocker")
+        test_db.add_all([
+            Like(liker_id=fan.id, liked_id=test_user.id),
+            Block(blocker_id=blocker.id, blocked_id=test_user.id),
+        ])
+        await test_db.commit()
+        fan_id, blocker_id = fan.id, blocker.id
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.post("/likes", json={"liked_user_id": fan_id}, headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 201
+        match = response.json()["match"]
+        assert match["user"]["id"] == fan_id
+        assert match["conversation_id"] is not None
+        # 相手の存在・ブロックは1本、いいねの作成も1本
+        assert len([sql for sql in statements if "like_checks" in sql]) == 1
+        assert len([sql for sql in statements if sql.startswith("INSERT INTO likes")]) == 1
+        assert not [sql for sql in statements if sql.startswith("SELECT likes.")]
+
+        response = await client.post("/likes", json={"liked_user_id": fan_id}, headers=auth_headers)
+        assert response.status_code == 400
+        response = await client.post("/likes", json={"liked_user_id": blocker_id}, headers=auth_headers)
+        assert response.status_code == 403
+        response = await client.post("/likes", json={"liked_user_id": 99999}, headers=auth_headers)
+        assert response.status_code == 404
+
+    async def test_concurrent_mutual_likes_record_match(
+        self, client: AsyncClient, test_db: AsyncSession, monkeypatch
+    ):
+        """互いへのいいねが同時に送られても（双方が相手のいいね作成前に確認を通過しても）マッチが作られる"""
+        from app.services.match_service import match_store
+
+        alice = await create_user(test_db, "alice@s.kyushu-u.ac.jp", "Alice")
+        bob = await create_user(test_db, "bob@s.kyushu-u.ac.jp", "Bob")
+        alice_id, bob_id = alice.id, bob.id
+
+        # リクエストごとに別セッション（別コネクション）を使う
+        session_factory = async_sessionmaker(test_db.bind, class_=AsyncSession, expire_on_commit=False)
+
+        async def separate_session():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = separate_session
+
+        # 両方のリクエストがロック取得後・いいね作成前に揃うまで待たせ、処理を交互に進める
+        barrier = asyncio.Barrier(2)
+        lock_pairs = match_store.lock_pairs
+
+        async def interleaved_lock_pairs(db, user_id, other_user_ids):
+            await lock_pairs(db, user_id, other_user_ids)
+            await barrier.wait()
+
+        monkeypatch.setattr(match_store, "lock_pairs", interleaved_lock_pairs)
+
+        def headers(user_id: int) -> dict:
+            return {"Authorization": f"Bearer {create_access_token(sub=str(user_id))}"}
+
+        responses = await asyncio.gather(
+            client.post("/likes", json={"liked_user_id": bob_id}, headers=headers(alice_id)),
+            client.post("/likes", json={"liked_user_id": alice_id}, headers=headers(bob_id)),
+        )
+
+        assert [response.status_code for response in responses] == [201, 201]
+        assert sorted(response.json()["is_match"] for response in responses) == [False, True]
+        rows = (await test_db.execute(select(Match.user_id, Match.matched_user_id))).all()
+        assert sorted(rows) == sorted([(alice_id, bob_id), (bob_id, alice_id)])
+
+    async def test_repair_missing_matches(self, test_db: AsyncSession):
+        """取りこぼした相互いいねは修復ジョブで作り直される（ブロック中の組は除く）"""
+        from app.services.match_service import match_store
+
+        alice = await create_user(test_db, "alice@s.kyushu-u.ac.jp", "Alice")
+        bob = await create_user(test_db, "bob@s.kyushu-u.ac.jp", "Bob")
+        carol = await create_user(test_db, "carol@s.kyushu-u.ac.jp", "Carol")
+        first = datetime.now(timezone.utc) - timedelta(hours=2)
+        second = datetime.now(timezone.utc) - timedelta(hours=1)
+        # 同時送信の結果として matches のない相互いいねを作る
+        test_db.add_all([
+            Like(liker_id=alice.id, liked_id=bob.id, created_at=first),
+            Like(liker_id=bob.id, liked_id=alice.id, created_at=second),
+            Like(liker_id=alice.id, liked_id=carol.id, created_at=first),
+            Like(liker_id=carol.id, liked_id=alice.id, created_at=second),
+            Block(blocker_id=carol.id, blocked_id=alice.id),
+        ])
+        await test_db.commit()
+        alice_id, bob_id = alice.id, bob.id
+
+        assert await match_store.repair_missing(test_db) == 2
+        await test_db.commit()
+        assert await match_store.repair_missing(test_db) == 0
+
+        rows = (await test_db.execute(select(Match.user_id, Match.matched_user_id, Match.matched_at))).all()
+        assert sorted((row.user_id, row.matched_user_id) for row in rows) == sorted(
+            [(alice_id, bob_id), (bob_id, alice_id)]
+        )
+        # 成立日時は後にいいねした方の日時
+        assert all(row.matched_at.replace(tzinfo=timezone.utc) == second for row in rows)
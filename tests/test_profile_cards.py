@@ -0,0 +1,70 @@
+"""
+プロフィールカードのテスト
+
+ユーザー・タグの一括読み込み、公開設定による非表示化、変更時のキャッシュ破棄をテスト
+"""
+
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.tag import UserTag
+from app.models.user import User
+from app.services.profile_cards import profile_cards
+from tests.test_suggestions import create_tags, create_user
+
+
+class TestProfileCards:
+    """プロフィールカードサービスのテスト"""
+
+    async def test_batch_load_masks_private_fields(self, test_db: AsyncSession):
+        music, games = await create_tags(test_db, "music", "games")
+        public = await create_user(test_db, "public@s.kyushu-u.ac.jp", "Public")
+        private = await create_user(test_db, "private@s.kyushu-u.ac.jp", "Private")
+        public.faculty = private.faculty = "工学部"
+        private.show_faculty = False
+        private.show_tags = False
+        test_db.add_all([
+            UserTag(user_id=public.id, tag_id=music.id),
+            UserTag(user_id=private.id, tag_id=games.id),
+        ])
+        await test_db.commit()
+        user_ids = [public.id, private.id, 99999]
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            cards = await profile_cards.get_cards(test_db, user_ids)
+            cached = await profile_cards.get_cards(test_db, user_ids[:2])
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        # ユーザー1本・タグ1本。2回目は存在するユーザーがすべてキャッシュ済みのためクエリなし
+        assert len(statements) == 2
+        assert set(cards) == set(cached) == set(user_ids[:2])
+        assert cards[user_ids[0]].faculty == "工学部"
+        assert [tag["name"] for tag in cards[user_ids[0]].tags] == ["music"]
+        assert cards[user_ids[1]].faculty is None
+        assert cards[user_ids[1]].tags == []
+        assert cards[user_ids[1]].email is None
+
+    async def test_profile_and_tag_changes_invalidate_card(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        (music,) = await create_tags(test_db, "music")
+        user_id = test_user.id
+
+        response = await client.get(f"/users/{user_id}")
+        assert response.json()["tags"] == []
+
+        response = await client.post("/users/me/tags", json={"tag_id": music.id}, headers=auth_headers)
+        assert response.status_code == 201
+        response = await client.get(f"/users/{user_id}")
+        assert [tag["name"] for tag in response.json()["tags"]] == ["music"]
+
+        response = await client.put("/users/me/privacy", json={"show_tags": False}, headers=auth_headers)
+        assert response.status_code == 200
+        response = await client.get(f"/users/{user_id}")
+        assert response.json()["tags"] == []
@@ -0,0 +1,111 @@
+"""
+事前計算おすすめのテスト
+
+バックグラウンドジョブによる user_recommendations の書き込みと、
+/users/suggestions からの読み取り・無効化をテスト
+"""
+
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.recommendation import RecommendationState, UserRecommendation
+from app.models.tag import UserTag
+from app.services.tag_index_service import tag_index
+from app.models.user import User
+from app.services.recommendation_service import recommendations
+from tests.test_suggestions import create_tags, create_user, get_counting_statements
+
+
+async def setup_music_fans(test_db: AsyncSession, test_user: User, count: int) -> list[User]:
+    (music,) = await create_tags(test_db, "music")
+    fans = [
+        await create_user(test_db, f"fan{i}@s.kyushu-u.ac.jp", f"Fan{i}")
+        for i in range(count)
+    ]
+    test_db.add_all([UserTag(user_id=user.id, tag_id=music.id) for user in [test_user, *fans]])
+    await test_db.commit()
+    return fans
+
+
+class TestRecommendationJob:
+    """再計算ジョブのテスト"""
+
+    async def test_refresh_pending_writes_ranked_rows(self, test_db: AsyncSession, test_user: User):
+        fans = await setup_music_fans(test_db, test_user, 2)
+
+        processed = await recommendations.refresh_pending(test_db)
+
+        assert processed == 3  # test_user + fans（全員未計算）
+        result = await test_db.execute(
+            select(UserRecommendation.candidate_user_id)
+            .where(UserRecommendation.user_id == test_user.id)
+            .order_by(UserRecommendation.rank)
+        )
+        assert [row[0] for row in result.all()] == [fans[1].id, fans[0].id]
+
+        # 変更がなければ次回は何も再計算しない
+        assert await recommendations.refresh_pending(test_db) == 0
+
+    async def test_refresh_reads_tags_from_db_not_stale_index(self, test_db: AsyncSession, test_user: User):
+        """タグ変更後の再計算は、プロセス内インデックスが古くても新しいタグで順位付けする"""
+        from sqlalchemy import delete
+
+        await setup_music_fans(test_db, test_user, 1)
+        (games,) = await create_tags(test_db, "games")
+        gamer = await create_user(test_db, "gamer@s.kyushu-u.ac.jp", "Gamer")
+        test_db.add(UserTag(user_id=gamer.id, tag_id=games.id))
+        await test_db.commit()
+        await recommendations.refresh_pending(test_db)
+        viewer_id, gamer_id = test_user.id, gamer.id
+
+        # 他ワーカーでのタグ変更（music → games）を想定し、このワーカーのインデックスは古いまま
+        music_ids = set(tag_index.tags_of(viewer_id))
+        await test_db.execute(delete(UserTag).where(UserTag.user_id == viewer_id))
+        test_db.add(UserTag(user_id=viewer_id, tag_id=games.id))
+        await test_db.commit()
+        await recommendations.mark_dirty(test_db, [viewer_id])
+        await test_db.commit()
+        assert set(tag_index.tags_of(viewer_id)) == music_ids
+
+        await recommendations.refresh_pending(test_db)
+
+        result = await test_db.execute(
+            select(UserRecommendation.candidate_user_id)
+            .where(UserRecommendation.user_id == viewer_id)
+            .order_by(UserRecommendation.rank)
+        )
+        assert [row[0] for row in result.all()][0] == gamer_id
+
+
+class TestPrecomputedSuggestions:
+    """事前計算済みおすすめの読み取りテスト"""
+
+    async def test_suggestions_read_precomputed_rows(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        fans = await setup_music_fans(test_db, test_user, 2)
+        await recommendations.refresh_pending(test_db)
+
+        response, statements = await get_counting_statements(client, test_db, "/users/suggestions", auth_headers)
+
+        assert response.status_code == 200
+        assert [u["id"] for u in response.json()["users"]] == [fans[1].id, fans[0].id]
+        # 自分のタグ + 事前計算の読み取り + セッションの保存 + タグ取得
+        assert int(response.headers["X-Suggestion-Statements"]) == len(statements) == 4
+
+    async def test_like_marks_dirty_and_excludes_immediately(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        fans = await setup_music_fans(test_db, test_user, 2)
+        await recommendations.refresh_pending(test_db)
+
+        response = await client.post("/likes", json={"liked_user_id": fans[1].id}, headers=auth_headers)
+        assert response.status_code == 201
+
+        state = await test_db.get(RecommendationState, test_user.id)
+        await test_db.refresh(state)
+        assert state.is_dirty is True
+
+        response = await client.get("/users/suggestions", headers=auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [fans[0].id]
@@ -0,0 +1,268 @@
+"""
+ユーザー検索APIのテスト
+
+/users/search のキーセットページング・タグ絞り込み・フリーテキスト検索と
+/users/search/facets のファセット件数をテスト
+"""
+
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.tag import UserTag
+from app.core.security import create_access_token
+from app.models.user import User
+from app.services.search_results import search_result_cache
+from tests.test_suggestions import create_tags, create_user
+
+
+class TestSearchPagination:
+    """キーセットページングのテスト"""
+
+    async def test_cursor_pages_by_recent(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        users = [await create_user(test_db, f"user{i}@s.kyushu-u.ac.jp", f"User{i}") for i in range(5)]
+        expected = [user.id for user in reversed(users)]
+
+        first = (await client.get("/users/search?limit=2", headers=auth_headers)).json()
+        assert [u["id"] for u in first["users"]] == expected[:2]
+        assert first["total"] == 5
+
+        seen = [u["id"] for u in first["users"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            page = (await client.get(f"/users/search?limit=2&cursor={cursor}", headers=auth_headers)).json()
+            # 2ページ目以降は総数を計算しない
+            assert page["total"] is None
+            seen.extend(u["id"] for u in page["users"])
+            cursor = page["next_cursor"]
+
+        assert seen == expected
+
+    async def test_cursor_pages_by_name(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        # 同名ユーザーも id で順序が確定し、重複・欠落なくページングされる
+        for i, name in enumerate(("Carol", "Alice", "Bob", "Bob")):
+            await create_user(test_db, f"user{i}@s.kyushu-u.ac.jp", name)
+
+        first = (await client.get("/users/search?limit=2&sort=alphabetical", headers=auth_headers)).json()
+        second = (
+            await client.get(
+                f"/users/search?limit=2&sort=alphabetical&cursor={first['next_cursor']}&include_total=true",
+                headers=auth_headers,
+            )
+        ).json()
+
+        names = [u["display_name"] for u in first["users"] + second["users"]]
+        assert names == ["Alice", "Bob", "Bob", "Carol"]
+        assert len({u["id"] for u in first["users"] + second["users"]}) == 4
+        assert second["total"] == 4
+
+    async def test_cursor_must_match_sort(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        for i in range(3):
+            await create_user(test_db, f"user{i}@s.kyushu-u.ac.jp", f"User{i}")
+        first = (await client.get("/users/search?limit=1", headers=auth_headers)).json()
+
+        response = await client.get(
+            f"/users/search?limit=1&sort=alphabetical&cursor={first['next_cursor']}", headers=auth_headers
+        )
+        assert response.status_code == 400
+
+
+class TestTagFilter:
+    """タグでの絞り込みのテスト"""
+
+    async def test_tags_are_and_conditions_resolved_in_sql(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        music, jazz, games = await create_tags(test_db, "music", "jazz", "games")
+        both = await create_user(test_db, "both@s.kyushu-u.ac.jp", "Both")
+        music_only = await create_user(test_db, "music@s.kyushu-u.ac.jp", "MusicOnly")
+        hidden = await create_user(test_db, "hidden@s.kyushu-u.ac.jp", "Hidden")
+        hidden.show_tags = False
+        test_db.add_all([
+            UserTag(user_id=both.id, tag_id=music.id),
+            UserTag(user_id=both.id, tag_id=jazz.id),
+            UserTag(user_id=music_only.id, tag_id=music.id),
+            UserTag(user_id=music_only.id, tag_id=games.id),
+            UserTag(user_id=hidden.id, tag_id=music.id),
+            UserTag(user_id=hidden.id, tag_id=jazz.id),
+        ])
+        await test_db.commit()
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            # "unknown" はどのタグにも一致しないため無視される
+            response = await client.get("/users/search?tags=MUS,jaz,unknown", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        assert [u["id"] for u in response.json()["users"]] == [both.id]
+        assert response.json()["filters_applied"]["tags"] == ["MUS", "jaz", "unknown"]
+        # タグ名ごとの問い合わせはない（認証・結果ID・除外集合・ユーザー・タグ2本・いいね状態の7本）
+        assert len(statements) == 7
+
+        response = await client.get("/users/search?tags=unknown", headers=auth_headers)
+        assert len(response.json()["users"]) == 3
+
+
+class TestSearchResultCache:
+    """検索結果IDキャッシュのテスト"""
+
+    async def test_cached_ids_are_shared_and_filtered_per_viewer(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        others = [await create_user(test_db, f"user{i}@s.kyushu-u.ac.jp", f"User{i}") for i in range(3)]
+        response = await client.get("/users/search?campus=", headers=auth_headers)
+        assert response.json()["total"] == 3
+        assert search_result_cache.stats()["misses"] == 1
+
+        # 別の閲覧者・フィルターの並び違いでも同じキャッシュを使い、閲覧者ごとの除外は後から適用する
+        response = await client.post("/skips", json={"skipped_user_id": others[0].id}, headers=auth_headers)
+        assert response.status_code == 201
+        response = await client.get("/users/search?limit=1", headers=auth_headers)
+        page = response.json()
+        assert [u["id"] for u in page["users"]] == [others[2].id]
+        assert page["total"] == 2
+
+        viewer_token = create_access_token(sub=str(others[2].id))
+        response = await client.get("/users/search", headers={"Authorization": f"Bearer {viewer_token}"})
+        assert [u["id"] for u in response.json()["users"]] == [others[1].id, others[0].id, test_user.id]
+
+        stats = search_result_cache.stats()
+        assert (stats["hits"], stats["misses"]) == (2, 1)
+        assert stats["hit_rate"] == round(2 / 3, 4)
+
+        # 2ページ目もキャッシュから（カーソル位置以降）
+        response = await client.get(f"/users/search?limit=1&cursor={page['next_cursor']}", headers=auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [others[1].id]
+        assert response.json()["next_cursor"] is None
+
+        # ヒット率は管理者向けに公開される
+        response = await client.get("/health/caches", headers=auth_headers)
+        assert response.status_code == 403
+        test_user.is_admin = True
+        await test_db.commit()
+        response = await client.get("/health/caches", headers=auth_headers)
+        assert response.json()["search_results"]["hits"] == 3
+
+
+    async def test_block_from_another_worker_is_applied_on_cached_path(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """このワーカーの除外集合キャッシュに未反映のブロックも、ページ取得のSQLで除外される"""
+        from app.models.block import Block
+
+        others = [await create_user(test_db, f"user{i}@s.kyushu-u.ac.jp", f"User{i}") for i in range(2)]
+        blocker_id, visible_id = others[0].id, others[1].id
+        response = await client.get("/users/search", headers=auth_headers)
+        assert sorted(u["id"] for u in response.json()["users"]) == sorted([blocker_id, visible_id])
+
+        # 他ワーカーでのブロック（このワーカーのキャッシュは更新されない）
+        test_db.add(Block(blocker_id=blocker_id, blocked_id=test_user.id))
+        await test_db.commit()
+
+        response = await client.get("/users/search", headers=auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [visible_id]
+        assert search_result_cache.stats()["hits"] == 1
+
+
+class TestTextSearch:
+    """フリーテキスト検索（SQLiteではFTS5）のテスト"""
+
+    async def test_relevance_order_and_show_bio(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        name_hit = await create_user(test_db, "name@s.kyushu-u.ac.jp", "Jazzman")
+        bio_hit = await create_user(test_db, "bio@s.kyushu-u.ac.jp", "Bob")
+        hidden_bio = await create_user(test_db, "hidden@s.kyushu-u.ac.jp", "Carol")
+        bio_hit.bio = "I love JAZZ"
+        hidden_bio.bio = "jazz fan"
+        hidden_bio.show_bio = False
+        await test_db.commit()
+
+        response = await client.get("/users/search?search=jazz&sort=relevance", headers=auth_headers)
+
+        assert response.status_code == 200
+        # display_name の一致が bio の一致より上位、bio 非公開のユーザーは bio では一致しない
+        assert [u["id"] for u in response.json()["users"]] == [name_hit.id, bio_hit.id]
+        assert response.json()["total"] == 2
+
+        # 関連度順もカーソルでページングできる
+        first = (await client.get("/users/search?search=jazz&sort=relevance&limit=1", headers=auth_headers)).json()
+        second = (
+            await client.get(
+                f"/users/search?search=jazz&sort=relevance&limit=1&cursor={first['next_cursor']}",
+                headers=auth_headers,
+            )
+        ).json()
+        assert [u["id"] for u in first["users"] + second["users"]] == [name_hit.id, bio_hit.id]
+        assert second["next_cursor"] is None
+
+    async def test_index_follows_updates_and_short_terms(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        user = await create_user(test_db, "user@s.kyushu-u.ac.jp", "Alice")
+        user.display_name = "Dave"
+        await test_db.commit()
+
+        response = await client.get("/users/search?search=alice", headers=auth_headers)
+        assert response.json()["users"] == []
+
+        response = await client.get("/users/search?search=dav", headers=auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [user.id]
+
+        # 3文字未満は LIKE で検索（% はワイルドカードとして扱わない）
+        response = await client.get("/users/search?search=Da", headers=auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [user.id]
+        response = await client.get("/users/search?search=%25", headers=auth_headers)
+        assert response.json()["users"] == []
+
+
+class TestSearchFacets:
+    """ファセット件数のテスト"""
+
+    async def test_counts_and_cache_invalidation(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        (music,) = await create_tags(test_db, "music")
+        profiles = [("伊都", "工学部"), ("伊都", "理学部"), ("病院", "医学部")]
+        for i, (campus, faculty) in enumerate(profiles):
+            user = await create_user(test_db, f"user{i}@s.kyushu-u.ac.jp", f"User{i}")
+            user.campus = campus
+            user.faculty = faculty
+            test_db.add(UserTag(user_id=user.id, tag_id=music.id))
+        await test_db.commit()
+
+        response = await client.get("/users/search/facets?campus=伊都", headers=auth_headers)
+
+        assert response.status_code == 200
+        facets = response.json()
+        # キャンパスは自身の絞り込みを外して数え、学部は選択中のキャンパスで絞り込んで数える
+        assert facets["campus"] == [{"value": "伊都", "count": 2}, {"value": "病院", "count": 1}]
+        assert facets["faculty"] == [{"value": "工学部", "count": 1}, {"value": "理学部", "count": 1}]
+        assert facets["tags"] == [{"value": "music", "count": 2}]
+
+        # 公開設定の変更でキャッシュが破棄され、非公開のユーザーは数えられない
+        test_user.campus = "伊都"
+        test_user.faculty = "工学部"
+        await test_db.commit()
+        response = await client.put("/users/me/privacy", json={"show_faculty": False}, headers=auth_headers)
+        assert response.status_code == 200
+        response = await client.put("/users/me", json={"faculty": "理学部"}, headers=auth_headers)
+        assert response.status_code == 200
+
+        facets = (await client.get("/users/search/facets?campus=伊都", headers=auth_headers)).json()
+        assert facets["campus"][0] == {"value": "伊都", "count": 3}
+        assert facets["faculty"] == [{"value": "工学部", "count": 1}, {"value": "理学部", "count": 1}]
+
+        facets = (await client.get("/users/search/facets?search=user1", headers=auth_headers)).json()
+        assert facets["campus"] == [{"value": "伊都", "count": 1}]
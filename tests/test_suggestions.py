@@ -0,0 +1,410 @@
+"""
+おすすめユーザーAPIのテスト
+
+/users/suggestions とタグ転置インデックスをテスト
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import create_access_token, hash_password
+from app.models.tag import Tag, UserTag
+from app.models.user import User
+from app.services.ranking_engine import COSINE, JACCARD, SimilarityRanker
+from app.services.tag_index_service import TagInvertedIndex, tag_index
+
+
+async def create_user(db: AsyncSession, email: str, display_name: str) -> User:
+    user = User(
+        email=email,
+        hashed_password=hash_password("Test1234"),
+        display_name=display_name,
+        profile_completed=True,
+    )
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def get_counting_statements(client: AsyncClient, db: AsyncSession, url: str, headers: dict):
+    """リクエストを送り、レスポンスと発行されたSQL（認証のユーザー取得を除く）を返す"""
+    statements = []
+    engine = db.bind.sync_engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = await client.get(url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # 先頭は get_current_user のユーザー取得
+    assert statements[0].startswith("SELECT users.")
+    return response, statements[1:]
+
+
+async def create_tags(db: AsyncSession, *names: str) -> list[Tag]:
+    tags = [Tag(name=name) for name in names]
+    db.add_all(tags)
+    await db.commit()
+    for tag in tags:
+        await db.refresh(tag)
+    return tags
+
+
+class TestTagInvertedIndex:
+    """タグ転置インデックスのテスト"""
+
+    def test_incremental_updates(self):
+        """追加・削除・タグ削除が反映される"""
+        index = TagInvertedIndex()
+        index.load_pairs([(1, 10)])
+
+        index.add(11, 1)
+        index.add(11, 1)
+        assert list(index.users_with(1)) == [10, 11]
+
+        index.remove(10, 1)
+        assert list(index.users_with(1)) == [11]
+        assert index.tags_of(10) == []
+
+        index.drop_tag(1)
+        assert list(index.users_with(1)) == []
+        assert index.tags_of(11) == []
+
+
+class TestSimilarityRanker:
+    """類似度ランキングのテスト"""
+
+    def test_cosine_prefers_rare_tags(self):
+        """IDF重み付きのため、希少なタグの一致が一般的なタグの一致より高く評価される"""
+        index = TagInvertedIndex()
+        # タグ1: 多くのユーザーが持つ / タグ2: 希少
+        index.load_pairs([(1, 1), (2, 1), (1, 10), (1, 11), (1, 12), (2, 20), (3, 10), (3, 20)])
+
+        ranking = SimilarityRanker(index, metric=COSINE).rank([1, 2], exclude_user_ids={1})
+
+        assert ranking.user_ids[0] == 20
+        assert all(0.0 <= c.score <= 1.0 for c in ranking.candidates)
+
+    def test_jaccard_penalizes_many_tags(self):
+        """タグを大量に持つユーザーは和集合が大きくなるためスコアが下がる"""
+        index = TagInvertedIndex()
+        index.load_pairs([(1, 1), (2, 1), (1, 10), (2, 10), (3, 10), (4, 10), (1, 11), (2, 11)])
+
+        ranking = SimilarityRanker(index, metric=JACCARD).rank([1, 2], exclude_user_ids={1})
+
+        assert [(c.user_id, c.score, c.common_tag_count) for c in ranking.candidates] == [
+            (11, 1.0, 2),
+            (10, 0.5, 2),
+        ]
+
+    def test_top_k_is_deterministic(self):
+        """同点は新しいユーザー（ID降順）を優先し、上位k件で打ち切る"""
+        index = TagInvertedIndex()
+        index.load_pairs([(1, user_id) for user_id in range(1, 8)])
+        ranker = SimilarityRanker(index, metric=JACCARD)
+
+        ranking = ranker.rank([1], top_k=3)
+
+        assert ranking.user_ids == [7, 6, 5]
+        assert ranking.truncated is True
+
+        # インデックス更新後は行列が作り直される
+        index.add(8, 1)
+        assert ranker.rank([1], top_k=1).user_ids == [8]
+
+
+class TestUserSuggestions:
+    """おすすめユーザー取得のテスト"""
+
+    async def test_suggestions_ranked_by_common_tags(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """共通タグが多いユーザーが先に表示される"""
+        music, movies, games = await create_tags(test_db, "music", "movies", "games")
+        both = await create_user(test_db, "both@s.kyushu-u.ac.jp", "Both")
+        one = await create_user(test_db, "one@s.kyushu-u.ac.jp", "One")
+        await create_user(test_db, "none@s.kyushu-u.ac.jp", "None")
+        test_db.add_all([
+            UserTag(user_id=test_user.id, tag_id=music.id),
+            UserTag(user_id=test_user.id, tag_id=movies.id),
+            UserTag(user_id=both.id, tag_id=music.id),
+            UserTag(user_id=both.id, tag_id=movies.id),
+            UserTag(user_id=one.id, tag_id=music.id),
+            UserTag(user_id=one.id, tag_id=games.id),
+        ])
+        await test_db.commit()
+
+        response = await client.get("/users/suggestions", headers=auth_headers)
+
+        assert response.status_code == 200
+        users = response.json()["users"]
+        assert [u["id"] for u in users] == [both.id, one.id]
+        assert users[0]["match_score"] == 1.0
+
+    async def test_tag_endpoints_update_index(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """/users/me/tags の追加・削除がインデックスに反映される"""
+        (music,) = await create_tags(test_db, "music")
+        other = await create_user(test_db, "other@s.kyushu-u.ac.jp", "Other")
+        test_db.add(UserTag(user_id=other.id, tag_id=music.id))
+        await test_db.commit()
+        await tag_index.ensure_loaded(test_db)
+
+        response = await client.post("/users/me/tags", json={"tag_id": music.id}, headers=auth_headers)
+        assert response.status_code == 201
+        assert tag_index.tags_of(test_user.id) == [music.id]
+
+        response = await client.get("/users/suggestions", headers=auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [other.id]
+
+        response = await client.delete(f"/users/me/tags/{music.id}", headers=auth_headers)
+        assert response.status_code == 204
+        assert tag_index.tags_of(test_user.id) == []
+        assert list(tag_index.users_with(music.id)) == [other.id]
+
+    async def test_my_tags_read_from_db_not_stale_index(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """他ワーカーでのタグ編集（このワーカーのインデックスには未反映）も自分のタグとして使う"""
+        music, games = await create_tags(test_db, "music", "games")
+        musician = await create_user(test_db, "musician@s.kyushu-u.ac.jp", "Musician")
+        gamer = await create_user(test_db, "gamer@s.kyushu-u.ac.jp", "Gamer")
+        my_music = UserTag(user_id=test_user.id, tag_id=music.id)
+        test_db.add_all([
+            my_music,
+            UserTag(user_id=musician.id, tag_id=music.id),
+            UserTag(user_id=gamer.id, tag_id=games.id),
+        ])
+        await test_db.commit()
+        await tag_index.ensure_loaded(test_db)
+
+        # music → games に付け替え（インデックスを経由しない）
+        await test_db.delete(my_music)
+        test_db.add(UserTag(user_id=test_user.id, tag_id=games.id))
+        await test_db.commit()
+        assert tag_index.tags_of(test_user.id) == [music.id]
+
+        response = await client.get("/users/suggestions", headers=auth_headers)
+        assert response.json()["users"][0]["id"] == gamer.id
+
+    async def test_exclusions_applied_in_single_statement(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """いいね・スキップ・ブロック済みユーザーは除外され、事前計算が未計算でもSQLは4本（初回は6本）"""
+        from app.models.block import Block
+        from app.models.like import Like
+        from app.models.skip import Skip
+
+        (music,) = await create_tags(test_db, "music")
+        liked = await create_user(test_db, "liked@s.kyushu-u.ac.jp", "Liked")
+        skipped = await create_user(test_db, "skipped@s.kyushu-u.ac.jp", "Skipped")
+        blocker = await create_user(test_db, "blocker@s.kyushu-u.ac.jp", "Blocker")
+        visible = await create_user(test_db, "visible@s.kyushu-u.ac.jp", "Visible")
+        test_db.add_all(
+            [UserTag(user_id=user.id, tag_id=music.id) for user in (test_user, liked, skipped, blocker, visible)]
+            + [
+                Like(liker_id=test_user.id, liked_id=liked.id),
+                Like(liker_id=visible.id, liked_id=test_user.id),
+                Skip(skipper_id=test_user.id, skipped_id=skipped.id),
+                Block(blocker_id=blocker.id, blocked_id=test_user.id),
+            ]
+        )
+        await test_db.commit()
+
+        response, statements = await get_counting_statements(client, test_db, "/users/suggestions", auth_headers)
+
+        assert response.status_code == 200
+        users = response.json()["users"]
+        assert [u["id"] for u in users] == [visible.id]
+        assert users[0]["has_received_like"] is True
+        # ヘッダーは実際に発行されたSQL数。初回はインデックス・除外集合の構築2本 +
+        # 自分のタグ（事前計算の有無を含む）+ セッションの保存 + ユーザー取得 + タグ取得
+        assert int(response.headers["X-Suggestion-Statements"]) == len(statements) == 6
+
+        # 2回目（インデックス・除外集合はキャッシュ済み）は事前計算の確認で本数が増えない
+        response, statements = await get_counting_statements(client, test_db, "/users/suggestions", auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [visible.id]
+        assert int(response.headers["X-Suggestion-Statements"]) == len(statements) == 4
+
+    async def test_fallback_without_tags(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """タグ未設定の場合は最近登録したユーザーを返す"""
+        newcomer = await create_user(test_db, "new@s.kyushu-u.ac.jp", "Newcomer")
+
+        response, statements = await get_counting_statements(client, test_db, "/users/suggestions", auth_headers)
+
+        assert response.status_code == 200
+        assert [u["id"] for u in response.json()["users"]] == [newcomer.id]
+        # インデックス構築 + 自分のタグ + ユーザー取得 + タグ取得
+        assert int(response.headers["X-Suggestion-Statements"]) == len(statements) == 4
+
+
+class TestSuggestionSessions:
+    """おすすめセッション（カーソルによるページング）のテスト"""
+
+    async def test_cursor_pages_through_ranked_deck(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """2ページ目以降は同じ順位付けの続きを返し、スキップした相手は取り除かれる"""
+        (music,) = await create_tags(test_db, "music")
+        fans = [await create_user(test_db, f"fan{i}@s.kyushu-u.ac.jp", f"Fan{i}") for i in range(5)]
+        test_db.add_all([UserTag(user_id=user.id, tag_id=music.id) for user in [test_user, *fans]])
+        await test_db.commit()
+        expected = [user.id for user in reversed(fans)]
+
+        first = (await client.get("/users/suggestions?limit=2", headers=auth_headers)).json()
+        assert [u["id"] for u in first["users"]] == expected[:2]
+        assert first["next_cursor"]
+
+        response = await client.post("/skips", json={"skipped_user_id": expected[2]}, headers=auth_headers)
+        assert response.status_code == 201
+
+        second = (
+            await client.get(f"/users/suggestions?limit=2&cursor={first['next_cursor']}", headers=auth_headers)
+        ).json()
+        assert [u["id"] for u in second["users"]] == expected[3:5]
+        assert second["next_cursor"] is None
+
+    async def test_next_page_served_by_another_worker(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict, monkeypatch
+    ):
+        """セッションはDBに保持するため、プロセス内の状態がないワーカーでも続きを返す。期限切れは410"""
+        from datetime import datetime, timedelta, timezone
+        from sqlalchemy import update
+        from app.models.recommendation import UserSuggestionSession
+        from app.routers import users as users_router
+        from app.services.suggestion_sessions import SuggestionSessionStore
+
+        (music,) = await create_tags(test_db, "music")
+        fans = [await create_user(test_db, f"fan{i}@s.kyushu-u.ac.jp", f"Fan{i}") for i in range(4)]
+        test_db.add_all([UserTag(user_id=user.id, tag_id=music.id) for user in [test_user, *fans]])
+        await test_db.commit()
+        expected = [user.id for user in reversed(fans)]
+        viewer_id = test_user.id
+
+        first = (await client.get("/users/suggestions?limit=2", headers=auth_headers)).json()
+        assert [u["id"] for u in first["users"]] == expected[:2]
+
+        # 別ワーカー（新しいプロセス）を想定してストアとタグインデックスを作り直す
+        monkeypatch.setattr(users_router, "suggestion_sessions", SuggestionSessionStore())
+        tag_index.reset()
+        second = (
+            await client.get(f"/users/suggestions?limit=2&cursor={first['next_cursor']}", headers=auth_headers)
+        ).json()
+        assert [u["id"] for u in second["users"]] == expected[2:4]
+
+        await test_db.execute(
+            update(UserSuggestionSession)
+            .where(UserSuggestionSession.viewer_id == viewer_id)
+            .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+        )
+        await test_db.commit()
+        response = await client.get(f"/users/suggestions?limit=2&cursor={first['next_cursor']}", headers=auth_headers)
+        assert response.status_code == 410
+
+    async def test_invalid_or_mismatched_cursor(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        (music,) = await create_tags(test_db, "music")
+        fans = [await create_user(test_db, f"fan{i}@s.kyushu-u.ac.jp", f"Fan{i}") for i in range(3)]
+        test_db.add_all([UserTag(user_id=user.id, tag_id=music.id) for user in [test_user, *fans]])
+        await test_db.commit()
+
+        response = await client.get("/users/suggestions?cursor=not-a-cursor", headers=auth_headers)
+        assert response.status_code == 400
+
+        first = (await client.get("/users/suggestions?limit=1", headers=auth_headers)).json()
+        response = await client.get(
+            f"/users/suggestions?limit=1&campus=伊都&cursor={first['next_cursor']}", headers=auth_headers
+        )
+        assert response.status_code == 410
+
+    async def test_fallback_pages_by_keyset(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        """タグ未設定のフォールバックも重複なく続きを返す"""
+        newcomers = [await create_user(test_db, f"new{i}@s.kyushu-u.ac.jp", f"New{i}") for i in range(3)]
+
+        first = (await client.get("/users/suggestions?limit=2", headers=auth_headers)).json()
+        second = (
+            await client.get(f"/users/suggestions?limit=2&cursor={first['next_cursor']}", headers=auth_headers)
+        ).json()
+
+        ids = [u["id"] for u in first["users"] + second["users"]]
+        assert sorted(ids) == sorted(user.id for user in newcomers)
+        assert second["next_cursor"] is None
+
+
+class TestAgeFilter:
+    """年齢フィルター（誕生日の範囲条件）のテスト"""
+
+    def test_birthday_range_for_age(self):
+        from datetime import date
+        from app.routers.users import _birthday_range_for_age
+
+        assert _birthday_range_for_age(20, 22, date(2026, 10, 17)) == (date(2003, 10, 17), date(2006, 10, 17))
+        assert _birthday_range_for_age(None, None, date(2026, 10, 17)) == (None, None)
+        # 2/29 は該当日がない年では 2/28 に丸める
+        assert _birthday_range_for_age(21, None, date(2028, 2, 29)) == (None, date(2007, 2, 28))
+
+    async def test_age_filter_works_on_sqlite(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        from datetime import date, timedelta
+        from app.routers.users import _years_before
+
+        today = date.today()
+        (music,) = await create_tags(test_db, "music")
+        just_twenty = await create_user(test_db, "twenty@s.kyushu-u.ac.jp", "Twenty")
+        just_twenty.birthday = _years_before(today, 20)
+        nearly_twenty = await create_user(test_db, "nineteen@s.kyushu-u.ac.jp", "Nineteen")
+        nearly_twenty.birthday = _years_before(today, 20) + timedelta(days=1)
+        hidden = await create_user(test_db, "hidden@s.kyushu-u.ac.jp", "Hidden")
+        hidden.birthday = _years_before(today, 20)
+        hidden.show_age = False
+        for user in (just_twenty, nearly_twenty):
+            user.show_age = True
+        test_db.add_all([UserTag(user_id=u.id, tag_id=music.id) for u in (test_user, just_twenty, nearly_twenty, hidden)])
+        await test_db.commit()
+
+        response = await client.get("/users/suggestions?age_min=20&age_max=20", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert [u["id"] for u in response.json()["users"]] == [just_twenty.id]
+
+
+class TestLookingForFilter:
+    """関係性目標フィルター（user_looking_for）のテスト"""
+
+    async def test_looking_for_synced_and_filtered(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        from sqlalchemy import select
+        from app.models.looking_for import UserLookingFor
+
+        (music,) = await create_tags(test_db, "music")
+        dating = await create_user(test_db, "dating@s.kyushu-u.ac.jp", "Dating")
+        friends = await create_user(test_db, "friends@s.kyushu-u.ac.jp", "Friends")
+        dating.looking_for = "friends, dating"
+        friends.looking_for = "friends"
+        test_db.add_all([UserTag(user_id=u.id, tag_id=music.id) for u in (test_user, dating, friends)])
+        await test_db.commit()
+
+        result = await test_db.execute(
+            select(UserLookingFor.goal).where(UserLookingFor.user_id == dating.id).order_by(UserLookingFor.goal)
+        )
+        assert [row[0] for row in result.all()] == ["dating", "friends"]
+
+        response = await client.get("/users/suggestions?relationship_goal=dating", headers=auth_headers)
+        assert [u["id"] for u in response.json()["users"]] == [dating.id]
+
+        # looking_for を変更すると正規化テーブルも書き換わる
+        response = await client.put("/users/me", json={"looking_for": "dating"}, headers=auth_headers)
+        assert response.status_code == 200
+        result = await test_db.execute(select(UserLookingFor.goal).where(UserLookingFor.user_id == test_user.id))
+        assert [row[0] for row in result.all()] == ["dating"]
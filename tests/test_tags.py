@@ -0,0 +1,176 @@
+"""
+タグAPIのテスト
+
+タグ名のオートコンプリート（プロセス内の前方一致インデックス）と
+タグの利用ユーザー数（tags.user_count）をテスト
+"""
+
+from httpx import AsyncClient
+from sqlalchemy import delete, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.tag import UserTag
+from app.models.user import User
+from app.services.tag_autocomplete import TagAutocompleteIndex
+from app.services.tag_index_service import TagInvertedIndex
+from tests.test_suggestions import create_tags, create_user
+
+
+class TestTagAutocompleteIndex:
+    """前方一致インデックスのテスト"""
+
+    def test_prefix_match_ranked_by_usage(self):
+        usage = TagInvertedIndex()
+        usage.load_pairs([(1, 10), (2, 10), (2, 11), (3, 12)])
+        index = TagAutocompleteIndex(usage)
+        index.load_tags([(1, "Jazz"), (2, "J-POP"), (3, "Indie_Jazz"), (4, "Games")])
+
+        # 利用ユーザー数の多い順、単語の先頭からも一致、全角・大文字小文字は区別しない
+        assert [s.name for s in index.suggest("ｊ")] == ["J-POP", "Indie_Jazz", "Jazz"]
+        assert [s.user_count for s in index.suggest("jazz")] == [1, 1]
+        assert index.suggest("pop")[0].tag_id == 2
+        assert index.suggest("x") == []
+
+        index.add(5, "Jazz Funk")
+        index.remove(1)
+        assert [s.name for s in index.suggest("jaz")] == ["Indie_Jazz", "Jazz Funk"]
+        assert [s.name for s in index.suggest("fu")] == ["Jazz Funk"]
+
+
+class TestTagAutocompleteAPI:
+    """/tags/autocomplete のテスト"""
+
+    async def test_reflects_catalog_changes(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        music, musical = await create_tags(test_db, "music", "musical")
+        fan = await create_user(test_db, "fan@s.kyushu-u.ac.jp", "Fan")
+        test_db.add_all([
+            UserTag(user_id=test_user.id, tag_id=musical.id),
+            UserTag(user_id=fan.id, tag_id=musical.id),
+            UserTag(user_id=fan.id, tag_id=music.id),
+        ])
+        await test_db.commit()
+
+        response = await client.get("/tags/autocomplete?q=Mus")
+        assert response.status_code == 200
+        assert response.json()["tags"] == [
+            {"id": musical.id, "name": "musical", "user_count": 2},
+            {"id": music.id, "name": "music", "user_count": 1},
+        ]
+
+        response = await client.post("/tags", json={"name": "museum"}, headers=auth_headers)
+        assert response.status_code == 201
+        museum_id = response.json()["id"]
+        response = await client.delete(f"/tags/{music.id}", headers=auth_headers)
+        assert response.status_code == 204
+
+        response = await client.get("/tags/autocomplete?q=mus")
+        assert [tag["id"] for tag in response.json()["tags"]] == [musical.id, museum_id]
+
+
+class TestTagUserCount:
+    """tags.user_count（タグの利用ユーザー数）のテスト"""
+
+    async def test_counter_follows_user_tags_and_popular(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        music, games = await create_tags(test_db, "music", "games")
+        fan = await create_user(test_db, "fan@s.kyushu-u.ac.jp", "Fan")
+        test_db.add(UserTag(user_id=fan.id, tag_id=games.id))
+        await test_db.commit()
+
+        response = await client.post("/users/me/tags", json={"tag_id": games.id}, headers=auth_headers)
+        assert response.status_code == 201
+        response = await client.post("/users/me/tags", json={"tag_id": music.id}, headers=auth_headers)
+        assert response.status_code == 201
+        response = await client.delete(f"/users/me/tags/{music.id}", headers=auth_headers)
+        assert response.status_code == 204
+
+        response = await client.get("/tags/popular?limit=2")
+        assert [(tag["name"], tag["user_count"]) for tag in response.json()["tags"]] == [
+            ("games", 2),
+            ("music", 0),
+        ]
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.get("/tags")
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert {tag["name"]: tag["user_count"] for tag in response.json()["tags"]} == {"music": 0, "games": 2}
+        # タグごとの件数取得はない（総数と一覧の2本）
+        assert len(statements) == 2
+
+    async def test_user_deletion_cascade_is_recounted(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User
+    ):
+        """ユーザー削除の ON DELETE CASCADE で消えた user_tags は、バックグラウンドジョブで数え直される"""
+        from app.services.recommendation_service import recommendations
+
+        (music,) = await create_tags(test_db, "music")
+        leaving = await create_user(test_db, "leaving@s.kyushu-u.ac.jp", "Leaving")
+        test_db.add_all([UserTag(user_id=user.id, tag_id=music.id) for user in (test_user, leaving)])
+        await test_db.commit()
+        leaving_id = leaving.id
+
+        # DBの外部キー制約による削除（ORMのイベントを通らない）
+        await test_db.execute(text("PRAGMA foreign_keys = ON"))
+        await test_db.execute(delete(User).where(User.id == leaving_id))
+        await test_db.commit()
+        response = await client.get("/tags/popular?limit=1")
+        assert response.json()["tags"][0]["user_count"] == 2
+
+        await recommendations.refresh_pending(test_db)
+        # 読み込み済みのタグを捨てて、DBの値を読む
+        test_db.expire_all()
+
+        response = await client.get("/tags/popular?limit=1")
+        assert [(tag["name"], tag["user_count"]) for tag in response.json()["tags"]] == [("music", 1)]
+
+
+class TestReplaceMyTags:
+    """PUT /users/me/tags（一括置き換え）のテスト"""
+
+    async def test_replace_applies_diff_and_creates_tags(
+        self, client: AsyncClient, test_db: AsyncSession, test_user: User, auth_headers: dict
+    ):
+        music, games = await create_tags(test_db, "music", "games")
+        test_db.add(UserTag(user_id=test_user.id, tag_id=games.id))
+        await test_db.commit()
+
+        statements = []
+        engine = test_db.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = await client.put(
+                "/users/me/tags",
+                json={"tag_ids": [music.id], "tag_names": ["music", " 料理 ", "料理"]},
+                headers=auth_headers,
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        assert sorted(tag["name"] for tag in response.json()["tags"]) == ["music", "料理"]
+        assert len([sql for sql in statements if sql.startswith("INSERT INTO user_tags")]) == 1
+        assert len([sql for sql in statements if sql.startswith("DELETE FROM user_tags")]) == 1
+
+        # テストではリクエスト間でセッションを共有するため、読み込み済みのタグを読み直させる
+        test_db.expire_all()
+        response = await client.get("/tags/popular")
+        assert {tag["name"]: tag["user_count"] for tag in response.json()["tags"]} == {
+            "music": 1,
+            "料理": 1,
+            "games": 0,
+        }
+
+        # 存在しないタグIDは何も変更せずに404
+        response = await client.put("/users/me/tags", json={"tag_ids": [99999]}, headers=auth_headers)
+        assert response.status_code == 404
+        response = await client.put("/users/me/tags", json={}, headers=auth_headers)
+        assert response.json()["tags"] == []